@@ -3,18 +3,23 @@ Base class for Q&A scrapers with common functionality.
 """
 
 from abc import ABC, abstractmethod
-import requests
 from bs4 import BeautifulSoup, Tag
-import time
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Iterator, List, Dict, Optional, Tuple
 from tqdm import tqdm
 from datetime import datetime
-import xml.etree.ElementTree as ET
 from src.utilities.pinecone_manager import PineconeManager
+from src.index_graph.crawler import AsyncCrawler
+from src.index_graph.fetcher import PageFetcher, ValidatorStore
+from src.index_graph.sitemap import iter_sitemap, aiter_sitemap
+from src.index_graph.extractor import SectionExtractor, resolve_parser_backend
+from src.index_graph.manifest import DocumentManifest, chunk_ids, content_hash
+from src.index_graph.document_store import DocumentStore
+from src.index_graph.parsing import ParsePool
+from src.index_graph.pipeline import IngestionPipeline, StageStats
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from retrieval_graph.config import CHUNK_SIZE, CHUNK_OVERLAP
-import json
-import os
+from src.utilities.config import (CHUNK_SIZE, CHUNK_OVERLAP, CRAWL_WORKERS, CRAWL_PER_HOST_LIMIT, HTML_PARSER,
+    PARSE_WORKERS, CHECKPOINT_INTERVAL)
+import time
 
 class BaseQAScraper(ABC):
     def __init__(
@@ -22,7 +27,11 @@ class BaseQAScraper(ABC):
         batch_size: int = 50,
         sleep_time: int = 0,
         max_retries: int = 3,
-        debug: bool = False
+        debug: bool = False,
+        workers: int = CRAWL_WORKERS,
+        per_host_limit: int = CRAWL_PER_HOST_LIMIT,
+        html_parser: str = HTML_PARSER,
+        parse_workers: int = PARSE_WORKERS
     ):
         """
         Initialize the scraper with configuration.
@@ -33,14 +42,34 @@ class BaseQAScraper(ABC):
             sleep_time: Delay between requests in seconds
             max_retries: Maximum number of retry attempts for failed requests
             debug: Enable verbose logging
+            workers: Number of concurrent workers used by ascrape_and_ingest
+            per_host_limit: Maximum number of open connections per host in ascrape_and_ingest
+            html_parser: BeautifulSoup tree builder, e.g. 'html.parser' or 'lxml'
+            parse_workers: Number of processes parsing pages in ascrape_and_ingest, 0 parses in-process
         """
         self.batch_size = batch_size
         self.sleep_time = sleep_time
         self.max_retries = max_retries
         self.debug = debug
+        self.workers = workers
+        self.per_host_limit = per_host_limit
+        self.html_parser = resolve_parser_backend(html_parser)
+        self.parse_workers = parse_workers
+        self._extractors: Dict[str, SectionExtractor] = {}
         
         # Initialize common components
-        self.pinecone_manager = self._init_pinecone()
+        # Pinecone and the fetcher are created on first use, parse-only instances
+        # (e.g. in parser worker processes) never need them
+        self._pinecone_manager: Optional[PineconeManager] = None
+        self._fetcher: Optional[PageFetcher] = None
+        self._manifest: Optional[DocumentManifest] = None
+        self._document_store: Optional[DocumentStore] = None
+        # Upsert log batches indexed since the last checkpoint
+        self._completed_batches: List[int] = []
+        self._last_checkpoint = time.monotonic()
+        # Fatwa ids -> sitemap lastmod, and child sitemaps that failed, of the current run
+        self._sitemap_lastmods: Dict[str, Optional[str]] = {}
+        self._sitemap_failures: List[str] = []
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
@@ -51,6 +80,41 @@ class BaseQAScraper(ABC):
             separators=["\n\n", "\n", " ", ""]  # Optimized separators
         )
 
+    @property
+    def pinecone_manager(self) -> PineconeManager:
+        if self._pinecone_manager is None:
+            self._pinecone_manager = self._init_pinecone()
+        return self._pinecone_manager
+
+    @property
+    def fetcher(self) -> PageFetcher:
+        if self._fetcher is None:
+            self._fetcher = PageFetcher(
+                self.headers,
+                validator_store=ValidatorStore(self._get_validators_file_path()),
+                max_retries=self.max_retries,
+                sleep_time=self.sleep_time,
+                pool_size=self.workers,
+                per_host_limit=self.per_host_limit,
+                log=self._log
+            )
+        return self._fetcher
+
+    @property
+    def document_store(self) -> DocumentStore:
+        if self._document_store is None:
+            self._document_store = DocumentStore(self._get_document_store_path())
+            migrated = self._document_store.migrate_json(self._get_json_file_path())
+            if migrated:
+                print(f"Migrated {migrated} items from {self._get_json_file_path()} to {self._get_document_store_path()}")
+        return self._document_store
+
+    @property
+    def manifest(self) -> DocumentManifest:
+        if self._manifest is None:
+            self._manifest = DocumentManifest(self._get_manifest_file_path())
+        return self._manifest
+
     @abstractmethod
     def _init_pinecone(self) -> PineconeManager:
         """Initialize Pinecone with correct index name."""
@@ -68,7 +132,7 @@ class BaseQAScraper(ABC):
 
     def parse_qa_from_page(self, html_content: str, url: str, qa_id: str, lastmod: datetime) -> Optional[Dict[str, str]]:
         """Parse Q&A content from page with common logic."""
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, self.html_parser)
         
         try:
             # Find the main content container
@@ -128,41 +192,11 @@ class BaseQAScraper(ABC):
 
     def _extract_text_from_section(self, section: Tag, until_tag: Optional[Dict] = None) -> str:
         """Extract text from a section until specified tag."""
-        seen_content = set()
-        content_parts = []
-        
-        current = section.find_next()
-        while current:
-            # Check if we've reached the end marker
-            if until_tag:
-                 # Convert single dict to list for uniform handling
-                markers = until_tag if isinstance(until_tag, list) else [until_tag]
-                
-                # Check each marker - if any matches, we stop (OR logic)
-                for marker in markers:
-                    matches = True
-                    for attr, value in marker.items():
-                        current_value = current.get(attr, '')
-                        if attr == 'string':
-                            current_value = current.get_text(strip=True)
-                        elif attr == 'name':
-                            current_value = current.name
-                        if not (current_value and value in current_value):
-                            matches = False
-                            break
-                    
-                    if matches:  # If any marker matches completely, stop extraction
-                        return ' '.join(content_parts)
-                
-            if current.name == 'p':
-                text = self._get_text_from_tag(current)
-                if text and text not in seen_content:
-                    content_parts.append(text)
-                    seen_content.add(text)
-                    
-            current = current.find_next()
-            
-        return ' '.join(content_parts)
+        key = repr(until_tag)
+        extractor = self._extractors.get(key)
+        if extractor is None:
+            extractor = self._extractors[key] = SectionExtractor(until_tag)
+        return extractor.extract(section)
 
     def _validate_qa_content(self, question: str, answer: str, url: str) -> bool:
         """Validate extracted Q&A content."""
@@ -213,116 +247,204 @@ class BaseQAScraper(ABC):
 
     def get_page_content(self, url: str) -> str:
         """Fetch content from a specific URL with retries."""
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.get(url, headers=self.headers, timeout=10)
-                response.raise_for_status()
-                response.encoding = 'utf-8'
-                return response.text
-            except requests.RequestException as e:
-                self._log(f"Attempt {attempt + 1} failed: {str(e)}")
-                if attempt == self.max_retries - 1:
-                    raise
-                time.sleep(self.sleep_time)
+        return self.fetcher.fetch(url, conditional=False).text
 
     def parse_sitemap(self) -> List[Dict[str, str]]:
         """Parse sitemap and extract fatwa URLs with their last modified dates."""
         try:
-            response = requests.get(self._get_sitemap_url(), headers=self.headers)
-            response.raise_for_status()
-            
-            # Find the start of the actual XML content
-            xml_start = response.text.find('<urlset')
-            if xml_start == -1:
-                raise ValueError("Could not find XML content in response")
-            
-            xml_content = response.text[xml_start:]
-            root = ET.fromstring(xml_content)
-            
-            ns = {'sm': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-            urls = []
-            
-            for url in root.findall(".//sm:url", ns):
-                try:
-                    loc = url.find("sm:loc", ns).text
-                    lastmod = url.find("sm:lastmod", ns).text
-                    
-                    if self._is_valid_fatwa_url(loc):
-                        fatwa_id = self._extract_fatwa_id(loc)
-                        if fatwa_id:
-                            urls.append({
-                                'url': loc,
-                                'lastmod': datetime.fromisoformat(lastmod.replace('Z', '+00:00')),
-                                'id': fatwa_id
-                            })
-
-                except (AttributeError, ValueError) as e:
-                    self._log(f"Error processing URL entry: {str(e)}")
-                    continue
-            
-            return urls
-            
+            return list(self.iter_sitemap())
         except Exception as e:
             self._log(f"Error parsing sitemap: {str(e)}")
             raise
 
+    def iter_sitemap(self) -> Iterator[Dict[str, str]]:
+        """Stream fatwa URLs from the sitemap (and its child sitemaps) as they are parsed."""
+        self._sitemap_lastmods, self._sitemap_failures = {}, []
+        for entry in iter_sitemap(self.fetcher, self._get_sitemap_url(), self._log, failed=self._sitemap_failures):
+            url_info = self._to_url_info(entry)
+            if url_info:
+                yield url_info
+
+    async def aiter_sitemap(self) -> AsyncIterator[Dict[str, str]]:
+        """Stream fatwa URLs from the sitemap, fetching child sitemaps concurrently."""
+        self._sitemap_lastmods, self._sitemap_failures = {}, []
+        async for entry in aiter_sitemap(self.fetcher, self._get_sitemap_url(), log=self._log, failed=self._sitemap_failures):
+            url_info = self._to_url_info(entry)
+            if url_info:
+                yield url_info
+
+    def _to_url_info(self, entry: Dict[str, Optional[str]]) -> Optional[Dict[str, str]]:
+        """Convert a sitemap entry into a URL info dict, or None if it is not a fatwa page."""
+        try:
+            loc = entry['loc']
+            lastmod = entry['lastmod']
+            
+            if self._is_valid_fatwa_url(loc):
+                fatwa_id = self._extract_fatwa_id(loc)
+                if fatwa_id:
+                    self._sitemap_lastmods[fatwa_id] = lastmod
+                    return {
+                        'url': loc,
+                        'lastmod': datetime.fromisoformat(lastmod.replace('Z', '+00:00')),
+                        'id': fatwa_id
+                    }
+
+        except (AttributeError, TypeError, ValueError) as e:
+            self._log(f"Error processing URL entry: {str(e)}")
+        return None
+
     def upload_to_pinecone(self, qa_items: List[Dict[str, str]]) -> None:
         """Upload QA items to Pinecone in batches."""
         for i in range(0, len(qa_items), self.batch_size):
             batch = qa_items[i:i + self.batch_size]
             
             try:
-                all_vectors = []
-                for item in batch:
-                    # Split answer into chunks
-                    chunks = self.text_splitter.split_text(item['content'])
-                    
-                    # Create embeddings for chunks
-                    chunk_embeddings = self.pinecone_manager.create_embeddings(chunks)
-                    
-                    # Create vectors for each chunk
-                    for chunk_idx, (chunk, embedding) in enumerate(zip(chunks, chunk_embeddings)):
-                        vector = (
-                            f"{item['id']}-{chunk_idx}",
-                            embedding,
-                            {
-                                'text': chunk,
-                                'source': item['source'],
-                                'total_chunks': len(chunks)
-                            }
-                        )
-                        all_vectors.append(vector)
+                chunks_per_item = [self.text_splitter.split_text(item['content']) for item in batch]
+
+                # Embed the chunks of the whole batch together rather than one document at a time
+                all_vectors = self._vectorize_items(batch, chunks_per_item)
                 
                 # Batch upload all vectors
-                self.pinecone_manager.upsert_vectors(all_vectors)
+                self._upsert_batch(batch, [len(chunks) for chunks in chunks_per_item], all_vectors)
                 
             except Exception as e:
                 self._log(f"Error uploading batch to Pinecone: {str(e)}")
                 raise
 
+    def _build_chunk_records(
+        self,
+        qa_items: List[Dict[str, str]],
+        chunks_per_item: Optional[List[List[str]]] = None
+    ) -> List[Tuple[str, str, Dict]]:
+        """Split QA items into (vector id, chunk text, metadata) records, reusing chunks if given."""
+        if chunks_per_item is None:
+            chunks_per_item = [self.text_splitter.split_text(item['content']) for item in qa_items]
+        
+        records = []
+        for item, chunks in zip(qa_items, chunks_per_item):
+            for chunk_idx, chunk in enumerate(chunks):
+                records.append((
+                    f"{item['id']}-{chunk_idx}",
+                    chunk,
+                    {
+                        'text': chunk,
+                        'source': item['source'],
+                        'total_chunks': len(chunks)
+                    }
+                ))
+        return records
+
+    def _vectorize_items(
+        self,
+        qa_items: List[Dict[str, str]],
+        chunks_per_item: Optional[List[List[str]]] = None
+    ) -> List[Tuple[str, List[float], Dict]]:
+        """Build the Pinecone vectors of several QA items with one batched embedding call."""
+        records = self._build_chunk_records(qa_items, chunks_per_item)
+        embeddings = self.pinecone_manager.create_embeddings([text for _, text, _ in records])
+        return [
+            (vector_id, embedding, metadata)
+            for (vector_id, _, metadata), embedding in zip(records, embeddings)
+        ]
+
+    def _upsert_batch(
+        self,
+        qa_items: List[Dict[str, str]],
+        chunk_counts: List[int],
+        vectors: List[Tuple[str, List[float], Dict]],
+        lastmods: Optional[List[Optional[str]]] = None
+    ) -> None:
+        """Upsert the embedded vectors of some QA items, logging them first so a crash can replay them."""
+        if lastmods is None:
+            lastmods = [self._sitemap_lastmods.get(item['id']) for item in qa_items]
+        batch_id = self.document_store.log_upsert(
+            [
+                (item['id'], lastmod, chunk_count, content_hash(item['content']))
+                for item, lastmod, chunk_count in zip(qa_items, lastmods, chunk_counts)
+            ],
+            vectors
+        )
+        self.pinecone_manager.upsert_vectors(vectors)
+        self._mark_indexed(qa_items, chunk_counts, lastmods)
+        self._completed_batches.append(batch_id)
+        self._checkpoint()
+
+    def _checkpoint(self, force: bool = False) -> None:
+        """Persist the manifest and drop the upsert log entries it now covers, at most every CHECKPOINT_INTERVAL seconds."""
+        if not force and time.monotonic() - self._last_checkpoint < CHECKPOINT_INTERVAL:
+            return
+        # The manifest must reach the disk before the log entries it covers are dropped
+        self.manifest.save()
+        batch_ids, self._completed_batches = self._completed_batches, []
+        self.document_store.complete_upserts(batch_ids)
+        self._last_checkpoint = time.monotonic()
+
+    def _resume_pending(self) -> None:
+        """Finish the work of an interrupted run: replay logged upserts, then index the pending items."""
+        replayed = 0
+        for batch_id, entries, vectors in self.document_store.logged_upserts():
+            # Items changed since the batch was logged are still pending, their newer version is indexed below
+            indexed = [
+                (item, lastmod, chunk_count)
+                for item, (_, lastmod, chunk_count, hashed) in zip(
+                    (self.document_store.get(doc_id) for doc_id, _, _, _ in entries), entries
+                )
+                if item is not None and content_hash(item['content']) == hashed
+            ]
+            # Upserts are idempotent, replaying a batch that did reach the index is harmless
+            self.pinecone_manager.upsert_vectors(vectors)
+            self._mark_indexed(
+                [item for item, _, _ in indexed],
+                [chunk_count for _, _, chunk_count in indexed],
+                [lastmod for _, lastmod, _ in indexed]
+            )
+            self._completed_batches.append(batch_id)
+            replayed += 1
+        if replayed:
+            print(f"Replayed {replayed} logged upsert batches from an interrupted run.")
+            self._checkpoint(force=True)
+
+        pending = self.document_store.pending_count()
+        if not pending:
+            return
+        print(f"Indexing {pending} fatwas left pending by an interrupted run...")
+        for batch in self.document_store.iter_pending(batch_size=self.batch_size):
+            qa_items = [item for item, _ in batch]
+            chunks_per_item = [self.text_splitter.split_text(item['content']) for item in qa_items]
+            self._upsert_batch(
+                qa_items,
+                [len(chunks) for chunks in chunks_per_item],
+                self._vectorize_items(qa_items, chunks_per_item),
+                [lastmod for _, lastmod in batch]
+            )
+        self._checkpoint(force=True)
+
     def scrape_and_ingest(self) -> List[Dict[str, str]]:
         """Main function to scrape pages and ingest data."""
-        urls = self.parse_sitemap()
-        
-        # Load last updated time and filter URLs
-        last_updated = self._load_last_updated()
-        if last_updated:
-            # Convert lastmod to naive datetime for comparison
-            urls = [url for url in urls if url['lastmod'] and url['lastmod'].replace(tzinfo=None) >= last_updated]
-            
+        started_at = datetime.now()
+        self._resume_pending()
+        urls = self._get_urls_to_scrape()
         if not urls:
             print("No new content to scrape.")
-            self.upload_existing_items()
+            self._finish_ingestion()
             return []
             
         all_qa_items = []
+        changed_items = []
+        not_modified = 0
         
         with tqdm(total=len(urls), desc="Scraping fatwas") as pbar:
             for url_info in urls:
                 try:
-                    content = self.get_page_content(url_info['url'])
+                    result = self.fetcher.fetch(url_info['url'])
+                    pbar.update(1)
+                    if result.not_modified:
+                        not_modified += 1
+                        self._mark_not_modified(url_info)
+                        continue
+
                     qa_item = self.parse_qa_from_page(
-                        content,
+                        result.text,
                         url_info['url'],
                         url_info['id'],
                         url_info['lastmod']
@@ -330,23 +452,173 @@ class BaseQAScraper(ABC):
                     
                     if qa_item:
                         all_qa_items.append(qa_item)
+                        if self._needs_indexing(qa_item):
+                            # Checkpoint the item right away, an interrupted run resumes from the store
+                            self._save_qa_items([qa_item], mark_updated=False)
+                            changed_items.append(qa_item)
+                        self.fetcher.remember(result)
                         self._log(f"Scraped fatwa {qa_item['id']} from {url_info['url']}")
                     
-                    pbar.update(1)
-                    
                 except Exception as e:
                     self._log(f"Error processing URL {url_info['url']}: {str(e)}")
                     continue
         
-        if all_qa_items:
-            # Save to JSON before uploading to Pinecone
-            self._save_qa_items(all_qa_items)
-            
-            print(f"Uploading {len(all_qa_items)} fatwas to Pinecone...")
-            self.upload_to_pinecone(all_qa_items)
+        if not_modified:
+            print(f"Skipped {not_modified} unchanged pages.")
+        self._ingest_items(all_qa_items, changed_items)
+        self._mark_updated(started_at)
+        return all_qa_items
+
+    async def ascrape_and_ingest(self) -> Dict[str, StageStats]:
+        """
+        Scrape pages concurrently and ingest them as they arrive.
+
+        Crawling, chunking, embedding and upserting run as a pipeline over bounded queues,
+        see IngestionPipeline. Returns the stats of each pipeline stage.
+        """
+        started_at = datetime.now()
+        self._resume_pending()
+        last_updated = self._load_last_updated()
+        urls = (
+            url_info async for url_info in self.aiter_sitemap()
+            if self._is_new(url_info, last_updated)
+        )
+
+        parse_pool = self._create_parse_pool()
+        crawler = AsyncCrawler(
+            self,
+            self.fetcher,
+            workers=self.workers,
+            max_retries=self.max_retries,
+            min_delay=self.sleep_time,
+            parse_pool=parse_pool
+        )
+        pipeline = IngestionPipeline(self, crawler)
+        try:
+            stages = await pipeline.run(urls)
+        finally:
+            await self.fetcher.aclose()
+            if parse_pool is not None:
+                parse_pool.close()
+
+        if not crawler.stats.pages_queued:
+            print("No new content to scrape.")
+        else:
+            print(crawler.stats.summary())
+            print(pipeline.summary())
+
+        self._finish_ingestion()
+        if crawler.stats.pages_parsed:
+            # Pages changed after the run started are picked up by the next one
+            self._mark_updated(started_at)
+        print(f"Finished scraping. Total fatwas collected: {crawler.stats.pages_parsed}")
+        return stages
+
+    def _create_parse_pool(self) -> Optional[ParsePool]:
+        """Create the parser process pool, or None to parse pages in-process."""
+        if self.parse_workers <= 0:
+            return None
+        return ParsePool(
+            type(self),
+            workers=self.parse_workers,
+            scraper_kwargs={'debug': self.debug, 'html_parser': self.html_parser, 'parse_workers': 0}
+        )
+
+    def _get_urls_to_scrape(self) -> List[Dict[str, str]]:
+        """Parse the sitemap and keep the URLs modified since the last run."""
+        urls = self.parse_sitemap()
+        
+        # Load last updated time and filter URLs
+        last_updated = self._load_last_updated()
+        return [url for url in urls if self._is_new(url, last_updated)]
+
+    def _is_new(self, url_info: Dict[str, str], last_updated: Optional[datetime]) -> bool:
+        """Check if a sitemap entry was modified since it was last indexed."""
+        doc_id = url_info['id']
+        if doc_id in self.manifest:
+            return not self.manifest.is_current(
+                doc_id, self._sitemap_lastmods.get(doc_id), self.pinecone_manager.embedding_model
+            )
+        # Documents indexed before the manifest existed fall back to the global timestamp
+        if not last_updated:
+            return True
+        # Convert lastmod to naive datetime for comparison
+        return bool(url_info['lastmod']) and url_info['lastmod'].replace(tzinfo=None) >= last_updated
+
+    def _ingest_items(self, all_qa_items: List[Dict[str, str]], changed_items: List[Dict[str, str]]) -> None:
+        """Upload the changed items, already saved to the document store, to Pinecone."""
+        if changed_items:
+            print(f"Uploading {len(changed_items)} fatwas to Pinecone...")
+            self.upload_to_pinecone(changed_items)
+        if len(changed_items) < len(all_qa_items):
+            print(f"Skipped {len(all_qa_items) - len(changed_items)} fatwas with unchanged content.")
         
+        self._finish_ingestion()
         print(f"Finished scraping. Total fatwas collected: {len(all_qa_items)}")
-        return all_qa_items
+
+    def _needs_indexing(self, qa_item: Dict[str, str]) -> bool:
+        """Check if a scraped item differs from its indexed version, touching its lastmod if not."""
+        if self.manifest.is_unchanged(qa_item['id'], qa_item['content'], self.pinecone_manager.embedding_model):
+            self.manifest.touch(qa_item['id'], self._sitemap_lastmods.get(qa_item['id']))
+            return False
+        return True
+
+    def _mark_not_modified(self, url_info: Dict[str, str]) -> None:
+        """Record that a page answered a conditional GET with 304 Not Modified."""
+        self.manifest.touch(url_info['id'], self._sitemap_lastmods.get(url_info['id']))
+
+    def _mark_indexed(
+        self,
+        qa_items: List[Dict[str, str]],
+        chunk_counts: List[int],
+        lastmods: Optional[List[Optional[str]]] = None
+    ) -> None:
+        """Record upserted items in the manifest and delete chunks left over from longer versions."""
+        if lastmods is None:
+            lastmods = [self._sitemap_lastmods.get(item['id']) for item in qa_items]
+        stale_ids = []
+        for item, chunk_count in zip(qa_items, chunk_counts):
+            previous = self.manifest.get(item['id'])
+            if previous and previous['chunk_count'] > chunk_count:
+                stale_ids.extend(chunk_ids(item['id'], chunk_count, previous['chunk_count']))
+        if stale_ids:
+            self.pinecone_manager.delete_vectors(stale_ids)
+        
+        for item, chunk_count, lastmod in zip(qa_items, chunk_counts, lastmods):
+            self.manifest.record(
+                item['id'],
+                lastmod,
+                item['content'],
+                chunk_count,
+                self.pinecone_manager.embedding_model
+            )
+
+    def _prune_removed(self) -> int:
+        """Delete indexed fatwas that are no longer in the sitemap from Pinecone and the document store."""
+        # Without a complete sitemap a missing id does not mean the fatwa was removed
+        if self._sitemap_failures or not self._sitemap_lastmods:
+            return 0
+        removed = [doc_id for doc_id in self.manifest if doc_id not in self._sitemap_lastmods]
+        stale_ids = []
+        for doc_id in removed:
+            stale_ids.extend(chunk_ids(doc_id, 0, self.manifest.get(doc_id)['chunk_count']))
+        if stale_ids:
+            self.pinecone_manager.delete_vectors(stale_ids)
+        self.document_store.delete_many(removed)
+        self.document_store.clear_pending(removed)
+        for doc_id in removed:
+            self.manifest.remove(doc_id)
+        if removed:
+            print(f"Removed {len(removed)} fatwas that are no longer in the sitemap.")
+        return len(removed)
+
+    def _finish_ingestion(self) -> None:
+        """Prune removed fatwas, persist the manifest and validators of the run and rebuild the lexical index if the index changed."""
+        self._prune_removed()
+        self._checkpoint(force=True)
+        self.pinecone_manager.build_lexical_index()
+        # Only remember validators once the pages are indexed, so failed runs refetch them
+        self.fetcher.save_validators()
 
     @abstractmethod
     def _is_valid_fatwa_url(self, url: str) -> bool:
@@ -359,53 +631,58 @@ class BaseQAScraper(ABC):
         pass
 
     def _get_json_file_path(self) -> str:
-        """Get path for language-specific JSON file."""
-        os.makedirs('documents', exist_ok=True)
+        """Get path for the legacy language-specific JSON file, migrated into the document store."""
         return f'documents/fatwas_{self.language}.json'
+
+    def _get_document_store_path(self) -> str:
+        """Get path for the language-specific document store."""
+        return f'documents/fatwas_{self.language}.db'
+
+    def _get_validators_file_path(self) -> str:
+        """Get path for the language-specific HTTP validator store."""
+        return f'documents/validators_{self.language}.json'
+
+    def _get_manifest_file_path(self) -> str:
+        """Get path for the language-specific document manifest."""
+        return f'documents/manifest_{self.language}.json'
     
     def _load_last_updated(self) -> Optional[datetime]:
-        """Load last updated time from JSON file."""
-        file_path = self._get_json_file_path()
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return datetime.fromisoformat(data.get('last_updated'))
-        return None
+        """Load last updated time from the document store."""
+        return self.document_store.last_updated
     
-    def _save_qa_items(self, qa_items: List[Dict[str, str]]) -> None:
-        """Save QA items to JSON file by appending new data."""
-        file_path = self._get_json_file_path()
-        
-        # Load existing data or create new structure
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-                existing_data['data'].extend(qa_items)
-                existing_data['last_updated'] = datetime.now().isoformat()
-        else:
-            existing_data = {
-                'last_updated': datetime.now().isoformat(),
-                'data': qa_items
-            }
-        
-        # Write back to file
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, ensure_ascii=False, indent=2)
+    def _save_qa_items(
+        self,
+        qa_items: List[Dict[str, str]],
+        mark_updated: bool = True,
+        lastmods: Optional[List[Optional[str]]] = None
+    ) -> None:
+        """
+        Save QA items to the document store, replacing older versions of the same fatwas.
+
+        Saved items are marked as pending until they are indexed. With mark_updated=False the
+        last_updated time is left unchanged, ingestion saves items as they arrive and only
+        marks the run as complete once everything is indexed.
+        """
+        if lastmods is None:
+            lastmods = [self._sitemap_lastmods.get(item['id']) for item in qa_items]
+        self.document_store.put_many(
+            qa_items,
+            pending_lastmods={item['id']: lastmod for item, lastmod in zip(qa_items, lastmods)}
+        )
+        if mark_updated:
+            self._mark_updated(datetime.now())
+
+    def _mark_updated(self, when: datetime) -> None:
+        """Set the last_updated time of the document store."""
+        self.document_store.last_updated = when
 
     def upload_existing_items(self, limit: int = 10) -> None:
-        """Upload existing items from JSON file to Pinecone."""
-        file_path = self._get_json_file_path()
-        if not os.path.exists(file_path):
-            print(f"No existing file found at {file_path}")
+        """Upload existing items from the document store to Pinecone."""
+        if not len(self.document_store):
+            print(f"No items found in {self._get_document_store_path()}")
             return
             
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            items = data.get('data', [])
-            
-        if items:
-            print(f"Uploading {len(items)} items to Pinecone...")
+        print(f"Uploading {len(self.document_store)} items to Pinecone...")
+        for items in self.document_store.iter_items(batch_size=self.batch_size * 10):
             self.upload_to_pinecone(items)
-            print("Upload complete.")
-        else:
-            print("No items found in the JSON file.")
\ No newline at end of file
+        print("Upload complete.")
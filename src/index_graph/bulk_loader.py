@@ -0,0 +1,229 @@
+"""
+Bulk loader for fatwa dumps such as documents/fatawa.txt.
+
+A dump is a JSON array of {Id, Link, Question, Answer} records, with an optional LastModified
+taken from the sitemap. The array is decoded one record at a time, so memory does not grow
+with the dump. Each record is turned into the item shape parse_qa_from_page produces, with
+the same content text a crawl of the page would hash, and goes through the scraper's checkpointed
+batch path: document store, manifest, batched embeddings and the upsert writer. The
+upsert of one batch overlaps with embedding the next, so the load runs at embedding speed.
+
+Usage:
+    python -m src.index_graph.bulk_loader documents/fatawa.txt --language en
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+from bs4 import BeautifulSoup
+from src.index_graph.base_scraper import BaseQAScraper
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_html_tag = re.compile(r'</?[a-zA-Z][^>]*>')
+
+
+def iter_json_array(f: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array from a text stream, one at a time."""
+    buffer = ''
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # Skip whitespace and separators, reading more input when the buffer runs out
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and not started:
+            if buffer[pos] != '[':
+                raise ValueError("Expected a JSON array")
+            started = True
+            pos += 1
+            continue
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        if pos < len(buffer):
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element continues in the next chunk, unless there is none
+                if eof:
+                    raise
+            else:
+                # A value is complete once a separator follows it: a number cut at a chunk
+                # boundary, e.g. "-0" of "-0.5", still decodes and continues in the next chunk
+                if eof or (end < len(buffer) and buffer[end] in ' \t\r\n,]'):
+                    yield value
+                    pos = end
+                    continue
+        if eof:
+            raise ValueError("Unexpected end of JSON array")
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def record_text(scraper: BaseQAScraper, value: Any) -> str:
+    """Text of a dump field as the crawler extracts it from the page: paragraphs stripped and joined by spaces."""
+    text = str(value or '')
+    if not _html_tag.search(text):
+        return text.strip()
+    section = BeautifulSoup(f"<div>{text}</div>", scraper.html_parser).div
+    if section.find('p') is None:
+        return section.get_text(strip=True)
+    return scraper._extract_text_from_section(section)
+
+
+def record_lastmod(record: Dict[str, Any]) -> Optional[str]:
+    """Sitemap lastmod of a dump record, or None if the dump does not have one."""
+    lastmod = str(record.get('LastModified') or record.get('lastmod') or '').strip()
+    return lastmod or None
+
+
+def normalize_record(scraper: BaseQAScraper, record: Dict[str, Any], lastmod: datetime) -> Optional[Dict[str, str]]:
+    """Convert a dump record into the item shape of parse_qa_from_page, or None if it is incomplete."""
+    doc_id = str(record['Id']).strip() if record.get('Id') is not None else ''
+    link = (record.get('Link') or '').strip()
+    question = record_text(scraper, record.get('Question'))
+    answer = record_text(scraper, record.get('Answer'))
+    source = link if link.startswith('http') else f"{scraper._get_base_url()}{link}"
+    if not doc_id or not scraper._validate_qa_content(question, answer, source):
+        return None
+    sitemap_lastmod = record_lastmod(record)
+    if sitemap_lastmod:
+        try:
+            lastmod = datetime.fromisoformat(sitemap_lastmod.replace('Z', '+00:00'))
+        except ValueError:
+            pass
+    return {
+        'id': doc_id,
+        'question': question,
+        'answer': answer,
+        'source': source,
+        'last_modified': lastmod.strftime("%Y-%m-%d"),
+        'content': f"{scraper._get_question_label()}: {question}\n{scraper._get_answer_label()}: {answer}"
+    }
+
+
+@dataclass
+class BulkLoadStats:
+    """Counters collected during a bulk load."""
+    records: int = 0
+    invalid: int = 0
+    unchanged: int = 0
+    indexed: int = 0
+    chunks: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return max(end - self.started_at, 1e-9)
+
+    def summary(self) -> str:
+        return (
+            f"Read {self.records} records in {self.elapsed:.1f}s, indexed {self.indexed} "
+            f"({self.chunks} chunks, {self.chunks / self.elapsed:.1f} chunks/sec), "
+            f"unchanged {self.unchanged}, invalid {self.invalid}"
+        )
+
+
+def bulk_load(
+    scraper: BaseQAScraper,
+    path: str,
+    batch_size: Optional[int] = None,
+    lastmod: Optional[datetime] = None
+) -> BulkLoadStats:
+    """
+    Index every record of a dump file with the given scraper's storage and embeddings.
+
+    Args:
+        scraper: Scraper of the dump's language, its document store, manifest and index are used
+        path: Path of the JSON array dump
+        batch_size: Items embedded and upserted together, defaults to the scraper's batch_size
+        lastmod: Last modified date given to items without a LastModified, defaults to the file's modification time
+
+    Returns:
+        Load statistics
+    """
+    batch_size = batch_size or scraper.batch_size
+    lastmod = lastmod or datetime.fromtimestamp(os.path.getmtime(path))
+    stats = BulkLoadStats()
+    scraper._resume_pending()
+
+    # One upsert in flight while the next batch is embedded
+    upserts = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-upsert")
+    in_flight: Optional[Future] = None
+
+    def flush(batch: List[Tuple[Dict[str, str], Optional[str]]]) -> None:
+        nonlocal in_flight
+        changed, lastmods = [], []
+        for item, item_lastmod in batch:
+            if scraper.manifest.is_unchanged(item['id'], item['content'], scraper.pinecone_manager.embedding_model):
+                # Without a lastmod in the dump, the one recorded by the last crawl is kept
+                if item_lastmod:
+                    scraper.manifest.touch(item['id'], item_lastmod)
+                continue
+            changed.append(item)
+            lastmods.append(item_lastmod)
+        stats.unchanged += len(batch) - len(changed)
+        if not changed:
+            return
+        scraper._save_qa_items(changed, mark_updated=False, lastmods=lastmods)
+        chunks_per_item = [scraper.text_splitter.split_text(item['content']) for item in changed]
+        vectors = scraper._vectorize_items(changed, chunks_per_item)
+        if in_flight is not None:
+            in_flight.result()
+        in_flight = upserts.submit(
+            scraper._upsert_batch, changed, [len(chunks) for chunks in chunks_per_item], vectors, lastmods
+        )
+        stats.indexed += len(changed)
+        stats.chunks += len(vectors)
+
+    try:
+        batch: List[Tuple[Dict[str, str], Optional[str]]] = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for record in iter_json_array(f):
+                stats.records += 1
+                item = normalize_record(scraper, record, lastmod)
+                if item is None:
+                    stats.invalid += 1
+                    continue
+                batch.append((item, record_lastmod(record)))
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+        if batch:
+            flush(batch)
+        if in_flight is not None:
+            in_flight.result()
+        scraper.pinecone_manager.build_lexical_index()
+    finally:
+        upserts.shutdown(wait=True)
+        scraper._checkpoint(force=True)
+
+    stats.finished_at = time.monotonic()
+    print(stats.summary())
+    return stats
+
+
+if __name__ == "__main__":
+    from src.index_graph.scraper_ar import ArabicQAScraper
+    from src.index_graph.scraper_en import EnglishQAScraper
+
+    parser = argparse.ArgumentParser(description="Index a JSON dump of fatwas without crawling the site.")
+    parser.add_argument('path', help="JSON array of {Id, Link, Question, Answer[, LastModified]} records")
+    parser.add_argument('--language', choices=['ar', 'en'], default='en')
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+
+    scraper_cls = ArabicQAScraper if args.language == 'ar' else EnglishQAScraper
+    bulk_load(scraper_cls(debug=True), args.path, batch_size=args.batch_size)
@@ -0,0 +1,364 @@
+"""
+Asynchronous crawl engine used by the Q&A scrapers.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+import aiohttp
+from tqdm import tqdm
+from src.index_graph.fetcher import PageFetcher, FetchResult
+from src.index_graph.parsing import ParsePool
+from src.utilities.config import CRAWL_WORKERS
+
+
+class AdaptiveRateController:
+    """
+    AIMD controller for the number of in-flight requests and the spacing between them.
+
+    Healthy responses shrink the delay between requests and slowly widen the window
+    (additive increase); 429/5xx responses, network errors and latency spikes halve the
+    window and double the delay (multiplicative decrease). A Retry-After header pauses new requests until it expires.
+    """
+
+    def __init__(
+        self,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = CRAWL_WORKERS,
+        min_delay: float = 0.0,
+        max_delay: float = 30.0,
+        latency_spike_factor: float = 3.0,
+        min_spike_latency: float = 0.5,
+        increase_every: int = 10
+    ):
+        """
+        Args:
+            initial_concurrency: Number of requests allowed in flight at start
+            min_concurrency: Lower bound for the window
+            max_concurrency: Upper bound for the window
+            min_delay: Smallest delay in seconds between two request starts
+            max_delay: Largest delay in seconds between two request starts
+            latency_spike_factor: Latency above this multiple of the moving average counts as a spike
+            min_spike_latency: Latency in seconds below which a response never counts as a spike
+            increase_every: Healthy responses needed before widening the window by one
+        """
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(max_concurrency, min_concurrency)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.latency_spike_factor = latency_spike_factor
+        self.min_spike_latency = min_spike_latency
+        self.increase_every = increase_every
+
+        self._limit = float(min(max(initial_concurrency, min_concurrency), self.max_concurrency))
+        self._delay = min_delay
+        self._in_flight = 0
+        self._next_slot = 0.0
+        self._healthy_streak = 0
+        self._latency_avg: Optional[float] = None
+        self._cond = asyncio.Condition()
+
+        self.backoffs = 0
+
+    @property
+    def concurrency(self) -> int:
+        """Current number of requests allowed in flight."""
+        return max(self.min_concurrency, int(self._limit))
+
+    @property
+    def delay(self) -> float:
+        """Current delay in seconds between two request starts."""
+        return self._delay
+
+    async def acquire(self) -> None:
+        """Wait for a free slot in the window and for the request spacing to elapse."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.concurrency)
+            self._in_flight += 1
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def release(self, status: Optional[int], latency: float, retry_after: Optional[float] = None) -> None:
+        """
+        Free a slot and feed the outcome of the request back into the controller.
+
+        Args:
+            status: HTTP status code, or None if the request failed without a response
+            latency: Request duration in seconds
+            retry_after: Seconds requested by the server's Retry-After header, if any
+        """
+        async with self._cond:
+            self._in_flight -= 1
+            self._record(status, latency, retry_after)
+            self._cond.notify_all()
+
+    def _record(self, status: Optional[int], latency: float, retry_after: Optional[float]) -> None:
+        throttled = status is None or status == 429 or status >= 500
+        spike = (
+            not throttled
+            and self._latency_avg is not None
+            and latency > self.min_spike_latency
+            and latency > self.latency_spike_factor * self._latency_avg
+        )
+
+        if not throttled:
+            self._latency_avg = latency if self._latency_avg is None else 0.8 * self._latency_avg + 0.2 * latency
+
+        if throttled or spike:
+            self.backoffs += 1
+            self._healthy_streak = 0
+            self._limit = max(float(self.min_concurrency), self._limit / 2)
+            self._delay = min(self.max_delay, max(self._delay * 2, 0.1))
+            if retry_after:
+                self._delay = min(self.max_delay, max(self._delay, retry_after))
+                self._next_slot = max(self._next_slot, time.monotonic() + min(retry_after, self.max_delay))
+            return
+
+        self._delay = max(self.min_delay, self._delay * 0.8 if self._delay > 0.01 else self.min_delay)
+        self._healthy_streak += 1
+        if self._healthy_streak >= self.increase_every:
+            self._healthy_streak = 0
+            self._limit = min(float(self.max_concurrency), self._limit + 1)
+
+
+@dataclass
+class CrawlStats:
+    """Counters collected during a crawl."""
+    pages_queued: int = 0
+    pages_fetched: int = 0
+    pages_parsed: int = 0
+    pages_not_modified: int = 0
+    pages_failed: int = 0
+    retries: int = 0
+    bytes_downloaded: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return max(end - self.started_at, 1e-9)
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages_fetched / self.elapsed
+
+    def summary(self) -> str:
+        return (
+            f"Fetched {self.pages_fetched} pages in {self.elapsed:.1f}s "
+            f"({self.pages_per_second:.2f} pages/sec), parsed {self.pages_parsed}, "
+            f"not modified {self.pages_not_modified}, "
+            f"failed {self.pages_failed}, retries {self.retries}, "
+            f"{self.bytes_downloaded / 1_000_000:.1f} MB downloaded"
+        )
+
+
+class AsyncCrawler:
+    """
+    Crawl fatwa pages with a bounded pool of asyncio workers.
+
+    Pages are fetched through the scraper's shared PageFetcher (pooled, capped per host,
+    conditional) and handed to the scraper's ``parse_qa_from_page`` hook, so language-specific
+    scrapers work unchanged. Pages answered with 304 Not Modified are not parsed, they are
+    reported to the scraper's ``_mark_not_modified`` hook instead.
+    """
+
+    def __init__(
+        self,
+        scraper: Any,
+        fetcher: PageFetcher,
+        workers: int = CRAWL_WORKERS,
+        max_retries: int = 3,
+        min_delay: float = 0.0,
+        controller: Optional[AdaptiveRateController] = None,
+        parse_pool: Optional[ParsePool] = None
+    ):
+        """
+        Args:
+            scraper: A BaseQAScraper providing parse_qa_from_page, _mark_not_modified and _log
+            fetcher: Shared fetch layer used for all requests
+            workers: Number of concurrent worker tasks
+            max_retries: Maximum number of attempts per page
+            min_delay: Smallest delay in seconds between two request starts
+            controller: Rate controller, a default one is created if not given
+            parse_pool: Process pool for parsing, pages are parsed in-process if not given
+        """
+        self.scraper = scraper
+        self.fetcher = fetcher
+        self.workers = max(1, workers)
+        self.max_retries = max(1, max_retries)
+        self.min_delay = min_delay
+        self.controller = controller
+        self.parse_pool = parse_pool
+        self.stats = CrawlStats()
+        self._parse_tasks: Set[asyncio.Task] = set()
+        self._parse_slots: Optional[asyncio.Semaphore] = None
+
+    async def crawl(
+        self,
+        urls: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        on_item: Optional[Callable[[Dict[str, str]], Awaitable[None]]] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Fetch and parse all given sitemap entries.
+
+        Args:
+            urls: Sitemap entries with 'url', 'id' and 'lastmod' keys, either a list or an
+                async stream so crawling can start while the sitemap is still being read
+            on_item: Coroutine receiving each parsed item. When given, items are streamed to it
+                instead of being collected, and awaiting it applies backpressure to the crawl
+
+        Returns:
+            List of parsed QA items (empty when on_item is given)
+        """
+        if self.controller is None:
+            self.controller = AdaptiveRateController(
+                initial_concurrency=min(4, self.workers),
+                max_concurrency=self.workers,
+                min_delay=self.min_delay
+            )
+        self.stats = CrawlStats()
+        if self.parse_pool is not None:
+            # Bound the pages fetched but not parsed yet
+            self._parse_slots = asyncio.Semaphore(self.parse_pool.workers * self.parse_pool.chunk_size * 2)
+        results: List[Dict[str, str]] = []
+        self._on_item = on_item if on_item is not None else _appender(results)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        total = len(urls) if hasattr(urls, '__len__') else None
+
+        with tqdm(total=total, desc="Scraping fatwas") as pbar:
+            tasks = [
+                asyncio.create_task(self._worker(queue, pbar))
+                for _ in range(self.workers)
+            ]
+            try:
+                if hasattr(urls, '__aiter__'):
+                    async for url_info in urls:
+                        self.stats.pages_queued += 1
+                        await queue.put(url_info)
+                else:
+                    for url_info in urls:
+                        self.stats.pages_queued += 1
+                        await queue.put(url_info)
+                for _ in tasks:
+                    await queue.put(None)
+                await asyncio.gather(*tasks)
+                if self._parse_tasks:
+                    await asyncio.gather(*self._parse_tasks)
+            finally:
+                for task in self._parse_tasks:
+                    task.cancel()
+                for task in tasks:
+                    task.cancel()
+
+        self.stats.finished_at = time.monotonic()
+        return results
+
+    async def _worker(self, queue: asyncio.Queue, pbar: tqdm) -> None:
+        while True:
+            url_info = await queue.get()
+            if url_info is None:
+                return
+            try:
+                result = await self._fetch(url_info['url'])
+                if result is not None and result.not_modified:
+                    self.scraper._mark_not_modified(url_info)
+                elif result is not None:
+                    if self.parse_pool is None:
+                        await self._handle_parsed(
+                            self.scraper.parse_qa_from_page(result.text, url_info['url'], url_info['id'], url_info['lastmod']),
+                            result
+                        )
+                    else:
+                        # Keep fetching while the page is parsed in a worker process
+                        await self._parse_slots.acquire()
+                        task = asyncio.create_task(self._parse_in_pool(result, url_info))
+                        self._parse_tasks.add(task)
+                        task.add_done_callback(self._parse_tasks.discard)
+            except Exception as e:
+                self.stats.pages_failed += 1
+                self.scraper._log(f"Error processing URL {url_info['url']}: {str(e)}")
+            finally:
+                pbar.update(1)
+                pbar.set_postfix(
+                    pages_per_sec=f"{self.stats.pages_per_second:.1f}",
+                    concurrency=self.controller.concurrency
+                )
+
+    async def _parse_in_pool(self, result: FetchResult, url_info: Dict[str, Any]) -> None:
+        try:
+            qa_item = await self.parse_pool.aparse(result.text, url_info['url'], url_info['id'], url_info['lastmod'])
+            await self._handle_parsed(qa_item, result)
+        except Exception as e:
+            self.stats.pages_failed += 1
+            self.scraper._log(f"Error parsing URL {url_info['url']}: {str(e)}")
+        finally:
+            self._parse_slots.release()
+
+    async def _handle_parsed(self, qa_item: Optional[Dict[str, str]], result: FetchResult) -> None:
+        if qa_item:
+            self.fetcher.remember(result)
+            self.stats.pages_parsed += 1
+            await self._on_item(qa_item)
+            self.scraper._log(f"Scraped fatwa {qa_item['id']} from {result.url}")
+
+    async def _fetch(self, url: str) -> Optional[FetchResult]:
+        """Fetch a page, retrying throttled and failed requests. Returns None when all attempts fail."""
+        for attempt in range(self.max_retries):
+            await self.controller.acquire()
+            result = None
+            start = time.monotonic()
+            try:
+                result = await self.fetcher.afetch(url)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.scraper._log(f"Attempt {attempt + 1} failed for {url}: {str(e)}")
+            finally:
+                await self.controller.release(
+                    result.status if result else None,
+                    time.monotonic() - start,
+                    _parse_retry_after(result.retry_after) if result else None
+                )
+
+            if result is not None and result.status < 400:
+                self.stats.pages_fetched += 1
+                self.stats.bytes_downloaded += result.size
+                if result.not_modified:
+                    self.stats.pages_not_modified += 1
+                return result
+
+            if result is not None and result.status < 500 and result.status != 429:
+                self.scraper._log(f"Giving up on {url}: HTTP {result.status}")
+                break
+            if result is not None:
+                self.scraper._log(f"Attempt {attempt + 1} failed for {url}: HTTP {result.status}")
+            if attempt < self.max_retries - 1:
+                self.stats.retries += 1
+
+        self.stats.pages_failed += 1
+        return None
+
+
+def _appender(results: List[Dict[str, str]]) -> Callable[[Dict[str, str]], Awaitable[None]]:
+    async def append(qa_item: Dict[str, str]) -> None:
+        results.append(qa_item)
+    return append
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
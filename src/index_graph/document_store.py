@@ -0,0 +1,247 @@
+"""
+SQLite store for scraped fatwas.
+
+Replaces the fatwas_{lang}.json files, which were loaded and rewritten in full on every
+save. Items are upserted by id in WAL mode, so an ingest only writes the items it
+scraped, and reading the last update time or one fatwa does not load the corpus.
+
+The store also holds the ingestion checkpoints: items that were scraped but not indexed
+yet, and a write-ahead log of embedded batches that were not confirmed as upserted. A
+run that dies halfway is resumed from them without refetching or re-embedding.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.index_graph.manifest import content_hash
+
+Vector = Tuple[str, List[float], Dict[str, Any]]
+# (fatwa id, sitemap lastmod, chunk count, content hash) of each item in a logged upsert batch
+LogEntry = Tuple[str, Optional[str], int, str]
+
+_COLUMNS = ('id', 'question', 'answer', 'source', 'last_modified', 'content')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    source TEXT NOT NULL,
+    last_modified TEXT,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS pending (
+    id TEXT PRIMARY KEY,
+    lastmod TEXT,
+    content_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS upsert_log (
+    batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entries TEXT NOT NULL,
+    vectors TEXT NOT NULL,
+    dimension INTEGER NOT NULL,
+    vector_values BLOB NOT NULL
+);
+"""
+
+
+class DocumentStore:
+    """Scraped QA items keyed by fatwa id, plus a small key/value table for run metadata."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        # Ingestion saves from worker threads, access is serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM documents WHERE id = ?", (doc_id,)).fetchone() is not None
+
+    def get(self, doc_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM documents WHERE id = ?", (doc_id,)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def put_many(self, qa_items: Iterable[Dict[str, str]], pending_lastmods: Optional[Dict[str, Optional[str]]] = None) -> None:
+        """
+        Insert items, replacing the stored version of items that already exist.
+
+        Args:
+            qa_items: Items to store
+            pending_lastmods: Sitemap lastmod of each item, if given the items are also
+                marked as waiting to be indexed, in the same transaction
+        """
+        qa_items = list(qa_items)
+        rows = [tuple(item.get(column) for column in _COLUMNS) for item in qa_items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO documents ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                rows
+            )
+            if pending_lastmods is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO pending (id, lastmod, content_hash) VALUES (?, ?, ?)",
+                    [(item['id'], pending_lastmods.get(item['id']), content_hash(item['content'])) for item in qa_items]
+                )
+
+    def delete_many(self, doc_ids: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in doc_ids])
+
+    def iter_items(self, batch_size: int = 500) -> Iterator[List[Dict[str, str]]]:
+        """Stream all items in batches, without loading the whole table."""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT rowid, {', '.join(_COLUMNS)} FROM documents WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [dict(zip(_COLUMNS, row[1:])) for row in rows]
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def iter_pending(self, batch_size: int = 500) -> Iterator[List[Tuple[Dict[str, str], Optional[str]]]]:
+        """Stream the (item, sitemap lastmod) pairs of items waiting to be indexed, in batches."""
+        last_id = ''
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT p.id, p.lastmod, {', '.join('d.' + column for column in _COLUMNS)} "
+                    "FROM pending p JOIN documents d ON d.id = p.id WHERE p.id > ? ORDER BY p.id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [(dict(zip(_COLUMNS, row[2:])), row[1]) for row in rows]
+
+    def clear_pending(self, doc_ids: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM pending WHERE id = ?", [(doc_id,) for doc_id in doc_ids])
+
+    def log_upsert(self, entries: List[LogEntry], vectors: List[Vector]) -> int:
+        """
+        Durably record an embedded batch before it is sent to the vector index.
+
+        Returns:
+            Id of the logged batch, to pass to complete_upserts() once the batch is indexed
+        """
+        dimension = len(vectors[0][1]) if vectors else 0
+        values = array('f')
+        for _, embedding, _ in vectors:
+            values.extend(embedding)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO upsert_log (entries, vectors, dimension, vector_values) VALUES (?, ?, ?, ?)",
+                (
+                    json.dumps(entries, ensure_ascii=False),
+                    json.dumps([(vector_id, metadata) for vector_id, _, metadata in vectors], ensure_ascii=False),
+                    dimension,
+                    values.tobytes()
+                )
+            )
+            return cursor.lastrowid
+
+    def logged_upserts(self) -> Iterator[Tuple[int, List[LogEntry], List[Vector]]]:
+        """Yield the logged batches not completed yet, oldest first."""
+        last_batch_id = 0
+        while True:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT batch_id, entries, vectors, dimension, vector_values FROM upsert_log "
+                    "WHERE batch_id > ? ORDER BY batch_id LIMIT 1",
+                    (last_batch_id,)
+                ).fetchone()
+            if row is None:
+                return
+            last_batch_id, entries, vectors, dimension, blob = row
+            values = array('f')
+            values.frombytes(blob)
+            yield last_batch_id, [tuple(entry) for entry in json.loads(entries)], [
+                (vector_id, values[i * dimension:(i + 1) * dimension].tolist(), metadata)
+                for i, (vector_id, metadata) in enumerate(json.loads(vectors))
+            ]
+
+    def complete_upserts(self, batch_ids: Iterable[int]) -> None:
+        """
+        Drop indexed batches from the log and their items from the pending set. A pending
+        item is only dropped if it is the version the batch indexed: a newer version queued
+        since then, with another lastmod or content, stays pending.
+        """
+        batch_ids = list(batch_ids)
+        with self._lock, self._conn:
+            for batch_id in batch_ids:
+                row = self._conn.execute("SELECT entries FROM upsert_log WHERE batch_id = ?", (batch_id,)).fetchone()
+                if row is None:
+                    continue
+                self._conn.executemany(
+                    "DELETE FROM pending WHERE id = ? AND lastmod IS ? AND content_hash = ?",
+                    [(doc_id, lastmod, hashed) for doc_id, lastmod, _, hashed in json.loads(row[0])]
+                )
+                self._conn.execute("DELETE FROM upsert_log WHERE batch_id = ?", (batch_id,))
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: Optional[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def last_updated(self) -> Optional[datetime]:
+        value = self.get_meta('last_updated')
+        return datetime.fromisoformat(value) if value else None
+
+    @last_updated.setter
+    def last_updated(self, when: datetime) -> None:
+        self.set_meta('last_updated', when.isoformat())
+
+    def migrate_json(self, json_path: str) -> int:
+        """
+        Import a legacy fatwas_{lang}.json file, then rename it to ``<name>.migrated``.
+
+        Returns:
+            Number of imported items
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        items = data.get('data', [])
+        # Later entries are newer versions of the same fatwa, INSERT OR REPLACE keeps them
+        self.put_many(items)
+        if data.get('last_updated') and self.get_meta('last_updated') is None:
+            self.set_meta('last_updated', data['last_updated'])
+        os.replace(json_path, f"{json_path}.migrated")
+        return len(items)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
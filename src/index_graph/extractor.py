@@ -0,0 +1,84 @@
+"""
+Single-pass section extractor for fatwa pages.
+
+End markers are compiled once into predicates and the document is walked a single time
+from the section label, instead of calling find_next() and re-reading the markers for
+every node.
+"""
+
+from typing import Callable, Dict, List, Optional, Union
+from bs4 import BeautifulSoup, Tag
+from bs4.exceptions import FeatureNotFound
+
+Marker = Dict[str, str]
+Predicate = Callable[[Tag], bool]
+
+
+def _compile_condition(attr: str, value: str) -> Predicate:
+    """Compile one marker condition, keeping the substring/membership semantics of the markers."""
+    if attr == 'name':
+        return lambda tag: bool(tag.name) and value in tag.name
+    if attr == 'string':
+        def matches_text(tag: Tag) -> bool:
+            text = tag.get_text(strip=True)
+            return bool(text) and value in text
+        return matches_text
+
+    def matches_attr(tag: Tag) -> bool:
+        current = tag.get(attr, '')
+        return bool(current) and value in current
+    return matches_attr
+
+
+def _compile_marker(marker: Marker) -> Predicate:
+    """Compile a marker into a predicate that is true when every condition matches."""
+    # Cheap checks first, text extraction is only done for tags that already match
+    order = {'name': 0, 'string': 2}
+    conditions = [
+        _compile_condition(attr, value)
+        for attr, value in sorted(marker.items(), key=lambda item: order.get(item[0], 1))
+    ]
+    return lambda tag: all(condition(tag) for condition in conditions)
+
+
+class SectionExtractor:
+    """
+    Extract the paragraph text that follows a section label until an end marker.
+
+    A marker is a dict of conditions ('name', 'string' or any tag attribute) that must all
+    match; with a list of markers, extraction stops at the first tag matching any of them.
+    """
+
+    def __init__(self, until_tag: Optional[Union[Marker, List[Marker]]] = None):
+        markers = [] if not until_tag else until_tag if isinstance(until_tag, list) else [until_tag]
+        self._predicates = [_compile_marker(marker) for marker in markers]
+
+    def _is_end(self, tag: Tag) -> bool:
+        return any(predicate(tag) for predicate in self._predicates)
+
+    def extract(self, section: Tag) -> str:
+        seen_content = set()
+        content_parts = []
+
+        for element in section.next_elements:
+            if not isinstance(element, Tag):
+                continue
+            if self._predicates and self._is_end(element):
+                break
+            if element.name == 'p':
+                text = element.get_text(strip=True)
+                if text and text not in seen_content:
+                    content_parts.append(text)
+                    seen_content.add(text)
+
+        return ' '.join(content_parts)
+
+
+def resolve_parser_backend(name: str) -> str:
+    """Return the requested BeautifulSoup tree builder, or html.parser if it is not installed."""
+    try:
+        BeautifulSoup('', name)
+        return name
+    except FeatureNotFound:
+        print(f"HTML parser '{name}' is not available, falling back to html.parser")
+        return 'html.parser'
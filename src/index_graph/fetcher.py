@@ -0,0 +1,254 @@
+"""
+Shared HTTP fetch layer for the Q&A scrapers.
+
+Keeps connections alive across requests, accepts compressed responses and sends
+conditional GETs (ETag / If-Modified-Since) from an on-disk validator store so
+pages that did not change come back as 304 and skip parsing and embedding.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterator, Optional
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from src.utilities.config import CRAWL_WORKERS, CRAWL_PER_HOST_LIMIT, CRAWL_TIMEOUT
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _accept_encoding() -> str:
+    """Advertise brotli only when a decoder is installed, both requests and aiohttp need one."""
+    try:
+        import brotli  # noqa: F401
+        return "gzip, deflate, br"
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return "gzip, deflate, br"
+        except ImportError:
+            return "gzip, deflate"
+
+
+class ValidatorStore:
+    """JSON file mapping URLs to the ETag / Last-Modified validators of their last ingested version."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._validators: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._validators = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self._validators)
+
+    def get(self, url: str) -> Dict[str, str]:
+        """Return the stored validators for a URL (possibly empty)."""
+        return self._validators.get(url, {})
+
+    def update(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Remember the validators of a URL, the store is written on save()."""
+        validators = {}
+        if etag:
+            validators['etag'] = etag
+        if last_modified:
+            validators['last_modified'] = last_modified
+        with self._lock:
+            if validators:
+                self._validators[url] = validators
+            else:
+                self._validators.pop(url, None)
+
+    def save(self) -> None:
+        """Atomically write the store to disk."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._validators, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+@dataclass
+class FetchResult:
+    """Outcome of a single page fetch."""
+    url: str
+    status: int
+    text: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    retry_after: Optional[str] = None
+    size: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+class PageFetcher:
+    """
+    Pooled HTTP client shared by the sync and async scraping paths.
+
+    The sync path uses a requests Session with a keep-alive connection pool and retries,
+    and waits ``sleep_time`` seconds between consecutive requests. The async path uses a
+    lazily created aiohttp session, retries and rate control are left to the crawler.
+    """
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        validator_store: Optional[ValidatorStore] = None,
+        max_retries: int = 3,
+        sleep_time: float = 0,
+        timeout: float = CRAWL_TIMEOUT,
+        pool_size: int = CRAWL_WORKERS,
+        per_host_limit: int = CRAWL_PER_HOST_LIMIT,
+        log=print
+    ):
+        """
+        Args:
+            headers: Headers sent with every request
+            validator_store: Store used for conditional GETs, disabled if None
+            max_retries: Maximum number of attempts for sync requests
+            sleep_time: Delay in seconds between sync requests and between retries
+            timeout: Request timeout in seconds
+            pool_size: Maximum number of pooled connections
+            per_host_limit: Maximum number of connections per host for the async session
+            log: Callable used to report failed attempts
+        """
+        self.headers = {**headers, 'Accept-Encoding': _accept_encoding()}
+        self.validator_store = validator_store
+        self.max_retries = max(1, max_retries)
+        self.sleep_time = sleep_time
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.per_host_limit = per_host_limit
+        self._log = log
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._last_request = 0.0
+        self._throttle_lock = threading.Lock()
+        self._async_session: Optional[aiohttp.ClientSession] = None
+
+    def _conditional_headers(self, url: str) -> Dict[str, str]:
+        if self.validator_store is None:
+            return {}
+        validators = self.validator_store.get(url)
+        headers = {}
+        if 'etag' in validators:
+            headers['If-None-Match'] = validators['etag']
+        if 'last_modified' in validators:
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def _throttle(self) -> None:
+        """Keep at least sleep_time seconds between the start of two sync requests."""
+        if self.sleep_time <= 0:
+            return
+        with self._throttle_lock:
+            wait = self._last_request + self.sleep_time - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+
+    def fetch(self, url: str, conditional: bool = True) -> FetchResult:
+        """Fetch a URL with retries, raising the last error if every attempt fails."""
+        headers = self._conditional_headers(url) if conditional else {}
+        for attempt in range(self.max_retries):
+            try:
+                self._throttle()
+                start = time.monotonic()
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                response.raise_for_status()
+                response.encoding = 'utf-8'
+                not_modified = response.status_code == 304
+                return FetchResult(
+                    url=url,
+                    status=response.status_code,
+                    text=None if not_modified else response.text,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                    retry_after=response.headers.get('Retry-After'),
+                    size=len(response.content),
+                    elapsed=time.monotonic() - start
+                )
+            except requests.RequestException as e:
+                self._log(f"Attempt {attempt + 1} failed: {str(e)}")
+                if attempt == self.max_retries - 1:
+                    raise
+                time.sleep(self.sleep_time)
+
+    @contextmanager
+    def stream(self, url: str) -> Iterator[Iterator[bytes]]:
+        """Open a URL and yield an iterator over its decompressed body chunks."""
+        self._throttle()
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            yield response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        if self._async_session is None or self._async_session.closed:
+            self._async_session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.per_host_limit),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._async_session
+
+    async def afetch(self, url: str, conditional: bool = True) -> FetchResult:
+        """Fetch a URL once over the pooled aiohttp session. Error statuses are returned, not raised."""
+        session = self._get_async_session()
+        headers = self._conditional_headers(url) if conditional else {}
+        start = time.monotonic()
+        async with session.get(url, headers=headers) as response:
+            body = await response.read() if response.status < 300 else b''
+            return FetchResult(
+                url=url,
+                status=response.status,
+                text=body.decode('utf-8', errors='replace') if response.status < 300 else None,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                retry_after=response.headers.get('Retry-After'),
+                size=len(body),
+                elapsed=time.monotonic() - start
+            )
+
+    async def astream(self, url: str) -> AsyncIterator[bytes]:
+        """Yield the decompressed body of a URL chunk by chunk as it arrives."""
+        session = self._get_async_session()
+        # Large bodies may take longer than the request timeout, only bound each read
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.timeout)
+        async with session.get(url, timeout=timeout) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                yield chunk
+
+    def remember(self, result: FetchResult) -> None:
+        """Store the validators of a fetched page so the next run can send a conditional GET."""
+        if self.validator_store is not None and not result.not_modified:
+            self.validator_store.update(result.url, result.etag, result.last_modified)
+
+    def save_validators(self) -> None:
+        if self.validator_store is not None:
+            self.validator_store.save()
+
+    async def aclose(self) -> None:
+        """Close the async session, a new one is created on the next afetch."""
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,93 @@
+"""
+Per-document ingestion manifest.
+
+Records, for every indexed fatwa, the sitemap lastmod, a hash of its content, the number
+of chunks upserted and the embedding model used. Incremental runs compare against it to
+skip unchanged documents and to delete chunks that no longer exist.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Any
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def chunk_ids(doc_id: str, start: int, stop: int) -> List[str]:
+    """Vector ids of chunks start..stop-1 of a document."""
+    return [f"{doc_id}-{chunk_idx}" for chunk_idx in range(start, stop)]
+
+
+class DocumentManifest:
+    """JSON file mapping document ids to what was last indexed for them."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(doc_id)
+
+    def is_current(self, doc_id: str, lastmod: Optional[str], embedding_model: str) -> bool:
+        """Check if a document was indexed at this lastmod with this embedding model."""
+        entry = self._entries.get(doc_id)
+        return (
+            entry is not None
+            and entry.get('lastmod') == lastmod
+            and entry.get('embedding_model') == embedding_model
+        )
+
+    def is_unchanged(self, doc_id: str, text: str, embedding_model: str) -> bool:
+        """Check if a document was indexed with this exact content and embedding model."""
+        entry = self._entries.get(doc_id)
+        return (
+            entry is not None
+            and entry.get('content_hash') == content_hash(text)
+            and entry.get('embedding_model') == embedding_model
+        )
+
+    def record(self, doc_id: str, lastmod: Optional[str], text: str, chunk_count: int, embedding_model: str) -> None:
+        """Record a document as indexed, the manifest is written on save()."""
+        with self._lock:
+            self._entries[doc_id] = {
+                'lastmod': lastmod,
+                'content_hash': content_hash(text),
+                'chunk_count': chunk_count,
+                'embedding_model': embedding_model
+            }
+
+    def touch(self, doc_id: str, lastmod: Optional[str]) -> None:
+        """Update the lastmod of an indexed document whose content did not change."""
+        with self._lock:
+            if doc_id in self._entries:
+                self._entries[doc_id]['lastmod'] = lastmod
+
+    def remove(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.pop(doc_id, None)
+
+    def save(self) -> None:
+        """Atomically write the manifest to disk."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,129 @@
+"""
+Process-pool parsing stage for ingestion.
+
+BeautifulSoup parsing is CPU-bound, so pages are parsed in worker processes that each
+hold a parse-only scraper instance. Pages are submitted in chunks so the pickling and
+IPC cost is paid once per chunk rather than once per page.
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, Future
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+from src.utilities.config import PARSE_WORKERS, PARSE_CHUNK_SIZE
+
+Page = Tuple[str, str, str, datetime]  # (html_content, url, qa_id, lastmod)
+
+_worker_scraper = None
+
+
+def _init_worker(scraper_cls: Type, scraper_kwargs: Dict[str, Any]) -> None:
+    global _worker_scraper
+    _worker_scraper = scraper_cls(**scraper_kwargs)
+
+
+def _parse_chunk(pages: List[Page]) -> List[Optional[Dict[str, str]]]:
+    return [_worker_scraper.parse_qa_from_page(*page) for page in pages]
+
+
+class ParsePool:
+    """
+    Run a scraper's ``parse_qa_from_page`` in a ProcessPoolExecutor.
+
+    Use parse_many() for batches known up front, or aparse() from asyncio code: pages
+    passed to aparse() are buffered and sent to a worker once ``chunk_size`` pages are
+    waiting or ``max_delay`` seconds have passed.
+    """
+
+    def __init__(
+        self,
+        scraper_cls: Type,
+        workers: int = PARSE_WORKERS,
+        chunk_size: int = PARSE_CHUNK_SIZE,
+        max_delay: float = 0.05,
+        scraper_kwargs: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            scraper_cls: BaseQAScraper subclass instantiated once in every worker process
+            workers: Number of worker processes
+            chunk_size: Number of pages sent to a worker in one task
+            max_delay: Longest time in seconds a page waits in aparse() for its chunk to fill
+            scraper_kwargs: Keyword arguments for the worker scraper instances
+        """
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.max_delay = max_delay
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(scraper_cls, scraper_kwargs or {})
+        )
+        self._buffer: List[Tuple[Page, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def __enter__(self) -> 'ParsePool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._dispatch()
+        self._executor.shutdown(wait=True)
+
+    def parse_many(self, pages: Iterable[Page]) -> Iterator[Optional[Dict[str, str]]]:
+        """Parse pages in chunks, yielding results in input order."""
+        chunks = _chunked(pages, self.chunk_size)
+        for results in self._executor.map(_parse_chunk, chunks):
+            yield from results
+
+    async def aparse(self, html_content: str, url: str, qa_id: str, lastmod: datetime) -> Optional[Dict[str, str]]:
+        """Parse one page in a worker process, sharing the task with other buffered pages."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._buffer.append(((html_content, url, qa_id, lastmod), future))
+        if len(self._buffer) >= self.chunk_size:
+            self._dispatch()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        futures = [future for _, future in batch]
+        task = self._executor.submit(_parse_chunk, [page for page, _ in batch])
+        loop = futures[0].get_loop()
+        task.add_done_callback(lambda done: loop.call_soon_threadsafe(_resolve, futures, done))
+
+
+def _resolve(futures: List[asyncio.Future], done: Future) -> None:
+    if done.cancelled():
+        for future in futures:
+            future.cancel()
+        return
+    error = done.exception()
+    results = [None] * len(futures) if error else done.result()
+    for future, result in zip(futures, results):
+        if future.done():
+            continue
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+def _chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,242 @@
+"""
+Pipelined ingestion: crawl -> chunk -> embed -> upsert.
+
+Stages run concurrently and are connected by bounded asyncio queues, so embedding and
+upserting start with the first crawled pages and a slow stage pushes back on the ones
+before it. Peak memory depends on the queue sizes, not on the size of the corpus.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from src.index_graph.crawler import AsyncCrawler
+from src.utilities.config import PIPELINE_QUEUE_SIZE, EMBEDDING_BATCH_SIZE
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Throughput and queue depth of one pipeline stage."""
+    name: str
+    inbox: Optional[asyncio.Queue] = None
+    processed: int = 0
+    skipped: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return max(end - self.started_at, 1e-9)
+
+    @property
+    def throughput(self) -> float:
+        """Items processed per second of wall time."""
+        return self.processed / self.elapsed
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of items currently waiting for this stage."""
+        return self.inbox.qsize() if self.inbox is not None else 0
+
+    def observe_queue(self) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def summary(self) -> str:
+        skipped = f" ({self.skipped} skipped)" if self.skipped else ""
+        return (
+            f"{self.name}: {self.processed} items{skipped}, {self.throughput:.2f} items/sec, "
+            f"busy {self.busy_seconds:.1f}s, queue {self.queue_depth} (max {self.max_queue_depth})"
+        )
+
+
+class IngestionPipeline:
+    """
+    Run crawling, chunking, embedding and upserting for a scraper as overlapping stages.
+
+    Stage outputs:
+        crawl  -> parsed QA items
+        chunk  -> (item, chunks) pairs of changed items, which are also saved to the document
+                  store in batches; items whose content is already indexed are skipped
+        embed  -> vectors of the items whose chunks were embedded together
+        upsert -> vectors logged and sent to Pinecone, batch_size items per request, and
+                  the items recorded in the manifest
+    """
+
+    def __init__(
+        self,
+        scraper: Any,
+        crawler: AsyncCrawler,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+        report_every: float = 30.0
+    ):
+        """
+        Args:
+            scraper: The BaseQAScraper whose chunking, embedding and storage are used
+            crawler: Crawler producing the parsed items
+            queue_size: Capacity of each queue between stages
+            embedding_batch_size: Number of chunks the embed stage tries to gather per call
+            report_every: Seconds between progress reports in debug mode
+        """
+        self.scraper = scraper
+        self.crawler = crawler
+        self.queue_size = max(1, queue_size)
+        self.embedding_batch_size = max(1, embedding_batch_size)
+        self.report_every = report_every
+        self.stages: Dict[str, StageStats] = {}
+
+    async def run(self, urls: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]) -> Dict[str, StageStats]:
+        """
+        Ingest all given sitemap entries.
+
+        Returns:
+            Stats for each stage, keyed by stage name
+        """
+        items: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        chunked: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        vectors: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self.stages = {
+            'crawl': StageStats('crawl'),
+            'chunk': StageStats('chunk', items),
+            'embed': StageStats('embed', chunked),
+            'upsert': StageStats('upsert', vectors),
+        }
+
+        tasks = [
+            asyncio.create_task(self._crawl(urls, items)),
+            asyncio.create_task(self._chunk(items, chunked)),
+            asyncio.create_task(self._embed(chunked, vectors)),
+            asyncio.create_task(self._upsert(vectors)),
+        ]
+        reporter = asyncio.create_task(self._report())
+        try:
+            # Fail fast: the first stage error cancels the whole pipeline
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception():
+                    raise task.exception()
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks + [reporter]:
+                task.cancel()
+        return self.stages
+
+    async def _crawl(self, urls, items: asyncio.Queue) -> None:
+        stats = self.stages['crawl']
+
+        async def forward(qa_item: Dict[str, str]) -> None:
+            stats.processed += 1
+            await items.put(qa_item)
+            self.stages['chunk'].observe_queue()
+
+        try:
+            await self.crawler.crawl(urls, on_item=forward)
+        finally:
+            stats.busy_seconds = stats.elapsed
+            stats.finished_at = time.monotonic()
+        await items.put(_DONE)
+
+    async def _chunk(self, items: asyncio.Queue, chunked: asyncio.Queue) -> None:
+        stats = self.stages['chunk']
+        finished = False
+        while not finished:
+            batch, finished = await _next_batch(items, self.scraper.batch_size)
+            if not batch:
+                continue
+            start = time.monotonic()
+            changed = [qa_item for qa_item in batch if self.scraper._needs_indexing(qa_item)]
+            stats.skipped += len(batch) - len(changed)
+            if changed:
+                # Checkpoint the items before they move on, an interrupted run resumes from the store
+                await asyncio.to_thread(self.scraper._save_qa_items, changed, False)
+            entries = [(qa_item, self.scraper.text_splitter.split_text(qa_item['content'])) for qa_item in changed]
+            stats.busy_seconds += time.monotonic() - start
+            stats.processed += len(changed)
+            for entry in entries:
+                await chunked.put(entry)
+                self.stages['embed'].observe_queue()
+        stats.finished_at = time.monotonic()
+        await chunked.put(_DONE)
+
+    async def _embed(self, chunked: asyncio.Queue, vectors: asyncio.Queue) -> None:
+        stats = self.stages['embed']
+        finished = False
+        while not finished:
+            # Gather chunks across documents into one embedding batch, without waiting
+            # for more items than are already queued
+            batch, finished = await _next_batch(chunked, self.embedding_batch_size, size=lambda entry: len(entry[1]))
+            if not batch:
+                continue
+            qa_items = [qa_item for qa_item, _ in batch]
+            start = time.monotonic()
+            batch_vectors = await asyncio.to_thread(
+                self.scraper._vectorize_items, qa_items, [chunks for _, chunks in batch]
+            )
+            stats.busy_seconds += time.monotonic() - start
+            stats.processed += len(batch)
+            await vectors.put((batch, batch_vectors))
+            self.stages['upsert'].observe_queue()
+        stats.finished_at = time.monotonic()
+        await vectors.put(_DONE)
+
+    async def _upsert(self, vectors: asyncio.Queue) -> None:
+        stats = self.stages['upsert']
+        batch: List[tuple] = []
+        items: List[tuple] = []
+        while True:
+            entry = await vectors.get()
+            if entry is not _DONE:
+                embedded_items, batch_vectors = entry
+                batch.extend(batch_vectors)
+                items.extend(embedded_items)
+            if batch and (entry is _DONE or len(items) >= self.scraper.batch_size):
+                start = time.monotonic()
+                try:
+                    await asyncio.to_thread(
+                        self.scraper._upsert_batch,
+                        [qa_item for qa_item, _ in items],
+                        [len(chunks) for _, chunks in items],
+                        batch
+                    )
+                except Exception as e:
+                    self.scraper._log(f"Error uploading batch to Pinecone: {str(e)}")
+                    raise
+                stats.busy_seconds += time.monotonic() - start
+                stats.processed += len(items)
+                batch, items = [], []
+            if entry is _DONE:
+                break
+        stats.finished_at = time.monotonic()
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.report_every)
+            self.scraper._log(" | ".join(stats.summary() for stats in self.stages.values()))
+
+    def summary(self) -> str:
+        return "\n".join(stats.summary() for stats in self.stages.values())
+
+
+async def _next_batch(queue: asyncio.Queue, limit: int, size: Callable[[Any], int] = lambda entry: 1) -> Tuple[List[Any], bool]:
+    """
+    Wait for one entry, then take the entries already queued until their total size reaches limit.
+
+    Returns:
+        The entries and whether the end of the stream was reached
+    """
+    entry = await queue.get()
+    if entry is _DONE:
+        return [], True
+    batch, total = [entry], size(entry)
+    while total < limit and not queue.empty():
+        entry = queue.get_nowait()
+        if entry is _DONE:
+            return batch, True
+        batch.append(entry)
+        total += size(entry)
+    return batch, False
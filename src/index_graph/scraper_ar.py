@@ -1,9 +1,10 @@
 """Arabic Q&A scraper implementation."""
 
+import asyncio
 from datetime import datetime
 from src.index_graph.base_scraper import BaseQAScraper
-from src.utilities.pinecone_manager import PineconeManager
-from retrieval_graph.config import PINECONE_INDEX_NAME_AR
+from src.utilities.pinecone_manager import PineconeManager, get_pinecone_manager
+from src.utilities.config import PINECONE_INDEX_NAME_AR
 from typing import Dict, Optional
 from bs4 import BeautifulSoup, Tag
 
@@ -11,7 +12,7 @@ class ArabicQAScraper(BaseQAScraper):
     language = 'ar'
 
     def _init_pinecone(self) -> PineconeManager:
-        return PineconeManager(index_name=PINECONE_INDEX_NAME_AR)
+        return get_pinecone_manager(index_name=PINECONE_INDEX_NAME_AR)
 
     def _get_base_url(self) -> str:
         return "https://www.dar-alifta.org"
@@ -61,4 +62,4 @@ class ArabicQAScraper(BaseQAScraper):
 
 if __name__ == "__main__":
     scraper = ArabicQAScraper(debug=True)
-    scraper.scrape_and_ingest()
\ No newline at end of file
+    asyncio.run(scraper.ascrape_and_ingest())
\ No newline at end of file
@@ -1,8 +1,9 @@
 """English Q&A scraper implementation."""
 
+import asyncio
 from src.index_graph.base_scraper import BaseQAScraper
-from src.utilities.pinecone_manager import PineconeManager
-from retrieval_graph.config import PINECONE_INDEX_NAME_EN
+from src.utilities.pinecone_manager import PineconeManager, get_pinecone_manager
+from src.utilities.config import PINECONE_INDEX_NAME_EN
 from typing import Dict, Optional
 from bs4 import BeautifulSoup, Tag
 
@@ -10,7 +11,7 @@ class EnglishQAScraper(BaseQAScraper):
     language = 'en'
 
     def _init_pinecone(self) -> PineconeManager:
-        return PineconeManager(index_name=PINECONE_INDEX_NAME_EN)
+        return get_pinecone_manager(index_name=PINECONE_INDEX_NAME_EN)
 
     def _get_base_url(self) -> str:
         return "https://www.dar-alifta.org"
@@ -66,4 +67,4 @@ class EnglishQAScraper(BaseQAScraper):
 
 if __name__ == "__main__":
     scraper = EnglishQAScraper(debug=True)
-    scraper.scrape_and_ingest()
\ No newline at end of file
+    asyncio.run(scraper.ascrape_and_ingest())
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+Streaming sitemap parser with sitemap-index support.
+
+Sitemaps are parsed incrementally as their bytes arrive, so entries reach the crawl
+queue before the download finishes and memory stays flat however large the sitemap grows.
+"""
+
+import asyncio
+import xml.etree.ElementTree as ET
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from src.index_graph.fetcher import PageFetcher
+
+# Some sitemaps are served with leading junk, parsing starts at the first root element
+_ROOT_TAGS = (b'<urlset', b'<sitemapindex')
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child_text(element: ET.Element, name: str) -> Optional[str]:
+    for child in element:
+        if _local_name(child.tag) == name:
+            return child.text.strip() if child.text else None
+    return None
+
+
+class SitemapStreamParser:
+    """
+    Incremental parser for <urlset> and <sitemapindex> documents.
+
+    Feed it raw bytes with feed(); it yields ('url', {'loc', 'lastmod'}) for page entries
+    and ('sitemap', {'loc', 'lastmod'}) for child sitemaps, dropping each element once read.
+    """
+
+    def __init__(self):
+        self._parser: Optional[ET.XMLPullParser] = None
+        self._root: Optional[ET.Element] = None
+        self._prefix = b''
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[str, Dict[str, Optional[str]]]]:
+        if self._parser is None:
+            buffer = self._prefix + chunk
+            starts = [i for i in (buffer.find(tag) for tag in _ROOT_TAGS) if i != -1]
+            if not starts:
+                # Keep enough bytes to match a root tag split across chunks
+                self._prefix = buffer[-len(b'<sitemapindex'):]
+                return
+            self._parser = ET.XMLPullParser(events=('start', 'end'))
+            self._prefix = b''
+            chunk = buffer[min(starts):]
+        self._parser.feed(chunk)
+        yield from self._read_events()
+
+    def close(self) -> Iterator[Tuple[str, Dict[str, Optional[str]]]]:
+        if self._parser is None:
+            raise ValueError("Could not find XML content in response")
+        self._parser.close()
+        yield from self._read_events()
+
+    def _read_events(self) -> Iterator[Tuple[str, Dict[str, Optional[str]]]]:
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = element
+                continue
+            name = _local_name(element.tag)
+            if name not in ('url', 'sitemap'):
+                continue
+            yield name, {
+                'loc': _child_text(element, 'loc'),
+                'lastmod': _child_text(element, 'lastmod')
+            }
+            if self._root is not None:
+                try:
+                    self._root.remove(element)
+                except ValueError:
+                    pass
+
+
+def iter_sitemap(
+    fetcher: PageFetcher,
+    url: str,
+    log: Callable[[str], None] = print,
+    failed: Optional[List[str]] = None
+) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Stream the page entries of a sitemap, following sitemap-index children one after another.
+
+    Errors on the root sitemap are raised, errors on child sitemaps are logged and skipped,
+    and the child URL is appended to ``failed`` if given.
+    """
+    pending: List[str] = [url]
+    seen: Set[str] = {url}
+    while pending:
+        sitemap_url = pending.pop(0)
+        try:
+            parser = SitemapStreamParser()
+            with fetcher.stream(sitemap_url) as chunks:
+                for chunk in chunks:
+                    for kind, entry in parser.feed(chunk):
+                        if kind == 'url':
+                            yield entry
+                        elif entry['loc'] and entry['loc'] not in seen:
+                            seen.add(entry['loc'])
+                            pending.append(entry['loc'])
+            for kind, entry in parser.close():
+                if kind == 'url':
+                    yield entry
+                elif entry['loc'] and entry['loc'] not in seen:
+                    seen.add(entry['loc'])
+                    pending.append(entry['loc'])
+        except Exception as e:
+            if sitemap_url == url:
+                raise
+            log(f"Error parsing child sitemap {sitemap_url}: {str(e)}")
+            if failed is not None:
+                failed.append(sitemap_url)
+
+
+async def aiter_sitemap(
+    fetcher: PageFetcher,
+    url: str,
+    max_concurrency: int = 4,
+    log: Callable[[str], None] = print,
+    failed: Optional[List[str]] = None
+) -> AsyncIterator[Dict[str, Optional[str]]]:
+    """
+    Stream the page entries of a sitemap, downloading sitemap-index children concurrently.
+
+    Errors on the root sitemap are raised once the other sitemaps are drained, errors on
+    child sitemaps are logged and skipped, and the child URL is appended to ``failed`` if given.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    seen: Set[str] = {url}
+    tasks: List[asyncio.Task] = []
+    errors: List[Exception] = []
+    done = object()
+
+    async def crawl(sitemap_url: str) -> None:
+        try:
+            async with semaphore:
+                parser = SitemapStreamParser()
+                async for chunk in fetcher.astream(sitemap_url):
+                    for kind, entry in parser.feed(chunk):
+                        await handle(kind, entry)
+                for kind, entry in parser.close():
+                    await handle(kind, entry)
+        except Exception as e:
+            if sitemap_url == url:
+                errors.append(e)
+            else:
+                log(f"Error parsing child sitemap {sitemap_url}: {str(e)}")
+                if failed is not None:
+                    failed.append(sitemap_url)
+        finally:
+            await queue.put(done)
+
+    async def handle(kind: str, entry: Dict[str, Optional[str]]) -> None:
+        if kind == 'url':
+            await queue.put(entry)
+        elif entry['loc'] and entry['loc'] not in seen:
+            seen.add(entry['loc'])
+            tasks.append(asyncio.create_task(crawl(entry['loc'])))
+
+    tasks.append(asyncio.create_task(crawl(url)))
+    finished = 0
+    try:
+        while finished < len(tasks):
+            item = await queue.get()
+            if item is done:
+                finished += 1
+                continue
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if errors:
+        raise errors[0]
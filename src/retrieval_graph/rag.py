@@ -6,7 +6,10 @@ from langchain_core.runnables import RunnableConfig
 from langchain_core.prompts import ChatPromptTemplate
 from src.retrieval_graph.models import (language_detector, ainvoke, acall_generate_query)
 from src.utilities.retrieval import aretrieve_documents
+from src.utilities.pinecone_manager import warm_up
+from src.utilities.cache_stats import start_stats_logger
 from src.utilities.state import State
+from src.utilities.answer_cache import astore_answer, first_turn_question, lookup_cached_answer, route_cached_answer
 from src.utilities.utils import sources_in_markdown
 from src.utilities.prompts import (QUESTION_ROUTER_PROMPT, RESPONDER_PROMPT, QUERY_SYSTEM_PROMPT,
     RESPONSE_SYSTEM_PROMPT, SUMMARIZE_PROMPT)
@@ -87,6 +90,9 @@ async def model_node(state: State, *, config: RunnableConfig) -> Dict[str, Any]:
         "sources": state.sources}, config)
 
     response = await ainvoke(message_value, config)
+    question = first_turn_question(state.messages)
+    if question:
+        await astore_answer(question, response.content)
     return {
         "messages": [AIMessage(id=response.id, content=response.content)]
     }
@@ -161,6 +167,7 @@ async def should_summarize(state: State) -> str:
 graph_builder = StateGraph(State)
     
 # Add nodes
+graph_builder.add_node("lookup_cached_answer", lookup_cached_answer)
 graph_builder.add_node("generate_query", generate_query)
 graph_builder.add_node("retrieve", retrieval_node)
 graph_builder.add_node("generate_answer", model_node)
@@ -168,7 +175,15 @@ graph_builder.add_node("respond", respond_node)
 graph_builder.add_node("summarize", summarize_node)
 
 # Add edges
-graph_builder.add_edge(START, "generate_query")
+graph_builder.add_edge(START, "lookup_cached_answer")
+graph_builder.add_conditional_edges(
+    "lookup_cached_answer",
+    route_cached_answer,
+    {
+        "generate_query": "generate_query",
+        "END": END,
+    },
+)
 graph_builder.add_conditional_edges(
     "generate_query",
     route_question,
@@ -195,4 +210,8 @@ graph_builder.add_conditional_edges(
     },
 )
 graph_builder.add_edge("summarize", END)
-graph = graph_builder.compile()
\ No newline at end of file
+graph = graph_builder.compile()
+
+# Load the embedding models and check the indexes when the server loads the graph, before the first request
+warm_up()
+start_stats_logger()
@@ -3,6 +3,8 @@ from langchain_core.runnables import RunnableConfig
 from typing import Dict
 from typing import Any
 from src.utilities.retrieval import aretrieve_documents
+from src.utilities.pinecone_manager import warm_up
+from src.utilities.cache_stats import cache_stats, start_stats_logger
 from src.utilities.utils import sources_in_markdown
 
 mcp = FastMCP("DarAlIftaa")
@@ -25,5 +27,13 @@ async def retrieve_islamic_docs(question: str, is_arabic: bool, config: Runnable
         "context": result["context"] + sources_in_markdown(result["sources"], is_arabic)
     }
 
+@mcp.resource("stats://caches")
+def serving_cache_stats() -> Dict[str, Dict[str, float]]:
+    """Hit/miss counters of the query embedding, retrieval and answer caches and of the reranker."""
+    return cache_stats()
+
 if __name__ == "__main__":
+    # Load the embedding models and check the indexes before the first request
+    warm_up()
+    start_stats_logger()
     mcp.run(transport="sse")
\ No newline at end of file
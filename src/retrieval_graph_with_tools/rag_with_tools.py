@@ -8,6 +8,9 @@ from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, Remo
 from src.retrieval_graph_with_tools.models import (acall_generate_query, acall_model_with_tools, acall_reasoner)
 from src.retrieval_graph_with_tools.tools import TOOLS
 from src.utilities.state import State
+from src.utilities.pinecone_manager import warm_up
+from src.utilities.cache_stats import start_stats_logger
+from src.utilities.answer_cache import astore_answer, first_turn_question, lookup_cached_answer, route_cached_answer
 from src.utilities.prompts import (QUERY_SYSTEM_PROMPT, RESPONSE_SYSTEM_PROMPT_WITH_TOOLS, SUMMARIZE_PROMPT)
 
 async def generate_query(state: State, *, config: RunnableConfig) -> Dict[str, Any]:
@@ -69,6 +72,12 @@ async def answer(state: State, *, config: RunnableConfig) -> Dict[str, Any]:
         response = await acall_reasoner(message_value, config)
     else:
         response = await acall_model_with_tools(message_value, config)
+    # Cache final answers grounded in retrieved documents
+    question = first_turn_question(state.messages)
+    if question and not response.tool_calls and any(
+        message.type == "tool" and message.name == "retrieve_islamic_docs" for message in state.messages
+    ):
+        await astore_answer(question, response.content)
     return {
         "messages": [response]
     }
@@ -127,13 +136,22 @@ def get_filtered_messages(state: State) -> List[BaseMessage]:
 graph_builder = StateGraph(State)
     
 # Add nodes
+graph_builder.add_node("lookup_cached_answer", lookup_cached_answer)
 graph_builder.add_node("generate_query", generate_query)
 graph_builder.add_node("answer", answer)
 graph_builder.add_node("summarize", summarize)
 graph_builder.add_node("tools", ToolNode(TOOLS))
 
 # Add edges
-graph_builder.add_edge(START, "generate_query")
+graph_builder.add_edge(START, "lookup_cached_answer")
+graph_builder.add_conditional_edges(
+    "lookup_cached_answer",
+    route_cached_answer,
+    {
+        "generate_query": "generate_query",
+        "END": END,
+    },
+)
 graph_builder.add_edge("generate_query", "answer")
 graph_builder.add_conditional_edges(
     "answer",
@@ -146,4 +164,8 @@ graph_builder.add_conditional_edges(
 )
 graph_builder.add_edge("tools", "answer")
 graph_builder.add_edge("summarize", END)
-graph = graph_builder.compile()
\ No newline at end of file
+graph = graph_builder.compile()
+
+# Load the embedding models and check the indexes when the server loads the graph, before the first request
+warm_up()
+start_stats_logger()
@@ -0,0 +1,202 @@
+"""
+Semantic cache of final answers for first-turn questions.
+
+Questions are embedded with the model of their language's index (the same shared model
+and query cache retrieval uses) and compared with the cached questions of that index in
+one matrix product. A question whose cosine similarity with a cached one reaches
+ANSWER_CACHE_THRESHOLD gets the cached final message, without routing, retrieval or
+generation. The response prompts have the model render the sources in that message, so
+they are cached with the answer text.
+
+Follow-up turns depend on the conversation, so only first-turn questions are looked up
+and stored. The answers of an index are dropped when its generation changes, i.e. after
+every re-ingest, see retrieval_cache.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from src.utilities.config import (
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL,
+    PINECONE_INDEX_NAME_AR,
+    PINECONE_INDEX_NAME_EN
+)
+from src.utilities.pinecone_manager import aget_pinecone_manager
+from src.utilities.retrieval_cache import get_index_generation
+from src.utilities.state import State
+from src.utilities.utils import detect_language
+
+
+class SemanticAnswerCache:
+    """Answers of one index, looked up by the cosine similarity of their questions."""
+
+    def __init__(self, index_name: str, capacity: int = ANSWER_CACHE_SIZE, threshold: float = ANSWER_CACHE_THRESHOLD, ttl: float = ANSWER_CACHE_TTL):
+        """
+        Args:
+            index_name: Index the answers were retrieved from
+            capacity: Maximum number of cached answers, the least recently used are evicted
+            threshold: Minimum cosine similarity between a question and a cached one to reuse its answer
+            ttl: Seconds an answer is served for
+        """
+        self.index_name = index_name
+        self.capacity = max(1, capacity)
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # capacity x dimension unit vectors, allocated on first put
+        self._answers: List[Optional[str]] = [None] * self.capacity
+        self._expires = np.full(self.capacity, -np.inf)
+        self._last_used = np.zeros(self.capacity, dtype=np.int64)
+        self._clock = 0
+        self.generation: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_generation(self, generation: int) -> None:
+        if self.generation is not None and generation != self.generation and len(self):
+            self._expires[:] = -np.inf
+            self._answers = [None] * self.capacity
+            self.invalidations += 1
+        self.generation = generation
+
+    def get(self, vector: Sequence[float], generation: int) -> Optional[str]:
+        """Return the answer of the most similar cached question, if similar enough."""
+        query = _unit(vector)
+        with self._lock:
+            self._check_generation(generation)
+            if self._vectors is None or len(query) != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+            scores = self._vectors @ query
+            scores[self._expires < time.monotonic()] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self._clock += 1
+            self._last_used[best] = self._clock
+            self.hits += 1
+            return self._answers[best]
+
+    def put(self, vector: Sequence[float], generation: int, answer: str) -> None:
+        query = _unit(vector)
+        with self._lock:
+            self._check_generation(generation)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, len(query)), dtype=np.float32)
+            elif len(query) != self._vectors.shape[1]:
+                return
+            now = time.monotonic()
+            live = self._expires >= now
+            # Replace a near-identical question, else a free or expired slot, else the least recently used one
+            scores = np.where(live, self._vectors @ query, -np.inf)
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                slot = int(np.argmin(np.where(live, self._last_used, -1)))
+                if live[slot]:
+                    self.evictions += 1
+            self._clock += 1
+            self._vectors[slot] = query
+            self._answers[slot] = answer
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = self._clock
+
+    def __len__(self) -> int:
+        return int((self._expires >= time.monotonic()).sum())
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'size': len(self),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hit_rate
+        }
+
+    def summary(self) -> str:
+        return (
+            f"Answer cache {self.index_name}: {len(self)}/{self.capacity} answers, {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.1%}), {self.evictions} evictions, {self.invalidations} invalidations"
+        )
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+_caches: Dict[str, SemanticAnswerCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_answer_cache(index_name: str) -> Optional[SemanticAnswerCache]:
+    """Return the process-wide answer cache of an index, or None when it is disabled."""
+    if ANSWER_CACHE_SIZE <= 0:
+        return None
+    with _caches_lock:
+        cache = _caches.get(index_name)
+        if cache is None:
+            cache = _caches[index_name] = SemanticAnswerCache(index_name)
+        return cache
+
+
+def first_turn_question(messages: Sequence[BaseMessage]) -> Optional[str]:
+    """The user's question if it is the first of the conversation, else None."""
+    questions = [message for message in messages if isinstance(message, HumanMessage)]
+    if len(questions) != 1 or not isinstance(questions[0].content, str):
+        return None
+    return questions[0].content
+
+
+async def _lookup_key(question: str):
+    index_name = PINECONE_INDEX_NAME_AR if detect_language(question) == 'ar' else PINECONE_INDEX_NAME_EN
+    cache = get_answer_cache(index_name)
+    if cache is None:
+        return None, None, None
+    manager = await aget_pinecone_manager(index_name=index_name)
+    return cache, await manager.aembed_query(question), get_index_generation(index_name)
+
+
+async def alookup_answer(question: str) -> Optional[str]:
+    """Return the cached answer of a question similar enough to this one, or None."""
+    cache, vector, generation = await _lookup_key(question)
+    return cache.get(vector, generation) if cache is not None else None
+
+
+async def astore_answer(question: str, answer: str) -> None:
+    """Cache the final answer to a first-turn question, the message text with its sources."""
+    if not answer:
+        return
+    cache, vector, generation = await _lookup_key(question)
+    if cache is not None:
+        cache.put(vector, generation, answer)
+
+
+async def lookup_cached_answer(state: State, *, config: RunnableConfig) -> Dict[str, Any]:
+    """Graph node answering a first-turn question from the cache if a similar one was answered before."""
+    question = first_turn_question(state.messages)
+    answer = await alookup_answer(question) if question else None
+    if answer is None:
+        return {}
+    return {
+        "messages": [AIMessage(content=answer)]
+    }
+
+
+def route_cached_answer(state: State) -> str:
+    """End on a cached answer, else go through query generation."""
+    return "END" if isinstance(state.messages[-1], AIMessage) else "generate_query"
@@ -0,0 +1,71 @@
+"""
+Hit/miss counters of the serving caches and the reranker.
+
+The query embedding caches, the retrieval cache, the answer caches and the reranker each
+count their hits, misses and fallbacks. A serving process logs their summaries every
+STATS_LOG_INTERVAL seconds while they change, and the MCP server exposes them as a resource.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from src.utilities.answer_cache import get_answer_cache
+from src.utilities.config import (
+    EMBEDDING_MODEL_AR,
+    EMBEDDING_MODEL_EN,
+    PINECONE_INDEX_NAME_AR,
+    PINECONE_INDEX_NAME_EN,
+    STATS_LOG_INTERVAL
+)
+from src.utilities.embedding_cache import get_query_embedding_cache
+from src.utilities.reranker import get_reranker
+from src.utilities.retrieval_cache import get_retrieval_cache
+
+
+def _components() -> List[Tuple[str, Any]]:
+    """(name, component) of the enabled caches and reranker."""
+    components = [
+        *((f"query_embeddings/{model}", get_query_embedding_cache(model)) for model in (EMBEDDING_MODEL_EN, EMBEDDING_MODEL_AR)),
+        ("retrieval", get_retrieval_cache()),
+        *((f"answers/{index_name}", get_answer_cache(index_name)) for index_name in (PINECONE_INDEX_NAME_EN, PINECONE_INDEX_NAME_AR)),
+        ("reranker", get_reranker()),
+    ]
+    return [(name, component) for name, component in components if component is not None]
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Counters of each enabled cache and of the reranker, by name."""
+    return {name: component.stats() for name, component in _components()}
+
+
+def log_cache_stats() -> None:
+    for _, component in _components():
+        print(component.summary())
+
+
+def _log_periodically(interval: float) -> None:
+    last: Optional[Dict[str, Dict[str, float]]] = None
+    while True:
+        time.sleep(interval)
+        try:
+            stats = cache_stats()
+            if stats != last:
+                log_cache_stats()
+                last = stats
+        except Exception as e:
+            print(f"Error logging cache stats: {str(e)}")
+
+
+_logger: Optional[threading.Thread] = None
+_logger_lock = threading.Lock()
+
+
+def start_stats_logger(interval: float = STATS_LOG_INTERVAL) -> None:
+    """Log the cache and reranker summaries every interval seconds from a daemon thread, once per process (0 disables it)."""
+    global _logger
+    if interval <= 0:
+        return
+    with _logger_lock:
+        if _logger is None:
+            _logger = threading.Thread(target=_log_periodically, args=(interval,), name="cache-stats", daemon=True)
+            _logger.start()
@@ -41,4 +41,82 @@ TOP_K = 5
 # Model Configuration
 EMBEDDING_MODEL_EN = "sentence-transformers/all-mpnet-base-v2"
 EMBEDDING_MODEL_AR = "akhooli/Arabic-SBERT-100K"
-EMBEDDING_MODEL_KWARGS = {'device': 'cpu'}
\ No newline at end of file
+EMBEDDING_MODEL_KWARGS = {'device': 'cpu'}
+# Number of chunks per forward pass of the embedding model during ingestion
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Disk cache of computed embeddings, size in vectors (0 disables it)
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "documents/embedding_cache")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "100000"))
+
+# Crawler Configuration
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "16"))
+CRAWL_PER_HOST_LIMIT = int(os.getenv("CRAWL_PER_HOST_LIMIT", "8"))
+CRAWL_TIMEOUT = 10
+
+# HTML parser used by the scrapers, "lxml" is faster when installed
+HTML_PARSER = os.getenv("HTML_PARSER", "html.parser")
+
+# Parser process pool for ingestion, 0 parses pages in the crawling process.
+# One core is left to the crawling process by default
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(max((os.cpu_count() or 1) - 1, 0))))
+PARSE_CHUNK_SIZE = int(os.getenv("PARSE_CHUNK_SIZE", "8"))
+# Capacity of each queue between the crawl, chunk, embed and upsert stages of ingestion
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "256"))
+
+# Seconds between ingestion checkpoints, the upsert log is trimmed once the manifest is saved
+CHECKPOINT_INTERVAL = int(os.getenv("CHECKPOINT_INTERVAL", "30"))
+
+# Pinecone upsert writer: vectors per request, requests in flight and attempts per request
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "4"))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "5"))
+
+# Async retrieval: threads embedding queries, and seconds before a Pinecone query or fetch is abandoned
+QUERY_EMBEDDING_WORKERS = int(os.getenv("QUERY_EMBEDDING_WORKERS", "2"))
+PINECONE_REQUEST_TIMEOUT = float(os.getenv("PINECONE_REQUEST_TIMEOUT", "10"))
+# In-memory LRU of query embeddings per model, size in queries (0 disables it)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+# In-memory cache of retrieval results: entries (0 disables it), approximate bytes and seconds each is served.
+# Results are also dropped once ingestion bumps the index generation kept in INDEX_GENERATION_DIR
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_MAX_BYTES = int(os.getenv("RETRIEVAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "3600"))
+INDEX_GENERATION_DIR = os.getenv("INDEX_GENERATION_DIR", "documents/index_generation")
+# Per-index SQLite table of full fatwa texts, filled at ingestion so retrieval needs no fetch ("" disables it)
+DOCUMENT_TABLE_DIR = os.getenv("DOCUMENT_TABLE_DIR", "documents/document_tables")
+# Hybrid retrieval: BM25 over the document table fused with the vector results by reciprocal rank
+# (RRF_K smooths the ranks), the BM25 index is rebuilt at most every LEXICAL_REBUILD_INTERVAL seconds
+LEXICAL_SEARCH = os.getenv("LEXICAL_SEARCH", "true").lower() == "true"
+RRF_K = int(os.getenv("RRF_K", "60"))
+LEXICAL_REBUILD_INTERVAL = float(os.getenv("LEXICAL_REBUILD_INTERVAL", "300"))
+# Optional cross-encoder reranking of the retrieved fatwas ("" disables it), e.g.
+# "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1". The fused order is kept when a pass takes more than
+# RERANK_BUDGET_MS. RERANK_TOP_N optionally keeps only the best fatwas (0 keeps all, MAX_CUNKS still applies)
+RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "250"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "0"))
+# Context assembly: tokens of retrieved answers given to the model, counted with the tokenizer of
+# CONTEXT_MODEL, and the estimated Jaccard similarity from which an answer is a near duplicate
+CONTEXT_MODEL = os.getenv("CONTEXT_MODEL", "gpt-4o-mini")
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "6000"))
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.7"))
+# Semantic cache of first-turn answers per index: answers (0 disables it), minimum cosine similarity
+# between a new question and a cached one, and seconds an answer is served
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2048"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+# Seconds between logs of the cache and reranker counters of a serving process (0 disables them)
+STATS_LOG_INTERVAL = float(os.getenv("STATS_LOG_INTERVAL", "300"))
+
+# Vector store behind PineconeManager: "pinecone", or "local" for the in-process index in LOCAL_VECTOR_DIR.
+# Local indexes are searched exhaustively below LOCAL_IVF_MIN_VECTORS vectors (0 always does),
+# above it through an IVF index scanning LOCAL_IVF_NPROBE lists per query
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_VECTOR_DIR = os.getenv("LOCAL_VECTOR_DIR", "documents/vectors")
+LOCAL_IVF_MIN_VECTORS = int(os.getenv("LOCAL_IVF_MIN_VECTORS", "100000"))
+LOCAL_IVF_NPROBE = int(os.getenv("LOCAL_IVF_NPROBE", "16"))
+# Codes local searches scan: "int8" (a quarter of float32), "float16" or "none". With
+# quantization, the best TOP_K * LOCAL_RESCORE_FACTOR candidates are rescored in float32
+LOCAL_VECTOR_QUANTIZATION = os.getenv("LOCAL_VECTOR_QUANTIZATION", "int8")
+LOCAL_RESCORE_FACTOR = int(os.getenv("LOCAL_RESCORE_FACTOR", "4"))
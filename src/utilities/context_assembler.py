@@ -0,0 +1,119 @@
+"""
+Assembly of the retrieved fatwas into the context given to the model.
+
+The same fatwa is often published several times with small edits, and each copy costs
+prompt tokens and generation latency. Every answer gets a MinHash signature of its word
+3-gram shingles; an answer whose estimated Jaccard similarity with an answer already in
+the context reaches CONTEXT_DUPLICATE_THRESHOLD is dropped. Comparing signatures is a
+vector equality over MINHASH_PERMUTATIONS values, whatever the length of the answers.
+
+The answers kept, in rank order, must fit CONTEXT_MAX_TOKENS tokens of the tokenizer of
+CONTEXT_MODEL. Token counts and signatures are memoized per text, so a fatwa retrieved
+again costs two dictionary lookups. A first answer longer than the budget is cut to it.
+"""
+
+import functools
+import zlib
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import tiktoken
+from src.utilities.config import CONTEXT_MODEL, CONTEXT_MAX_TOKENS, CONTEXT_DUPLICATE_THRESHOLD
+
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+# Texts whose token counts and signatures are memoized
+MEMO_SIZE = 4096
+# Separator between two answers of the context
+SEPARATOR = "\n\n"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(0)
+_PERMUTATION_A = _rng.integers(1, 1 << 32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERMUTATION_B = _rng.integers(0, 1 << 32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: str = CONTEXT_MODEL) -> Optional[tiktoken.Encoding]:
+    """Tokenizer of a model, o200k_base for models tiktoken does not know, None if it cannot be loaded."""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # The encodings are downloaded on first use
+        print(f"Error loading the tokenizer of {model}, estimating token counts: {str(e)}")
+        return None
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def count_tokens(text: str, model: str = CONTEXT_MODEL) -> int:
+    """Tokens of a text for a model, overestimated from its UTF-8 size without the tokenizer."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return len(text.encode('utf-8')) // 3 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = CONTEXT_MODEL) -> str:
+    """The longest prefix of a text that fits max_tokens."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text.encode('utf-8')[:max(max_tokens - 1, 0) * 3].decode('utf-8', errors='ignore')
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash of the word shingles of a text, one minimum per permutation."""
+    words = text.lower().split()
+    shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))}
+    hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = (hashes[:, None] * _PERMUTATION_A + _PERMUTATION_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def estimated_similarity(signature: np.ndarray, other: np.ndarray) -> float:
+    """Jaccard similarity of two texts estimated from their signatures."""
+    return float(np.mean(signature == other))
+
+
+def assemble_context(
+    texts: Sequence[str],
+    max_tokens: int = CONTEXT_MAX_TOKENS,
+    duplicate_threshold: float = CONTEXT_DUPLICATE_THRESHOLD,
+    model: str = CONTEXT_MODEL
+) -> List[Tuple[int, str]]:
+    """
+    Choose the texts of the context, best ranked first.
+
+    Args:
+        texts: Answers in rank order
+        max_tokens: Tokens of the joined context
+        duplicate_threshold: Estimated Jaccard similarity from which an answer is a near duplicate
+        model: Model whose tokenizer counts the tokens
+
+    Returns:
+        (position in texts, text) of the answers kept, in rank order. Answers that do not fit
+        are skipped, shorter ones after them may still fit
+    """
+    kept: List[Tuple[int, str]] = []
+    signatures: List[np.ndarray] = []
+    separator_tokens = count_tokens(SEPARATOR, model)
+    used = 0
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        signature = minhash_signature(text)
+        if any(estimated_similarity(signature, other) >= duplicate_threshold for other in signatures):
+            continue
+        tokens = count_tokens(text, model) + (separator_tokens if kept else 0)
+        if used + tokens > max_tokens:
+            if kept:
+                continue
+            text = truncate_to_tokens(text, max_tokens, model)
+            tokens = count_tokens(text, model)
+        kept.append((i, text))
+        signatures.append(signature)
+        used += tokens
+    return kept
@@ -0,0 +1,163 @@
+"""
+Local table of the full text of indexed fatwas.
+
+Retrieval used to rebuild each matched fatwa by fetching all of its chunks from the vector
+index. The table holds, per fatwa id, the cleaned answer text, the source URL and the
+chunk count. PineconeManager fills it whenever the chunks of a fatwa are upserted, so the
+query only has to return ids and the context is assembled in-process. It also keeps the
+term counts of each fatwa, which the BM25 index of lexical_index is built from.
+
+The table is an SQLite database read through a memory map (PRAGMA mmap_size): lookups are
+served from the page cache shared by every process, and ingestion writes in WAL mode
+without blocking readers.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from src.utilities.config import DOCUMENT_TABLE_DIR
+from src.utilities.utils import clean_answer_text
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    source TEXT NOT NULL,
+    total_chunks INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terms (
+    id TEXT PRIMARY KEY,
+    counts TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Bytes of the database mapped into memory
+MMAP_SIZE = 1 << 30
+
+
+@dataclass
+class StoredDocument:
+    id: str
+    text: str
+    source: str
+    total_chunks: int
+
+
+def document_from_chunks(doc_id: str, chunks: Sequence[str], source: str) -> StoredDocument:
+    """The document of a fatwa assembled from its chunk texts, given in chunk order."""
+    return StoredDocument(id=doc_id, text=clean_answer_text(' '.join(chunks)), source=source, total_chunks=len(chunks))
+
+
+def complete_chunks(vectors: Iterable[tuple]) -> Dict[str, Tuple[List[str], str]]:
+    """(chunk texts in order, source) of the fatwas whose chunks are all among (vector id, values, metadata) vectors."""
+    chunks: Dict[str, Dict[int, str]] = defaultdict(dict)
+    metadata_of: Dict[str, dict] = {}
+    for vector_id, _, metadata in vectors:
+        doc_id, chunk_idx = vector_id.rsplit('-', 1)
+        chunks[doc_id][int(chunk_idx)] = metadata.get('text', '')
+        metadata_of[doc_id] = metadata
+    complete = {}
+    for doc_id, texts in chunks.items():
+        total = int(metadata_of[doc_id].get('total_chunks', len(texts)))
+        if len(texts) == total and all(i in texts for i in range(total)):
+            complete[doc_id] = ([texts[i] for i in range(total)], metadata_of[doc_id].get('source', 'No source available'))
+    return complete
+
+
+def documents_from_vectors(vectors: Iterable[tuple]) -> List[StoredDocument]:
+    """Documents of the fatwas whose chunks are all among (vector id, values, metadata) vectors."""
+    return [document_from_chunks(doc_id, chunks, source) for doc_id, (chunks, source) in complete_chunks(vectors).items()]
+
+
+class DocumentTable:
+    """Full fatwa documents of one index, keyed by fatwa id."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self._conn.executescript(_SCHEMA)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def get_many(self, doc_ids: Sequence[str]) -> Dict[str, StoredDocument]:
+        """Return the stored documents of the given ids, missing ids are left out."""
+        if not doc_ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, text, source, total_chunks FROM documents WHERE id IN ({', '.join('?' * len(doc_ids))})",
+                list(doc_ids)
+            ).fetchall()
+        return {row[0]: StoredDocument(*row) for row in rows}
+
+    def put_many(self, documents: Iterable[StoredDocument], term_counts: Optional[Sequence[Dict[str, int]]] = None) -> None:
+        """
+        Insert documents, replacing stored versions.
+
+        Args:
+            documents: Documents to store
+            term_counts: Term counts of each document for the lexical index, in the same order
+        """
+        documents = list(documents)
+        if not documents:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, text, source, total_chunks) VALUES (?, ?, ?, ?)",
+                [(document.id, document.text, document.source, document.total_chunks) for document in documents]
+            )
+            if term_counts is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO terms (id, counts) VALUES (?, ?)",
+                    [(document.id, json.dumps(counts, ensure_ascii=False)) for document, counts in zip(documents, term_counts)]
+                )
+
+    def delete_many(self, doc_ids: Iterable[str]) -> None:
+        rows = [(doc_id,) for doc_id in doc_ids]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", rows)
+            self._conn.executemany("DELETE FROM terms WHERE id = ?", rows)
+
+    def iter_term_counts(self, batch_size: int = 1000) -> Iterator[Tuple[str, Dict[str, int]]]:
+        """Stream the (fatwa id, term counts) of all documents that have them."""
+        last_id = ''
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, counts FROM terms WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for doc_id, counts in rows:
+                yield doc_id, json.loads(counts)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_tables: Dict[str, DocumentTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_document_table(index_name: str) -> Optional[DocumentTable]:
+    """Return the process-wide document table of an index, or None when the table is disabled."""
+    if not DOCUMENT_TABLE_DIR:
+        return None
+    with _tables_lock:
+        table = _tables.get(index_name)
+        if table is None:
+            table = _tables[index_name] = DocumentTable(os.path.join(DOCUMENT_TABLE_DIR, f"{index_name}.db"))
+        return table
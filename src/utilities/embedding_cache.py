@@ -0,0 +1,375 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Embeddings are keyed by a hash of (model name, text) and stored in a memory-mapped
+float32 array on disk, so re-indexing unchanged text and repeating a query skip the
+model. Each slot also stores its key, which makes the slot array the source of truth:
+the LRU order file is only a hint, and a slot whose key does not match is never served.
+
+Ingestion, the MCP server and the graph workers share the files of a model. Writes hold an
+exclusive flock on the cache's lock file and reads a shared one. The lock file also counts
+the writes, so a process reloads the slots from the key file only after another one wrote.
+
+Query embeddings are also kept in a small in-memory LRU, QueryEmbeddingCache, so a
+repeated question is answered without hashing, disk access or the model.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.utilities.config import EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows, a single process per cache directory is assumed
+    fcntl = None
+
+# sha1 digest; raw bytes, since 'S20' drops the trailing NULs of a digest on read
+_KEY_DTYPE = 'V20'
+_EMPTY_KEY = bytes(20)
+
+
+class EmbeddingCache:
+    """Size-bounded LRU cache of embedding vectors for one model, backed by memory-mapped files."""
+
+    def __init__(self, directory: str, model_name: str, capacity: int = EMBEDDING_CACHE_SIZE, flush_interval: float = 30.0):
+        """
+        Args:
+            directory: Directory holding the cache files
+            model_name: Embedding model the vectors come from, part of every key
+            capacity: Maximum number of cached vectors, the least recently used are evicted
+            flush_interval: Seconds between writes of the LRU order to disk
+        """
+        self.model_name = model_name
+        self.capacity = max(1, capacity)
+        self.flush_interval = flush_interval
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, f"{slug}.f32")
+        self._keys_path = os.path.join(directory, f"{slug}.keys")
+        self._meta_path = os.path.join(directory, f"{slug}.json")
+        # Its first 8 bytes count the writes of every process
+        self._lock_fd = os.open(os.path.join(directory, f"{slug}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.memmap] = None
+        self._keys: Optional[np.memmap] = None
+        self._slots: 'OrderedDict[bytes, int]' = OrderedDict()  # key -> slot, least recently used first
+        self._free: List[int] = []
+        self.dimension: Optional[int] = None
+        self._last_flush = time.monotonic()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        with self._locked(exclusive=True):
+            self._load()
+
+    @contextmanager
+    def _locked(self, exclusive: bool = False) -> Iterator[None]:
+        """
+        Hold the thread lock and the cross-process lock of the cache files, shared to read and
+        exclusive to write, with the slots other processes wrote since the last look loaded.
+        """
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                self._refresh()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _write_count(self) -> int:
+        return int.from_bytes(os.pread(self._lock_fd, 8, 0).ljust(8, b'\0'), 'little')
+
+    def _count_write(self) -> None:
+        self._writes += 1
+        os.pwrite(self._lock_fd, self._writes.to_bytes(8, 'little'), 0)
+
+    def _refresh(self) -> None:
+        """Reload the slots if another process wrote since the last look, keeping the recency order."""
+        writes = self._write_count()
+        if writes == self._writes:
+            return
+        self._writes = writes
+        # Files another process created are opened by the next put_many
+        if self._keys is not None:
+            self._index_slots(list(self._slots))
+
+    def _index_slots(self, recency: Iterable[bytes]) -> None:
+        """Rebuild the key -> slot map from the slots, most recently used last as given by recency."""
+        slots = {bytes(key): slot for slot, key in enumerate(self._keys) if bytes(key) != _EMPTY_KEY}
+        ordered = [key for key in recency if key in slots]
+        ordered_set = set(ordered)
+        self._slots = OrderedDict((key, slots[key]) for key in [key for key in slots if key not in ordered_set] + ordered)
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    def _load(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        stored_capacity = meta['capacity']
+        self.dimension = meta['dimension']
+        if stored_capacity != self.capacity:
+            self._resize(stored_capacity)
+        self._open('r+')
+        self._index_slots(bytes.fromhex(key) for key in meta.get('lru', []))
+
+    def _open(self, mode: str) -> None:
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dimension))
+        self._keys = np.memmap(self._keys_path, dtype=_KEY_DTYPE, mode=mode, shape=(self.capacity,))
+
+    def _resize(self, stored_capacity: int) -> None:
+        """Grow or shrink the cache files to the configured capacity, dropping slots past the end."""
+        keep = min(stored_capacity, self.capacity)
+        vectors = np.array(np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(stored_capacity, self.dimension))[:keep])
+        keys = np.array(np.memmap(self._keys_path, dtype=_KEY_DTYPE, mode='r', shape=(stored_capacity,))[:keep])
+        for path in (self._vectors_path, self._keys_path):
+            os.remove(path)
+        self._open('w+')
+        self._vectors[:keep] = vectors
+        self._keys[:keep] = keys
+
+    def make_key(self, text: str, kind: str = 'document') -> bytes:
+        """Cache key of a text, kind separates document and query embeddings."""
+        return hashlib.sha1(f"{self.model_name}\0{kind}\0{text}".encode('utf-8')).digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[List[float]]]:
+        """Return the cached vector of every key, or None where it is not cached."""
+        results: List[Optional[List[float]]] = []
+        with self._locked():
+            for key in keys:
+                slot = self._slots.get(key)
+                # The slot must still hold this key, it is the source of truth
+                if slot is None or bytes(self._keys[slot]) != key:
+                    if slot is not None:
+                        del self._slots[key]
+                        self._free.append(slot)
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self._slots.move_to_end(key)
+                self.hits += 1
+                results.append(self._vectors[slot].tolist())
+        return results
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[Sequence[float]]) -> None:
+        """Cache vectors, evicting the least recently used ones when the cache is full."""
+        if not keys:
+            return
+        with self._locked(exclusive=True):
+            if self._vectors is None:
+                # Another process may have created the files since this cache was opened
+                self._load()
+            if self._vectors is None:
+                self.dimension = len(vectors[0])
+                self._open('w+')
+                self._free = list(range(self.capacity - 1, -1, -1))
+                self._write_meta()
+            for key, vector in zip(keys, vectors):
+                if len(vector) != self.dimension:
+                    continue
+                slot = self._slots.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        _, slot = self._slots.popitem(last=False)
+                        self.evictions += 1
+                    # Invalidate the slot while its vector is rewritten
+                    self._keys[slot] = _EMPTY_KEY
+                    self._vectors[slot] = vector
+                    self._keys[slot] = key
+                    self._slots[key] = slot
+                else:
+                    self._slots.move_to_end(key)
+            self._count_write()
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the vectors and the recency order to disk."""
+        with self._locked(exclusive=True):
+            if self._vectors is None:
+                return
+            self._vectors.flush()
+            self._keys.flush()
+            self._write_meta()
+            self._last_flush = time.monotonic()
+
+    def _write_meta(self) -> None:
+        meta = {
+            'model': self.model_name,
+            'dimension': self.dimension,
+            'capacity': self.capacity,
+            'lru': [key.hex() for key in self._slots]
+        }
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'size': len(self._slots),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate
+        }
+
+    def summary(self) -> str:
+        return (
+            f"Embedding cache {self.model_name}: {len(self._slots)}/{self.capacity} vectors, "
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.1%}), {self.evictions} evictions"
+        )
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from an EmbeddingCache."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache.make_key(text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        # Embed each missing text once, even if it repeats within the call
+        missing: Dict[bytes, List[int]] = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            computed = self.embeddings.embed_documents([texts[positions[0]] for positions in missing.values()])
+            self.cache.put_many(list(missing), computed)
+            for positions, vector in zip(missing.values(), computed):
+                for i in positions:
+                    vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.cache.make_key(text, kind='query')
+        vector = self.cache.get_many([key])[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many([key], [vector])
+        return vector
+
+
+class QueryEmbeddingCache:
+    """Size-bounded in-memory LRU cache of query embeddings, keyed by canonical query text."""
+
+    def __init__(self, model_name: str, capacity: int = QUERY_EMBEDDING_CACHE_SIZE):
+        """
+        Args:
+            model_name: Embedding model the vectors come from
+            capacity: Maximum number of cached queries, the least recently used are evicted
+        """
+        self.model_name = model_name
+        self.capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._vectors: 'OrderedDict[str, List[float]]' = OrderedDict()  # least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, query: str) -> Optional[List[float]]:
+        """Return the cached vector of a canonical query, or None."""
+        with self._lock:
+            vector = self._vectors.get(query)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._vectors.move_to_end(query)
+            self.hits += 1
+            return vector
+
+    def put(self, query: str, vector: List[float]) -> None:
+        with self._lock:
+            self._vectors[query] = vector
+            self._vectors.move_to_end(query)
+            while len(self._vectors) > self.capacity:
+                self._vectors.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors.clear()
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'size': len(self._vectors),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate
+        }
+
+    def summary(self) -> str:
+        return (
+            f"Query embedding cache {self.model_name}: {len(self._vectors)}/{self.capacity} queries, "
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.1%}), {self.evictions} evictions"
+        )
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name: str) -> Optional[EmbeddingCache]:
+    """Return the process-wide cache of a model, or None when caching is disabled."""
+    if EMBEDDING_CACHE_SIZE <= 0:
+        return None
+    with _caches_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            cache = _caches[model_name] = EmbeddingCache(EMBEDDING_CACHE_DIR, model_name)
+            atexit.register(cache.flush)
+        return cache
+
+
+_query_caches: Dict[str, QueryEmbeddingCache] = {}
+
+
+def get_query_embedding_cache(model_name: str) -> Optional[QueryEmbeddingCache]:
+    """Return the process-wide query embedding cache of a model, or None when it is disabled."""
+    if QUERY_EMBEDDING_CACHE_SIZE <= 0:
+        return None
+    with _caches_lock:
+        cache = _query_caches.get(model_name)
+        if cache is None:
+            cache = _query_caches[model_name] = QueryEmbeddingCache(model_name)
+        return cache
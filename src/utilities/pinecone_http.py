@@ -0,0 +1,158 @@
+"""
+Async client for the Pinecone data plane REST API.
+
+Queries and fetches are plain HTTP requests on an httpx.AsyncClient, so they run on the
+event loop without a worker thread, share pooled connections, honour timeouts and stop
+as soon as the awaiting task is cancelled. Query embeddings run on a small dedicated
+thread pool, so a burst of questions cannot take over the default executor.
+"""
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import httpx
+from src.utilities.config import PINECONE_API_KEY, QUERY_EMBEDDING_WORKERS, PINECONE_REQUEST_TIMEOUT
+
+# Pinecone REST API version, the same one the installed SDK speaks
+API_VERSION = "2025-04"
+
+# Ids per fetch request, fetch takes them as query parameters and URLs have a length limit
+FETCH_BATCH_SIZE = 100
+
+
+@dataclass
+class Match:
+    """One query result, shaped like the SDK's ScoredVector."""
+    id: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class FetchedVector:
+    """One fetched record, shaped like the SDK's Vector."""
+    id: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    values: List[float] = field(default_factory=list)
+
+
+_embedding_executor: Optional[ThreadPoolExecutor] = None
+_embedding_executor_lock = threading.Lock()
+
+
+def get_embedding_executor() -> ThreadPoolExecutor:
+    """Return the process-wide thread pool query embeddings run on."""
+    global _embedding_executor
+    with _embedding_executor_lock:
+        if _embedding_executor is None:
+            _embedding_executor = ThreadPoolExecutor(
+                max_workers=max(1, QUERY_EMBEDDING_WORKERS),
+                thread_name_prefix="query-embedding"
+            )
+        return _embedding_executor
+
+
+class AsyncIndexClient:
+    """Query and fetch one Pinecone index over HTTP from asyncio code."""
+
+    def __init__(self, host: str, namespace: str, api_key: str = PINECONE_API_KEY, timeout: float = PINECONE_REQUEST_TIMEOUT):
+        """
+        Args:
+            host: Index host as returned by describe_index(), with or without scheme
+            namespace: Namespace queried and fetched from
+            api_key: Pinecone API key
+            timeout: Seconds before a request is abandoned
+        """
+        self.base_url = host if host.startswith("http") else f"https://{host}"
+        self.namespace = namespace
+        self.headers = {
+            'Api-Key': api_key or '',
+            'X-Pinecone-API-Version': API_VERSION,
+        }
+        self.timeout = timeout
+        # httpx clients are bound to the event loop they were first used on
+        self._clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout
+            )
+        return client
+
+    async def query(self, vector: List[float], top_k: int, include_metadata: bool = True) -> List[Match]:
+        """Return the top_k nearest records of a query vector."""
+        response = await self._client().post("/query", json={
+            'vector': vector,
+            'topK': top_k,
+            'namespace': self.namespace,
+            'includeMetadata': include_metadata,
+            'includeValues': False,
+        })
+        response.raise_for_status()
+        return [
+            Match(id=match['id'], score=match.get('score', 0.0), metadata=match.get('metadata') or {})
+            for match in response.json().get('matches', [])
+        ]
+
+    async def fetch(self, ids: List[str]) -> Dict[str, FetchedVector]:
+        """Fetch records by id, batches of FETCH_BATCH_SIZE ids are requested concurrently."""
+        batches = [ids[i:i + FETCH_BATCH_SIZE] for i in range(0, len(ids), FETCH_BATCH_SIZE)]
+        responses = await asyncio.gather(*(self._fetch_batch(batch) for batch in batches))
+        vectors: Dict[str, FetchedVector] = {}
+        for response in responses:
+            vectors.update(response)
+        return vectors
+
+    async def _fetch_batch(self, ids: List[str]) -> Dict[str, FetchedVector]:
+        response = await self._client().get(
+            "/vectors/fetch",
+            params=[('ids', vector_id) for vector_id in ids] + [('namespace', self.namespace)]
+        )
+        response.raise_for_status()
+        return {
+            vector_id: FetchedVector(
+                id=vector_id,
+                metadata=vector.get('metadata') or {},
+                values=vector.get('values') or []
+            )
+            for vector_id, vector in response.json().get('vectors', {}).items()
+        }
+
+    async def aclose(self) -> None:
+        """Close the client of the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self) -> None:
+        """
+        Close the clients of every event loop: scheduled on a running loop, run to completion on a
+        stopped one. Clients of closed loops have lost their connections with the loop.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for loop, client in list(self._clients.items()):
+            del self._clients[loop]
+            if loop.is_closed():
+                continue
+            if loop is running:
+                loop.create_task(client.aclose())
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            elif running is None:
+                loop.run_until_complete(client.aclose())
+            else:
+                # A thread runs one loop at a time, the stopped loop is run by a helper thread
+                closer = threading.Thread(target=loop.run_until_complete, args=(client.aclose(),))
+                closer.start()
+                closer.join()
@@ -1,36 +1,70 @@
-from langchain_core.documents.base import Document
 from langchain_huggingface import HuggingFaceEmbeddings
-from pinecone import Pinecone, ServerlessSpec
-from src.utilities.utils import preprocess_text
-from langchain_pinecone import PineconeVectorStore
-from typing import List, Dict, Any, Optional
+from src.utilities.utils import canonicalize_query, preprocess_text
+from src.utilities.upsert_writer import UpsertReport
+from src.utilities.retrieval_cache import bump_index_generation, get_index_generation
+from src.utilities.document_table import DocumentTable, complete_chunks, document_from_chunks, get_document_table
+from src.utilities.lexical_index import build_lexical_index, saved_generation, term_counts
+from src.utilities.reranker import get_reranker
+from src.utilities.embedding_cache import CachedEmbeddings, get_embedding_cache, get_query_embedding_cache
+from src.utilities.pinecone_http import FetchedVector, Match, get_embedding_executor
+from src.utilities.vector_store import VectorStore, create_vector_store, get_pinecone_client
+from typing import List, Dict, Any, Optional, Tuple
+from langchain_core.embeddings import Embeddings
 from langchain_core.runnables import RunnableConfig
 import asyncio
+import atexit
+import threading
+from concurrent.futures import Future
 from src.utilities.config import (
-    PINECONE_API_KEY,
-    PINECONE_ENVIRONMENT,
     EMBEDDING_MODEL_EN,
     EMBEDDING_MODEL_AR,
     EMBEDDING_MODEL_KWARGS,
-    EMBEDDING_DIMENSION,
+    EMBEDDING_BATCH_SIZE,
     TOP_K,
+    VECTOR_BACKEND,
+    LOCAL_VECTOR_DIR,
     PINECONE_INDEX_NAME_EN,
     PINECONE_INDEX_NAME_AR
 )
 
+# Process-wide state shared by all managers: one loaded model per embedding model name
+_shared_lock = threading.RLock()
+_embeddings: Dict[str, Embeddings] = {}
+
+
+def get_embeddings(model_name: str) -> Embeddings:
+    """Return the shared embeddings of a model, loading the model from disk only once per process."""
+    with _shared_lock:
+        embeddings = _embeddings.get(model_name)
+        if embeddings is None:
+            embeddings = HuggingFaceEmbeddings(
+                model_name=model_name,
+                model_kwargs=EMBEDDING_MODEL_KWARGS,
+                encode_kwargs={'batch_size': EMBEDDING_BATCH_SIZE}
+            )
+            # Serve texts embedded before, by any run, from the disk cache
+            cache = get_embedding_cache(model_name)
+            if cache is not None:
+                embeddings = CachedEmbeddings(embeddings, cache)
+            _embeddings[model_name] = embeddings
+        return embeddings
+
+
 class PineconeManager:
     def __init__(
         self,
         namespace: str = "qa",
         index_name: str = PINECONE_INDEX_NAME_EN,
-        embedding_model: Optional[str] = None
+        embedding_model: Optional[str] = None,
+        backend: str = VECTOR_BACKEND
     ):
-        # Initialize Pinecone client
-        self.pc = Pinecone(
-            api_key=PINECONE_API_KEY,
-            environment=PINECONE_ENVIRONMENT
-        )
-        
+        """
+        Prefer get_pinecone_manager(), which returns one shared manager per index.
+        Direct instances still share the client and the embedding models.
+
+        Args:
+            backend: Vector store holding the index, "pinecone" or "local"
+        """
         self.namespace = namespace
         self.index_name = index_name
         
@@ -42,91 +76,174 @@ class PineconeManager:
                 else EMBEDDING_MODEL_EN
             )
         
-        # Create index if it doesn't exist
-        self.ensure_index_exists()
+        # Creates the index if it doesn't exist
+        self.backend = backend
+        self.store: VectorStore = create_vector_store(backend, index_name, namespace, LOCAL_VECTOR_DIR)
         
-        # Initialize embeddings using config values
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=embedding_model,
-            model_kwargs=EMBEDDING_MODEL_KWARGS
-        )
+        self.embedding_model = embedding_model
+        self.embeddings = get_embeddings(embedding_model)
+        self.embedding_cache = get_embedding_cache(embedding_model)
+        self.query_cache = get_query_embedding_cache(embedding_model)
+        self._pending_queries: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+        self.embedding_batch_size = EMBEDDING_BATCH_SIZE
         
         self.language = 'ar' if index_name == PINECONE_INDEX_NAME_AR else 'en'
-    
-    def ensure_index_exists(self):
-        """Create index if it doesn't exist."""
-        if self.index_name not in self.pc.list_indexes().names():
-            print(f"Creating index '{self.index_name}'...")
-            self.pc.create_index(
-                name=self.index_name,
-                dimension=EMBEDDING_DIMENSION,
-                metric="cosine",
-                spec=ServerlessSpec(
-                    cloud="aws",
-                    region="us-east-1"
-                )
-            )
-            print(f"Index '{self.index_name}' created successfully")
-    
+        # Full fatwa texts, kept in step with the index so retrieval can skip fetching chunks
+        self.documents: Optional[DocumentTable] = get_document_table(index_name)
+
+    @property
+    def pc(self):
+        """Shared Pinecone client, for Pinecone operations outside the vector store."""
+        return get_pinecone_client()
+
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Create embeddings for the given texts with preprocessing."""
+        """
+        Create embeddings for the given texts with preprocessing.
+
+        Texts are embedded in batches of embedding_batch_size, grouped by length so each
+        batch pads to a similar length, and returned in input order. Cached texts are not
+        sent to the model.
+        """
         # Preprocess texts based on language
         processed_texts = [
             preprocess_text(text, self.language) 
             for text in texts
         ]
-        return self.embeddings.embed_documents(processed_texts)
+        order = sorted(range(len(processed_texts)), key=lambda i: len(processed_texts[i]))
+        embeddings: List[Optional[List[float]]] = [None] * len(processed_texts)
+        for start in range(0, len(order), self.embedding_batch_size):
+            batch = order[start:start + self.embedding_batch_size]
+            batch_embeddings = self.embeddings.embed_documents([processed_texts[i] for i in batch])
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[i] = embedding
+        return embeddings
     
-    def upsert_vectors(self, vectors: List[tuple[str, List[float], dict]]):
-        """Upsert vectors to Pinecone."""
-        index = self.pc.Index(self.index_name)
-        index.upsert(
-            vectors=vectors,
-            namespace=self.namespace
-        )
-
-    def retrieve_docs(self, question: str) -> Dict[str, Any]:
+    def upsert_vectors(self, vectors: List[tuple[str, List[float], dict]]) -> UpsertReport:
+        """Upsert vectors to the vector store, with Pinecone in concurrent, retried sub-batches, raising UpsertError if any fails."""
+        try:
+            report = self.store.upsert(vectors)
+            if self.documents is not None:
+                chunks = complete_chunks(vectors)
+                self.documents.put_many(
+                    [document_from_chunks(doc_id, texts, source) for doc_id, (texts, source) in chunks.items()],
+                    [term_counts(' '.join(texts), self.language) for texts, _ in chunks.values()]
+                )
+            return report
+        finally:
+            # Even a failed upsert may have written some batches
+            bump_index_generation(self.index_name)
+
+    def delete_vectors(self, vector_ids: List[str]):
+        """Delete vectors by id."""
+        self.store.delete(vector_ids)
+        if self.documents is not None:
+            # Only removed fatwas lose their first chunk, shortened ones keep their new document
+            self.documents.delete_many(vector_id.rsplit('-', 1)[0] for vector_id in vector_ids if vector_id.endswith('-0'))
+        bump_index_generation(self.index_name)
+
+    def embed_query(self, question: str) -> List[float]:
+        """Embed a canonicalized query, repeated queries are served from the query cache."""
+        query = canonicalize_query(question, self.language)
+        vector = self.query_cache.get(query) if self.query_cache is not None else None
+        return vector if vector is not None else self._embed_canonical_query(query)
+
+    def _embed_canonical_query(self, query: str) -> List[float]:
+        vector = self.embeddings.embed_query(query)
+        if self.query_cache is not None:
+            self.query_cache.put(query, vector)
+        return vector
+
+    def build_lexical_index(self) -> None:
+        """
+        Rebuild the BM25 index of the document table, so serving processes load it instead of building it.
+        Skipped when the saved build is already at the current index generation, i.e. nothing was upserted or deleted.
+        """
+        if self.documents is not None and saved_generation(self.index_name) != get_index_generation(self.index_name):
+            build_lexical_index(self.index_name, self.documents)
+
+    def retrieve_docs(self, question: str) -> List[Match]:
         """Retrieve documents with preprocessed query."""
-        pinecone_index = self.pc.Index(self.index_name)
-        processed_question = preprocess_text(question, self.language)
-        query_vector = self.embeddings.embed_query(processed_question)
-        results = pinecone_index.query(
-            vector=query_vector,
-            top_k=TOP_K,
-            namespace=self.namespace,
-            include_metadata=True,
-            include_values=False
-        )
-        return results.matches
-
-    def batch_fetch_vectors(self, vector_ids: List[str]) -> Dict[str, Any]:
+        return self.store.query(self.embed_query(question), TOP_K)
+
+    def batch_fetch_vectors(self, vector_ids: List[str]) -> Dict[str, FetchedVector]:
         """Fetch multiple vectors in a single request."""
-        index = self.pc.Index(self.index_name)
         try:
-            result = index.fetch(
-                ids=vector_ids,
-                namespace=self.namespace
-            )
-            return result.get('vectors', {})
+            return self.store.fetch(vector_ids)
         except Exception as e:
             print(f"Error batch fetching vectors: {str(e)}")
             return {}
 
-    async def aretrieve_docs(self, question: str, config: RunnableConfig) -> List[Document]:
-        """Retrieve documents with preprocessed query."""
-        vstore = PineconeVectorStore.from_existing_index(
-            index_name=self.index_name, embedding=self.embeddings, namespace=self.namespace
-        )
-        retriever = vstore.as_retriever(search_kwargs={"k": TOP_K})
-        return await retriever.ainvoke(question, config)
+    async def aembed_query(self, question: str) -> List[float]:
+        """
+        Embed a query on the query embedding thread pool, keeping the event loop free.
+        Cache hits return directly, and concurrent misses on the same query share one embedding.
+        """
+        query = canonicalize_query(question, self.language)
+        vector = self.query_cache.get(query) if self.query_cache is not None else None
+        if vector is not None:
+            return vector
+        with self._pending_lock:
+            future = self._pending_queries.get(query)
+            if future is None:
+                future = self._pending_queries[query] = get_embedding_executor().submit(self._embed_canonical_query, query)
+                future.add_done_callback(lambda _: self._pending_queries.pop(query, None))
+        # Shielded, so a cancelled caller does not cancel the embedding other callers wait on
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    async def aretrieve_docs(
+        self,
+        question: str,
+        config: Optional[RunnableConfig] = None,
+        include_metadata: bool = True
+    ) -> List[Match]:
+        """Retrieve the TOP_K best matching chunks of a question, cancellable while embedding or querying."""
+        query_vector = await self.aembed_query(question)
+        return await self.store.aquery(query_vector, TOP_K, include_metadata)
     
-    async def abatch_fetch_vectors(self, vector_ids: List[str], confing: RunnableConfig) -> Dict[str, Any]:
-        """Fetch multiple vectors in a single request."""
-        index = self.pc.Index(self.index_name)
+    async def abatch_fetch_vectors(self, vector_ids: List[str], config: Optional[RunnableConfig] = None) -> Dict[str, FetchedVector]:
+        """Fetch multiple vectors by id, without blocking the event loop."""
+        if not vector_ids:
+            return {}
         try:
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, index.fetch, vector_ids, self.namespace)
-            return result.vectors
+            return await self.store.afetch(vector_ids)
         except Exception as e:
             print(f"Error batch fetching vectors: {str(e)}")
-            return {}
\ No newline at end of file
+            return {}
+
+    def close(self) -> None:
+        """Close the vector store: flush a local index, wait for queued upserts and close the HTTP clients."""
+        self.store.close()
+
+
+_managers: Dict[Tuple[str, str], PineconeManager] = {}
+
+
+def get_pinecone_manager(index_name: str = PINECONE_INDEX_NAME_EN, namespace: str = "qa") -> PineconeManager:
+    """Return the process-wide manager of an index, creating it on first use."""
+    key = (index_name, namespace)
+    manager = _managers.get(key)
+    if manager is None:
+        with _shared_lock:
+            manager = _managers.get(key)
+            if manager is None:
+                manager = _managers[key] = PineconeManager(namespace=namespace, index_name=index_name)
+                atexit.register(manager.close)
+    return manager
+
+
+async def aget_pinecone_manager(index_name: str = PINECONE_INDEX_NAME_EN, namespace: str = "qa") -> PineconeManager:
+    """Async get_pinecone_manager(), a first call loads the model in a thread instead of blocking the event loop."""
+    manager = _managers.get((index_name, namespace))
+    if manager is None:
+        manager = await asyncio.to_thread(get_pinecone_manager, index_name, namespace)
+    return manager
+
+
+def warm_up(index_names: Tuple[str, ...] = (PINECONE_INDEX_NAME_EN, PINECONE_INDEX_NAME_AR)) -> None:
+    """Create the managers of the given indexes at startup, so no request pays for index checks or model loading."""
+    for index_name in index_names:
+        get_pinecone_manager(index_name=index_name).store.warm_up()
+    reranker = get_reranker()
+    if reranker is not None:
+        reranker.warm_up()
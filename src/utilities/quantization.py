@@ -0,0 +1,66 @@
+"""
+Scalar quantization of embedding matrices for the local vector store.
+
+    int8     symmetric per-vector quantization, codes in [-127, 127] and one float32 scale
+             per vector: 1 byte per dimension, a quarter of float32
+    float16  half precision, 2 bytes per dimension, no scales
+
+Scores against quantized vectors are approximate. The store scores all candidates with
+the compact codes and recomputes the best few with the full-precision vectors.
+"""
+
+from typing import Optional, Tuple
+import numpy as np
+
+QUANTIZATIONS = ('none', 'int8', 'float16')
+
+# Rows converted to float32 at a time while scoring, bounds the temporary buffer
+SCORE_BLOCK_ROWS = 4096
+
+
+def code_dtype(quantization: str) -> np.dtype:
+    """Storage dtype of the codes of a quantization."""
+    if quantization == 'int8':
+        return np.dtype(np.int8)
+    if quantization == 'float16':
+        return np.dtype(np.float16)
+    if quantization == 'none':
+        return np.dtype(np.float32)
+    raise ValueError(f"Unknown quantization '{quantization}', expected one of {', '.join(QUANTIZATIONS)}")
+
+
+def quantize(matrix: np.ndarray, quantization: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize the rows of a float32 matrix.
+
+    Returns:
+        The codes and the per-row scales, all ones unless quantization is int8
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if quantization == 'int8':
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return matrix.astype(code_dtype(quantization)), np.ones(len(matrix), dtype=np.float32)
+
+
+def score(codes: np.ndarray, scales: np.ndarray, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Approximate dot products of a float32 query with quantized rows.
+
+    Args:
+        codes: Quantized rows, typically a memory map
+        scales: Per-row scales of the codes
+        query: Float32 query vector
+        rows: Indices of the rows to score, all rows if None
+    """
+    if codes.dtype == np.float32:
+        return codes @ query if rows is None else codes[rows] @ query
+    count = len(codes) if rows is None else len(rows)
+    scores = np.empty(count, dtype=np.float32)
+    # BLAS has no int8 or float16 kernels, widen one block at a time
+    for start in range(0, count, SCORE_BLOCK_ROWS):
+        block = codes[start:start + SCORE_BLOCK_ROWS] if rows is None else codes[rows[start:start + SCORE_BLOCK_ROWS]]
+        scores[start:start + len(block)] = block.astype(np.float32) @ query
+    return scores * (scales if rows is None else scales[rows])
@@ -0,0 +1,115 @@
+"""
+Optional cross-encoder reranking of the retrieved fatwas.
+
+Vector and BM25 scores compare the question with single chunks or terms, weak matches
+often rank above better fatwas and use up the MAX_CUNKS budget. A cross-encoder reads the
+question and each fatwa together; the candidates are scored in one batched forward pass
+on a dedicated CPU thread and reordered before the MAX_CUNKS budget is applied.
+
+Reranking never delays retrieval by more than RERANK_BUDGET_MS: a pass over budget is
+abandoned and the fused order is used. The pass still runs to completion, and no new pass
+starts before it ends, so an overloaded model falls back instead of queueing.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+from src.utilities.config import RERANK_MODEL, RERANK_BUDGET_MS, RERANK_MAX_LENGTH, RERANK_TOP_N
+
+
+class Reranker:
+    """Cross-encoder scoring (question, text) pairs, loaded by warm_up or else on its first pass."""
+
+    def __init__(self, model_name: str, max_length: int = RERANK_MAX_LENGTH, budget_ms: float = RERANK_BUDGET_MS):
+        """
+        Args:
+            model_name: Hugging Face name of the cross-encoder
+            max_length: Tokens of each (question, text) pair the model reads
+            budget_ms: Milliseconds arerank waits for a pass before giving up
+        """
+        self.model_name = model_name
+        self.max_length = max_length
+        self.budget = budget_ms / 1000
+        self._model = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._lock = threading.Lock()
+        self._running: Optional[Future] = None
+        self.passes = 0
+        self.timeouts = 0
+        self.busy = 0
+        self.errors = 0
+
+    def _load(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, max_length=self.max_length, device='cpu')
+        return self._model
+
+    def warm_up(self) -> None:
+        """Load the model and run a first pass on the rerank thread, before requests have a budget to meet."""
+        self._executor.submit(self.score, "warm up", ["warm up"]).result()
+
+    def score(self, question: str, texts: Sequence[str]) -> List[float]:
+        """Relevance of each text to the question, in one forward pass."""
+        scores = self._load().predict(
+            [(question, text) for text in texts], batch_size=max(len(texts), 1), show_progress_bar=False
+        )
+        return [float(score) for score in scores]
+
+    async def arerank(self, question: str, texts: Sequence[str]) -> Optional[List[float]]:
+        """Scores of the texts, or None if the model is busy, failed or did not answer within the budget."""
+        if not texts:
+            return None
+        with self._lock:
+            if self._running is not None and not self._running.done():
+                self.busy += 1
+                return None
+            self._running = future = self._executor.submit(self.score, question, list(texts))
+        try:
+            # Without warm_up, the first pass also loads the model and usually falls back
+            scores = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.budget)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+        except Exception as e:
+            self.errors += 1
+            print(f"Error reranking with {self.model_name}: {str(e)}")
+            return None
+        self.passes += 1
+        return scores
+
+    def stats(self) -> Dict[str, int]:
+        return {'passes': self.passes, 'timeouts': self.timeouts, 'busy': self.busy, 'errors': self.errors}
+
+    def summary(self) -> str:
+        return (
+            f"Reranker {self.model_name}: {self.passes} passes, {self.timeouts} over budget, "
+            f"{self.busy} skipped while busy, {self.errors} errors"
+        )
+
+
+def rerank_order(doc_ids: Sequence[str], scores: Dict[str, float], top_n: int = RERANK_TOP_N) -> List[str]:
+    """
+    Reorder fatwas by score and keep the top_n first (0 keeps all).
+
+    Fatwas without a score keep their rank, the scored ones fill the other ranks best first.
+    """
+    scored = iter(sorted((doc_id for doc_id in doc_ids if doc_id in scores), key=scores.get, reverse=True))
+    ordered = [next(scored) if doc_id in scores else doc_id for doc_id in doc_ids]
+    return ordered[:top_n] if top_n > 0 else ordered
+
+
+_reranker: Optional[Reranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Optional[Reranker]:
+    """Return the process-wide reranker, or None when RERANK_MODEL is not set."""
+    global _reranker
+    if not RERANK_MODEL:
+        return None
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = Reranker(RERANK_MODEL)
+        return _reranker
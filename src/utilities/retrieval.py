@@ -1,8 +1,20 @@
-from typing import Dict, Any, List, Set
-from src.utilities.config import MAX_CUNKS, PINECONE_INDEX_NAME_AR, PINECONE_INDEX_NAME_EN
-from src.utilities.pinecone_manager import PineconeManager
+import asyncio
+from dataclasses import replace
+from typing import Dict, Any, List, Optional, Set, Tuple
+from src.utilities.config import MAX_CUNKS, TOP_K, LEXICAL_SEARCH, RRF_K, PINECONE_INDEX_NAME_AR, PINECONE_INDEX_NAME_EN
+from src.utilities.pinecone_manager import get_pinecone_manager, aget_pinecone_manager
+from src.utilities.retrieval_cache import bump_index_generation, get_index_generation, get_retrieval_cache
+from src.utilities.document_table import StoredDocument, complete_chunks, document_from_chunks
+from src.utilities.lexical_index import get_lexical_index, term_counts
+from src.utilities.reranker import get_reranker, rerank_order
+from src.utilities.context_assembler import assemble_context
+from src.utilities.utils import canonicalize_query, clean_answer_text
 from langchain_core.runnables import RunnableConfig
 
+def retrieval_cache_key(question: str, index_name: str, is_arabic: bool) -> Tuple[str, str, int, int]:
+    """Key of a retrieval result in the retrieval cache."""
+    return canonicalize_query(question, 'ar' if is_arabic else 'en'), index_name, TOP_K, MAX_CUNKS
+
 def retrieve_documents(question: str, is_arabic: bool) -> Dict[str, Any]:
     """
     Retrieve relevant documents from Pinecone based on a question.
@@ -15,7 +27,14 @@ def retrieve_documents(question: str, is_arabic: bool) -> Dict[str, Any]:
         Dict containing raw_answers, context, and sources
     """
     index_name = PINECONE_INDEX_NAME_AR if is_arabic else PINECONE_INDEX_NAME_EN
-    pinecone_manager = PineconeManager(index_name=index_name)
+    cache = get_retrieval_cache()
+    if cache is not None:
+        # Read the generation first, a re-index during retrieval must not be cached over
+        key, generation = retrieval_cache_key(question, index_name, is_arabic), get_index_generation(index_name)
+        cached = cache.get(key, generation)
+        if cached is not None:
+            return cached
+    pinecone_manager = get_pinecone_manager(index_name=index_name)
     
     # Get initial matches - now getting top 10 chunks
     retrieved_chunks = pinecone_manager.retrieve_docs(question)
@@ -24,6 +43,7 @@ def retrieve_documents(question: str, is_arabic: bool) -> Dict[str, Any]:
     chunk_ids_to_fetch, doc_chunks_map = collect_chunk_ids_to_fetch(retrieved_chunks)
     
     # Batch fetch all needed chunks
+    fetched_vectors = {}
     if chunk_ids_to_fetch:
         fetched_vectors = pinecone_manager.batch_fetch_vectors(chunk_ids_to_fetch)
         
@@ -35,10 +55,14 @@ def retrieve_documents(question: str, is_arabic: bool) -> Dict[str, Any]:
     
     complete_answers = construct_complete_answers(doc_chunks_map)
     
-    return {
+    result = {
         "context": "\n\n".join(answer['text'] for answer in complete_answers),
         "sources": list(dict.fromkeys(answer['source'] for answer in complete_answers))
     }
+    # A failed or partial fetch misses chunks, do not serve its partial context again
+    if cache is not None and all(chunk_id in fetched_vectors for chunk_id in chunk_ids_to_fetch):
+        cache.put(key, generation, result)
+    return result
 
 async def aretrieve_documents(question: str, config: RunnableConfig, is_arabic: bool) -> Dict[str, Any]:
     """
@@ -53,35 +77,135 @@ async def aretrieve_documents(question: str, config: RunnableConfig, is_arabic:
         Dict containing raw_answers, context, and sources
     """
     index_name = PINECONE_INDEX_NAME_AR if is_arabic else PINECONE_INDEX_NAME_EN
-    pinecone_manager = PineconeManager(index_name=index_name)
-    retrieved_chunks = await pinecone_manager.aretrieve_docs(question, config)
-    doc_ids_to_fetch = extract_doc_ids(retrieved_chunks)
-    chunk_ids_to_fetch = build_chunk_ids_to_fetch(doc_ids_to_fetch)
-    # Batch fetch all needed chunks
-    fetched_vectors = await pinecone_manager.abatch_fetch_vectors(chunk_ids_to_fetch, config)
-    return {
-        "context": build_context(doc_ids_to_fetch, fetched_vectors),
-        "sources": extract_sources(retrieved_chunks)
+    cache = get_retrieval_cache()
+    if cache is not None:
+        key, generation = retrieval_cache_key(question, index_name, is_arabic), get_index_generation(index_name)
+        cached = cache.get(key, generation)
+        if cached is not None:
+            return cached
+    pinecone_manager = await aget_pinecone_manager(index_name=index_name)
+    table = pinecone_manager.documents
+    # With the document table the query returns ids only, documents are read locally.
+    # BM25 runs in a thread while the query is embedded and searched
+    retrieved_chunks, lexical_hits = await asyncio.gather(
+        pinecone_manager.aretrieve_docs(question, config, include_metadata=table is None),
+        asyncio.to_thread(lexical_search, index_name, question, pinecone_manager.language) if LEXICAL_SEARCH
+        else asyncio.sleep(0, result=[])
+    )
+    doc_ids = list(dict.fromkeys(chunk.id.rsplit('-', 1)[0] for chunk in retrieved_chunks))
+    if lexical_hits:
+        doc_ids = reciprocal_rank_fusion([doc_ids, [doc_id for doc_id, _ in lexical_hits]])[:TOP_K]
+    documents = table.get_many(doc_ids) if table is not None else {}
+    reranker = get_reranker()
+    reranked = await arerank_doc_ids(reranker, question, doc_ids, documents) if reranker is not None else None
+    if reranked is not None:
+        doc_ids = reranked
+    chunk_counts = {doc_id: document.total_chunks for doc_id, document in documents.items()}
+    missing = [doc_id for doc_id in doc_ids if doc_id not in documents]
+    fetched_vectors = {}
+    if missing:
+        counts, fetched_vectors = await afetch_chunk_counts(pinecone_manager, retrieved_chunks, missing, config)
+        chunk_counts.update(counts)
+    selected = select_doc_ids(doc_ids, chunk_counts)
+    complete = all(doc_id in chunk_counts for doc_id in missing)
+
+    # Fatwas missing from the document table are rebuilt from their chunks, and added to it
+    to_fetch = [doc_id for doc_id in selected if doc_id not in documents]
+    if to_fetch:
+        chunk_ids = build_chunk_ids_to_fetch([{doc_id: chunk_counts[doc_id]} for doc_id in to_fetch])
+        fetched_vectors.update(await pinecone_manager.abatch_fetch_vectors(
+            [chunk_id for chunk_id in chunk_ids if chunk_id not in fetched_vectors], config
+        ))
+        complete = complete and all(chunk_id in fetched_vectors for chunk_id in chunk_ids)
+        chunks = complete_chunks(
+            (vector_id, vector.values, vector.metadata) for vector_id, vector in fetched_vectors.items()
+            if vector_id.rsplit('-', 1)[0] in to_fetch
+        )
+        rebuilt = {doc_id: document_from_chunks(doc_id, texts, source) for doc_id, (texts, source) in chunks.items()}
+        if table is not None and rebuilt:
+            # Term counts of the full chunk texts, as at ingestion. The new generation gets them into BM25
+            table.put_many(rebuilt.values(), [term_counts(' '.join(texts), pinecone_manager.language) for texts, _ in chunks.values()])
+            bump_index_generation(index_name)
+        documents.update(rebuilt)
+        documents.update(partial_documents(to_fetch, chunk_counts, fetched_vectors, rebuilt))
+
+    context, context_documents = build_context([documents[doc_id] for doc_id in selected if doc_id in documents])
+    result = {
+        "context": context,
+        "sources": list(dict.fromkeys(document.source for document in context_documents))
     }
+    # A failed or partial fetch misses fatwas or chunks and a skipped rerank keeps the fused order,
+    # do not serve them again
+    if cache is not None and complete and (reranker is None or reranked is not None):
+        cache.put(key, generation, result)
+    return result
 
-def extract_doc_ids(retrieved_chunks):
-    # Extracting doc_ids from the retrieved_chunks
-    # below processes the async results to construct a list of document ids to fetch from pinecone
-    # e.g doc_chunk_list = [{'4866': 11}}]
-    # problem now is there is no way to fetch docs by ids from pinecone in async way
-    doc_ids_to_fetch = []
-    processed_ids: Set[str] = set()
+def lexical_search(index_name: str, question: str, language: str) -> List[Tuple[str, float]]:
+    """BM25 hits of a question, none while the index has no lexical index. Loading one blocks, call it off the event loop."""
+    lexical_index = get_lexical_index(index_name)
+    return lexical_index.search(question, TOP_K, language) if lexical_index is not None else []
+
+async def arerank_doc_ids(reranker, question: str, doc_ids: List[str], documents: Dict[str, StoredDocument]) -> Optional[List[str]]:
+    """Matched fatwas in cross-encoder order, scoring those in the document table, or None if reranking was skipped."""
+    scored = [doc_id for doc_id in doc_ids if doc_id in documents]
+    scores = await reranker.arerank(question, [documents[doc_id].text for doc_id in scored])
+    if scores is None:
+        return None
+    return rerank_order(doc_ids, dict(zip(scored, scores)))
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[str]:
+    """Merge ranked id lists by summing 1 / (k + rank) over the lists, best first, ties in list order."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+async def afetch_chunk_counts(pinecone_manager, retrieved_chunks, doc_ids, config) -> Tuple[Dict[str, int], Dict[str, Any]]:
+    """
+    Chunk counts of some matched fatwas, from the match metadata or by fetching the matched chunks.
+
+    Returns:
+        The chunk count of each fatwa, and the chunks fetched to find them
+    """
+    wanted = set(doc_ids)
+    matched = [chunk for chunk in retrieved_chunks if chunk.id.rsplit('-', 1)[0] in wanted]
+    fetched = {}
+    if all(chunk.metadata for chunk in matched):
+        metadata = {chunk.id: chunk.metadata for chunk in matched}
+    else:
+        fetched = await pinecone_manager.abatch_fetch_vectors([chunk.id for chunk in matched], config)
+        metadata = {vector_id: vector.metadata for vector_id, vector in fetched.items()}
+    chunk_counts: Dict[str, int] = {}
+    for chunk in matched:
+        if chunk.id in metadata:
+            chunk_counts.setdefault(chunk.id.rsplit('-', 1)[0], int(metadata[chunk.id].get('total_chunks', 1)))
+    return chunk_counts, fetched
+
+def select_doc_ids(doc_ids: List[str], chunk_counts: Dict[str, int]) -> List[str]:
+    """Matched fatwas to put in the context, best first, until they add up to MAX_CUNKS chunks."""
+    selected = []
     chunks_added = 0
-    for chunk in retrieved_chunks:
+    for doc_id in doc_ids:
         if chunks_added >= MAX_CUNKS:
             break
-        doc_id = chunk.id.rsplit('-', 1)[0]
-        total_chunks = int(chunk.metadata.get('total_chunks', 1))
-        if doc_id not in processed_ids:
-            doc_ids_to_fetch.append({doc_id: total_chunks})
-            chunks_added += total_chunks
-        processed_ids.add(doc_id)
-    return doc_ids_to_fetch
+        if doc_id in chunk_counts:
+            selected.append(doc_id)
+            chunks_added += chunk_counts[doc_id]
+    return selected
+
+def partial_documents(doc_ids, chunk_counts, fetched_vectors, complete) -> Dict[str, StoredDocument]:
+    """Documents of the fatwas only some chunks of which were fetched, from the chunks that were."""
+    documents = {}
+    for doc_id in doc_ids:
+        if doc_id in complete:
+            continue
+        chunks = [fetched_vectors[f"{doc_id}-{i}"].metadata for i in range(chunk_counts[doc_id]) if f"{doc_id}-{i}" in fetched_vectors]
+        if chunks:
+            documents[doc_id] = document_from_chunks(
+                doc_id, [metadata['text'] for metadata in chunks], chunks[0].get('source', 'No source available')
+            )
+    return documents
 
 def build_chunk_ids_to_fetch(doc_ids_to_fetch):
     # given list of doc_ids and chunks number: [{'4866': 11}}], we build a list of chunk ids to fetch from pinecone
@@ -123,23 +247,15 @@ def collect_chunk_ids_to_fetch(retrieved_chunks):
 
 def construct_complete_answers(doc_chunks_map):
     complete_answers = []
-    for doc_info in doc_chunks_map.items():
+    for doc_info in doc_chunks_map.values():
         # Sort and combine chunks
         sorted_chunks = [
             doc_info['chunks'][i]
             for i in range(doc_info['total'])
             if i in doc_info['chunks']
         ]
-        complete_answer = ' '.join(sorted_chunks)
-
         # remove questions from the context supplied to llm
-        if "answer:" in complete_answer.lower():
-            complete_answer = complete_answer.lower().split("answer:", 1)[1].strip()
-        elif "الجواب: " in complete_answer:
-            complete_answer = complete_answer.split("الجواب: ", 1)[1].strip()
-        
-        # Fix spaces
-        complete_answer = complete_answer.replace("\xa0", " ")
+        complete_answer = clean_answer_text(' '.join(sorted_chunks))
         
         complete_answers.append({
             'text': complete_answer,
@@ -147,53 +263,17 @@ def construct_complete_answers(doc_chunks_map):
             'score': doc_info['score']
         })
     
-    # Sort by score
+    # Sort by score, then drop near duplicates and what exceeds the token budget
     complete_answers.sort(key=lambda x: x['score'], reverse=True)
-    return complete_answers
+    return [
+        {**complete_answers[i], 'text': text}
+        for i, text in assemble_context([answer['text'] for answer in complete_answers])
+    ]
 
-def build_context(doc_ids_to_fetch, fetched_vectors):
-    complete_answers = []
-    for doc_info in doc_ids_to_fetch:
-        for doc_id, total_chunks in doc_info.items():
-            # Initialize variables to store document information
-            answer_text = ""
-            source = "No source available"
-            
-            # Collect all chunks for this document
-            chunks_text = []
-            for i in range(total_chunks):
-                chunk_id = f"{doc_id}-{i}"
-                if chunk_id in fetched_vectors:
-                    chunks_text.append(fetched_vectors[chunk_id].metadata['text'])
-                    # Get source from the first chunk
-                    if i == 0:
-                        source = fetched_vectors[chunk_id].metadata.get('source', source)
-            
-            # Combine all chunks into a complete answer
-            if chunks_text:
-                answer_text = ' '.join(chunks_text)
-                
-                # Post-process to remove question part
-                if "answer:" in answer_text.lower():
-                    answer_text = answer_text.lower().split("answer:", 1)[1].strip()
-                elif "الجواب: " in answer_text:
-                    answer_text = answer_text.split("الجواب: ", 1)[1].strip()
-                
-                # Fix spaces
-                answer_text = answer_text.replace("\xa0", " ")
-                
-                # Add to complete answers
-                complete_answers.append({
-                    'text': answer_text,
-                    'source': source,
-                })
-
-    return "\n\n".join(answer['text'] for answer in complete_answers)
-
-def extract_sources(retrieved_chunks):
-    sources = []
-    for chunk in retrieved_chunks:
-        source = chunk.metadata.get('source', 'No source available')
-        if source not in sources:
-            sources.append(source)
-    return sources
\ No newline at end of file
+def build_context(documents: List[StoredDocument]) -> Tuple[str, List[StoredDocument]]:
+    """
+    Context of the selected fatwas, one answer per paragraph, and the fatwas it holds.
+    Near duplicates are dropped and the answers fit CONTEXT_MAX_TOKENS, see context_assembler.
+    """
+    kept = [replace(documents[i], text=text) for i, text in assemble_context([document.text for document in documents])]
+    return "\n\n".join(document.text for document in kept), kept
@@ -0,0 +1,157 @@
+"""
+In-memory cache of retrieval results and the index generations that invalidate it.
+
+A retrieval result ({context, sources}) is cached under (canonical query, index, TOP_K,
+MAX_CUNKS) together with the generation of the index it was read from. Every write to an
+index bumps its generation, in whichever process ingestion runs, so results cached before
+a re-index are never served.
+
+The generation of an index is the size of an append-only file: a bump appends one byte,
+which is atomic across processes, and a lookup costs one stat() call.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from src.utilities.config import (
+    INDEX_GENERATION_DIR,
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_MAX_BYTES,
+    RETRIEVAL_CACHE_TTL
+)
+
+
+def _generation_path(index_name: str) -> str:
+    return os.path.join(INDEX_GENERATION_DIR, f"{index_name}.generation")
+
+
+def get_index_generation(index_name: str) -> int:
+    """Current generation of an index, 0 if it was never written to."""
+    try:
+        return os.stat(_generation_path(index_name)).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def bump_index_generation(index_name: str) -> None:
+    """Mark an index as changed, invalidating the results cached from it in every process."""
+    os.makedirs(INDEX_GENERATION_DIR, exist_ok=True)
+    fd = os.open(_generation_path(index_name), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, b'.')
+    finally:
+        os.close(fd)
+
+
+def _result_size(result: Dict[str, Any]) -> int:
+    """Approximate memory held by a retrieval result."""
+    return sys.getsizeof(result.get('context', '')) + sum(sys.getsizeof(source) for source in result.get('sources', []))
+
+
+class RetrievalCache:
+    """LRU cache of retrieval results bounded by entries, bytes and age."""
+
+    def __init__(
+        self,
+        max_entries: int = RETRIEVAL_CACHE_SIZE,
+        max_bytes: int = RETRIEVAL_CACHE_MAX_BYTES,
+        ttl: float = RETRIEVAL_CACHE_TTL
+    ):
+        """
+        Args:
+            max_entries: Maximum number of cached results
+            max_bytes: Approximate maximum memory of the cached results
+            ttl: Seconds a result is served for, re-index or not
+        """
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expiry, generation, size, result), least recently used first
+        self._entries: 'OrderedDict[Hashable, Tuple[float, int, int, Dict[str, Any]]]' = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, generation: int) -> Optional[Dict[str, Any]]:
+        """Return a copy of the result cached for key at this index generation, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] < time.monotonic() or entry[1] != generation):
+                self._remove(key)
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = entry[3]
+        return {**result, 'sources': list(result.get('sources', []))}
+
+    def put(self, key: Hashable, generation: int, result: Dict[str, Any]) -> None:
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, generation, size, {**result, 'sources': list(result.get('sources', []))})
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        self._bytes -= self._entries.pop(key)[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'size': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hit_rate
+        }
+
+    def summary(self) -> str:
+        return (
+            f"Retrieval cache: {len(self._entries)}/{self.max_entries} results ({self._bytes / 1e6:.1f} MB), "
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.1%}), "
+            f"{self.evictions} evictions, {self.invalidations} invalidations"
+        )
+
+
+_cache: Optional[RetrievalCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """Return the process-wide retrieval cache, or None when it is disabled."""
+    global _cache
+    if RETRIEVAL_CACHE_SIZE <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = RetrievalCache()
+        return _cache
@@ -0,0 +1,198 @@
+"""
+Parallel, retrying upsert writer for Pinecone.
+
+Vectors are split into sub-batches that stay under Pinecone's per-request vector and
+payload limits, and the sub-batches are sent concurrently over one shared index handle.
+Upserts are idempotent (same ids overwrite the same records), so a failed sub-batch is
+simply sent again with jittered exponential backoff.
+"""
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError, TimeoutError as Urllib3TimeoutError
+from src.utilities.config import UPSERT_WORKERS, UPSERT_BATCH_SIZE, UPSERT_MAX_RETRIES
+
+Vector = Tuple[str, List[float], Dict[str, Any]]
+
+# Pinecone rejects upsert requests above 2 MB or 1000 vectors, keep a margin for the envelope
+MAX_REQUEST_BYTES = 2 * 1024 * 1024 - 64 * 1024
+MAX_REQUEST_VECTORS = 1000
+
+# Serialized size of one float value in a request, conservatively sized for JSON
+_BYTES_PER_VALUE = 12
+
+
+# Transport failures worth another attempt: resets, refused connections, DNS and timeouts.
+# OSError covers the socket level, ConnectionError and TimeoutError included
+_TRANSPORT_ERRORS = (OSError, ProtocolError, Urllib3TimeoutError, MaxRetryError, NewConnectionError)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Retry throttling, server errors and transport failures. Anything else, e.g. an invalid request, fails at once."""
+    status = getattr(error, 'status', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, _TRANSPORT_ERRORS)
+
+
+def _estimate_size(vector: Vector) -> int:
+    vector_id, values, metadata = vector
+    return len(vector_id.encode('utf-8')) + len(values) * _BYTES_PER_VALUE + len(
+        json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+    ) + 32
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one sub-batch."""
+    index: int
+    size: int
+    attempts: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class UpsertReport:
+    """Per-batch outcome of a write() call."""
+    batches: List[BatchResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(batch.ok for batch in self.batches)
+
+    @property
+    def vectors_upserted(self) -> int:
+        return sum(batch.size for batch in self.batches if batch.ok)
+
+    @property
+    def failed(self) -> List[BatchResult]:
+        return [batch for batch in self.batches if not batch.ok]
+
+    @property
+    def retries(self) -> int:
+        return sum(max(batch.attempts - 1, 0) for batch in self.batches)
+
+    def summary(self) -> str:
+        return (
+            f"Upserted {self.vectors_upserted} vectors in {len(self.batches)} batches "
+            f"({len(self.failed)} failed, {self.retries} retries) in {self.elapsed:.1f}s"
+        )
+
+
+class UpsertError(Exception):
+    """Raised when sub-batches still fail after all retries, the report tells which ones."""
+
+    def __init__(self, report: UpsertReport):
+        self.report = report
+        errors = "; ".join(f"batch {batch.index}: {batch.error}" for batch in report.failed[:3])
+        super().__init__(f"{len(report.failed)} of {len(report.batches)} upsert batches failed ({errors})")
+
+
+class UpsertWriter:
+    """Send vectors to a Pinecone index in concurrent, size-bounded, retried sub-batches."""
+
+    def __init__(
+        self,
+        index: Any,
+        namespace: str,
+        batch_size: int = UPSERT_BATCH_SIZE,
+        workers: int = UPSERT_WORKERS,
+        max_retries: int = UPSERT_MAX_RETRIES,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        max_request_bytes: int = MAX_REQUEST_BYTES
+    ):
+        """
+        Args:
+            index: Pinecone index handle, shared by all worker threads
+            namespace: Namespace the vectors are written to
+            batch_size: Maximum number of vectors per request
+            workers: Number of requests in flight
+            max_retries: Maximum number of attempts per sub-batch
+            base_delay: Backoff in seconds before the second attempt, doubled on every retry
+            max_delay: Upper bound for the backoff in seconds
+            max_request_bytes: Estimated payload size at which a sub-batch is cut
+        """
+        self.index = index
+        self.namespace = namespace
+        self.batch_size = max(1, min(batch_size, MAX_REQUEST_VECTORS))
+        self.workers = max(1, workers)
+        self.max_retries = max(1, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_request_bytes = max_request_bytes
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pinecone-upsert")
+            return self._executor
+
+    def split(self, vectors: List[Vector]) -> List[List[Vector]]:
+        """Split vectors into sub-batches under the vector count and payload size limits."""
+        batches: List[List[Vector]] = []
+        current: List[Vector] = []
+        current_size = 0
+        for vector in vectors:
+            size = _estimate_size(vector)
+            if current and (len(current) >= self.batch_size or current_size + size > self.max_request_bytes):
+                batches.append(current)
+                current, current_size = [], 0
+            current.append(vector)
+            current_size += size
+        if current:
+            batches.append(current)
+        return batches
+
+    def write(self, vectors: List[Vector], raise_on_failure: bool = True) -> UpsertReport:
+        """
+        Upsert vectors and wait for every sub-batch.
+
+        Raises:
+            UpsertError: If raise_on_failure is set and a sub-batch failed after all retries
+        """
+        start = time.monotonic()
+        batches = self.split(vectors)
+        if len(batches) <= 1:
+            results = [self._send(i, batch) for i, batch in enumerate(batches)]
+        else:
+            executor = self._get_executor()
+            results = list(executor.map(self._send, range(len(batches)), batches))
+        report = UpsertReport(batches=results, elapsed=time.monotonic() - start)
+        if raise_on_failure and not report.ok:
+            raise UpsertError(report)
+        return report
+
+    def _send(self, batch_index: int, batch: List[Vector]) -> BatchResult:
+        result = BatchResult(index=batch_index, size=len(batch))
+        for attempt in range(self.max_retries):
+            result.attempts = attempt + 1
+            try:
+                self.index.upsert(vectors=batch, namespace=self.namespace)
+                result.error = None
+                return result
+            except Exception as e:
+                result.error = str(e)
+                if not _is_retryable(e) or attempt == self.max_retries - 1:
+                    return result
+                # Full jitter keeps concurrent workers from retrying in lockstep
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+        return result
+
+    def close(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
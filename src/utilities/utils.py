@@ -1,6 +1,5 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional
 from pyarabic.normalize import normalize_searchtext
-from difflib import SequenceMatcher
 from langchain_core.runnables import RunnableLambda
 from langdetect import detect, LangDetectException
 import re
@@ -30,6 +29,22 @@ def preprocess_text(text: str, language: Optional[str] = None) -> str:
         return normalize_arabic_text(text)
     return text
 
+def canonicalize_query(text: str, language: Optional[str] = None) -> str:
+    """
+    Canonical form of a search query, the text that is embedded and the query cache key.
+    Applies preprocess_text (diacritics, hamza and tah marbota folding for Arabic) and
+    collapses whitespace, so spelling variants of a question share one embedding.
+    """
+    return " ".join(preprocess_text(text, language).split())
+
+def clean_answer_text(text: str) -> str:
+    """Keep the answer part of a fatwa's text, dropping the question, and fix non-breaking spaces."""
+    if "answer:" in text.lower():
+        text = text.lower().split("answer:", 1)[1].strip()
+    elif "الجواب: " in text:
+        text = text.split("الجواب: ", 1)[1].strip()
+    return text.replace("\xa0", " ")
+
 def sources_in_markdown(sources, is_arabic=False):
     """Format sources as a list of dictionaries with titles and URLs."""
     formatted_sources = format_sources(sources, is_arabic)
@@ -63,27 +78,6 @@ def extract_title_from_url(url, is_arabic=False):
     title = path.split('.')[0].replace('-', ' ').replace('_', ' ')
     return title.title()
 
-def calculate_similarity(text1: str, text2: str) -> float:
-    """Calculate similarity ratio between two texts."""
-    return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-
-def is_duplicate_answer(new_answer: str, existing_answers: List[str], threshold: float = 0.7) -> bool:
-    """Check if an answer is too similar to existing answers."""
-    for existing in existing_answers:
-        if calculate_similarity(new_answer, existing) > threshold:
-            return True
-    return False
-
-def count_tokens(text: str) -> int:
-    """Approximate token count based on words (rough estimation)."""
-    return len(text.split())
-
-def summarize_text(text: str, max_tokens: int) -> str:
-    """
-    Summarize text to fit within token limit by taking the first and last parts.
-    """
-    return text
-
 def detect_language(text: str) -> str:
     """Detect the language of the input text."""
     try:
@@ -103,36 +97,3 @@ def remove_chain_of_thought(message):
 
 # Wrap the function as a RunnableLambda for integration in the chain
 cleaner = RunnableLambda(remove_chain_of_thought)
-
-def process_context(answers: List[Dict[str, Any]], max_tokens: int = 500) -> List[Dict[str, Any]]:
-    """
-    Preprocess context by limiting tokens and removing duplicates.
-    """
-    processed_answers = []
-    current_token_count = 0
-    existing_texts = []
-    
-    for answer in answers:
-        answer_text = answer['text']
-        answer_tokens = count_tokens(answer_text)
-        
-        # If this is the first answer and it exceeds token limit, summarize it
-        if not processed_answers and answer_tokens > max_tokens:
-            summarized_text = summarize_text(answer_text, max_tokens)
-            answer = {**answer, 'text': summarized_text}
-            processed_answers.append(answer)
-            break
-        
-        # Skip if this would exceed token limit
-        if current_token_count + answer_tokens > max_tokens:
-            break
-            
-        # Skip if too similar to existing answers
-        if is_duplicate_answer(answer_text, existing_texts):
-            continue
-            
-        processed_answers.append(answer)
-        existing_texts.append(answer_text)
-        current_token_count += answer_tokens
-    
-    return processed_answers
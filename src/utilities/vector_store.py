@@ -0,0 +1,651 @@
+"""
+Vector store backends behind PineconeManager.
+
+PineconeManager embeds texts and delegates storage and search to a VectorStore:
+
+    PineconeStore     the Pinecone serverless index (default)
+    LocalVectorStore  an in-process index persisted to memory-mapped files, for offline
+                      use and to take the network round-trip out of every query
+
+Both use the same "{fatwa id}-{chunk}" ids and metadata and return Match / FetchedVector
+results, so retrieval code does not depend on the backend. VECTOR_BACKEND selects one.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from pinecone import Pinecone, ServerlessSpec
+from src.utilities.config import (
+    PINECONE_API_KEY,
+    PINECONE_ENVIRONMENT,
+    EMBEDDING_DIMENSION,
+    UPSERT_WORKERS,
+    LOCAL_IVF_MIN_VECTORS,
+    LOCAL_IVF_NPROBE,
+    LOCAL_VECTOR_QUANTIZATION,
+    LOCAL_RESCORE_FACTOR
+)
+from src.utilities.pinecone_http import AsyncIndexClient, FetchedVector, Match
+from src.utilities.quantization import code_dtype, quantize, score
+from src.utilities.upsert_writer import BatchResult, UpsertReport, UpsertWriter
+
+try:
+    import fcntl
+except ImportError:  # Windows, a single writing process per directory is assumed
+    fcntl = None
+
+Vector = Tuple[str, List[float], Dict[str, Any]]
+
+
+class VectorStore(ABC):
+    """Storage and nearest-neighbour search of chunk vectors."""
+
+    @abstractmethod
+    def upsert(self, vectors: List[Vector]) -> UpsertReport:
+        """Insert vectors, replacing existing vectors with the same ids."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """Delete vectors by id, unknown ids are ignored."""
+
+    @abstractmethod
+    def query(self, vector: List[float], top_k: int, include_metadata: bool = True) -> List[Match]:
+        """Return the top_k most similar vectors by cosine similarity, best first, with empty metadata unless include_metadata."""
+
+    @abstractmethod
+    def fetch(self, ids: List[str]) -> Dict[str, FetchedVector]:
+        """Return the stored vectors of the given ids, missing ids are left out."""
+
+    async def aquery(self, vector: List[float], top_k: int, include_metadata: bool = True) -> List[Match]:
+        return await asyncio.to_thread(self.query, vector, top_k, include_metadata)
+
+    async def afetch(self, ids: List[str]) -> Dict[str, FetchedVector]:
+        return await asyncio.to_thread(self.fetch, ids)
+
+    def warm_up(self) -> None:
+        """Do one-time setup ahead of the first request."""
+
+    def close(self) -> None:
+        pass
+
+
+_client_lock = threading.RLock()
+_client: Optional[Pinecone] = None
+_checked_indexes: Set[str] = set()
+
+
+def get_pinecone_client() -> Pinecone:
+    """Return the shared Pinecone client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = Pinecone(
+                api_key=PINECONE_API_KEY,
+                environment=PINECONE_ENVIRONMENT
+            )
+        return _client
+
+
+class PineconeStore(VectorStore):
+    """Pinecone serverless index, through the SDK for writes and the REST API for async reads."""
+
+    def __init__(self, index_name: str, namespace: str):
+        self.index_name = index_name
+        self.namespace = namespace
+        self.pc = get_pinecone_client()
+        self._lock = threading.Lock()
+        self._index = None
+        self._async_index: Optional[AsyncIndexClient] = None
+        self._upsert_writer: Optional[UpsertWriter] = None
+        self.ensure_index_exists()
+
+    def ensure_index_exists(self) -> None:
+        """Create index if it doesn't exist, checking each index once per process."""
+        with _client_lock:
+            if self.index_name in _checked_indexes:
+                return
+            if self.index_name not in self.pc.list_indexes().names():
+                print(f"Creating index '{self.index_name}'...")
+                self.pc.create_index(
+                    name=self.index_name,
+                    dimension=EMBEDDING_DIMENSION,
+                    metric="cosine",
+                    spec=ServerlessSpec(
+                        cloud="aws",
+                        region="us-east-1"
+                    )
+                )
+                print(f"Index '{self.index_name}' created successfully")
+            _checked_indexes.add(self.index_name)
+
+    @property
+    def index(self):
+        """Index handle, created once and shared so its connection pool is reused."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self.pc.Index(self.index_name, pool_threads=UPSERT_WORKERS)
+        return self._index
+
+    @property
+    def async_index(self) -> AsyncIndexClient:
+        """HTTP client of the index for asyncio code, the index host is looked up once."""
+        if self._async_index is None:
+            with self._lock:
+                if self._async_index is None:
+                    host = self.pc.describe_index(self.index_name).host
+                    self._async_index = AsyncIndexClient(host, self.namespace)
+        return self._async_index
+
+    @property
+    def upsert_writer(self) -> UpsertWriter:
+        if self._upsert_writer is None:
+            self._upsert_writer = UpsertWriter(self.index, self.namespace)
+        return self._upsert_writer
+
+    def upsert(self, vectors: List[Vector]) -> UpsertReport:
+        """Upsert in concurrent, retried sub-batches, raising UpsertError if any fails."""
+        return self.upsert_writer.write(vectors)
+
+    def delete(self, ids: List[str], batch_size: int = 1000) -> None:
+        # Batches within Pinecone's per-request limit
+        for i in range(0, len(ids), batch_size):
+            self.index.delete(ids=ids[i:i + batch_size], namespace=self.namespace)
+
+    def query(self, vector: List[float], top_k: int, include_metadata: bool = True) -> List[Match]:
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            namespace=self.namespace,
+            include_metadata=include_metadata,
+            include_values=False
+        )
+        return results.matches
+
+    def fetch(self, ids: List[str]) -> Dict[str, FetchedVector]:
+        return self.index.fetch(ids=ids, namespace=self.namespace).vectors
+
+    async def _aasync_index(self) -> AsyncIndexClient:
+        if self._async_index is None:
+            # The one-time host lookup is a blocking SDK call
+            return await asyncio.to_thread(lambda: self.async_index)
+        return self._async_index
+
+    async def aquery(self, vector: List[float], top_k: int, include_metadata: bool = True) -> List[Match]:
+        index = await self._aasync_index()
+        return await index.query(vector, top_k=top_k, include_metadata=include_metadata)
+
+    async def afetch(self, ids: List[str]) -> Dict[str, FetchedVector]:
+        index = await self._aasync_index()
+        return await index.fetch(ids)
+
+    def warm_up(self) -> None:
+        self.async_index
+
+    def close(self) -> None:
+        if self._upsert_writer is not None:
+            self._upsert_writer.close()
+        if self._async_index is not None:
+            self._async_index.close()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    slot INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS unindexed (
+    slot INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# File suffix of the codes of each quantization
+_CODE_SUFFIXES = {'int8': 'i8', 'float16': 'f16'}
+
+
+class IVFIndex:
+    """
+    Inverted file index over unit vectors: spherical k-means centroids and, per centroid, the
+    slots assigned to it and a copy of their (quantized) vectors, stored list by list so
+    scanning a list reads one contiguous block. A query scans the lists of its nprobe
+    closest centroids only.
+    """
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, slots: np.ndarray, codes: np.ndarray, scales: np.ndarray):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.slots = slots
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        valid: np.ndarray,
+        quantization: str = 'none',
+        iterations: int = 10,
+        seed: int = 0
+    ) -> 'IVFIndex':
+        slots = np.flatnonzero(valid)
+        data = np.asarray(vectors[slots])
+        nlist = max(1, int(np.sqrt(len(slots))))
+        rng = np.random.default_rng(seed)
+        # Train on a sample, large corpora do not need every vector to place the centroids
+        sample = data[rng.choice(len(data), size=min(len(data), 64 * nlist), replace=False)]
+        centroids = sample[:nlist].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assignment == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=nlist), out=offsets[1:])
+        codes, scales = quantize(data[order], quantization)
+        return cls(centroids.astype(np.float32), offsets, slots[order].astype(np.int64), codes, scales)
+
+    def search(self, query: np.ndarray, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (slots, approximate scores) of the vectors in the lists closest to the query."""
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        bounds = [(self.offsets[c], self.offsets[c + 1]) for c in probe]
+        slots = [self.slots[start:end] for start, end in bounds]
+        scores = [score(self.codes[start:end], self.scales[start:end], query) for start, end in bounds]
+        return np.concatenate(slots), np.concatenate(scores)
+
+    def save(self, path: str) -> None:
+        """Write the index to path (.npz) and its codes next to it, replacing an older build."""
+        directory = os.path.dirname(path)
+        codes_name = f"ivf-{uuid.uuid4().hex}.codes"
+        self.codes.tofile(os.path.join(directory, codes_name))
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, offsets=self.offsets, slots=self.slots, scales=self.scales,
+                 codes_file=np.array(codes_name), codes_dtype=np.array(self.codes.dtype.str))
+        os.replace(tmp_path, path)
+        # Readers keep the old codes open until they load the new build
+        for name in os.listdir(directory):
+            if name.startswith('ivf-') and name.endswith('.codes') and name != codes_name:
+                os.remove(os.path.join(directory, name))
+
+    @classmethod
+    def load(cls, path: str) -> 'IVFIndex':
+        with np.load(path) as data:
+            centroids, offsets, slots, scales = data['centroids'], data['offsets'], data['slots'], data['scales']
+            codes_path = os.path.join(os.path.dirname(path), str(data['codes_file']))
+            dtype = np.dtype(str(data['codes_dtype']))
+        codes = np.memmap(codes_path, dtype=dtype, mode='r', shape=(len(slots), centroids.shape[1]))
+        return cls(centroids, offsets, slots, codes, scales)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector index persisted in a directory.
+
+    Unit-normalized vectors live in a memory-mapped float32 file, one row per slot, and
+    ids and metadata in SQLite. A slot counts only once its record is committed, so a write
+    interrupted between the two leaves the index consistent. Small corpora are searched by
+    brute force; from ivf_min_vectors vectors an IVF index narrows each search to a few
+    lists, plus the slots written since the index was built, which are tracked in SQLite
+    until the next rebuild. Other processes writing to the same directory are picked up on
+    the next query. Writes hold an exclusive lock on the directory's write.lock file from
+    slot allocation to commit, so concurrent writers never pick the same free slot.
+
+    With int8 or float16 quantization, searches scan compact codes (plus per-vector scales
+    for int8) instead of the float32 file, and the best top_k * rescore_factor candidates are
+    rescored with their float32 vectors. Only those rows of the float32 file are read, so
+    the pages a search touches are mostly the codes, which every process maps and shares.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dimension: int = EMBEDDING_DIMENSION,
+        ivf_min_vectors: int = LOCAL_IVF_MIN_VECTORS,
+        nprobe: int = LOCAL_IVF_NPROBE,
+        quantization: str = LOCAL_VECTOR_QUANTIZATION,
+        rescore_factor: int = LOCAL_RESCORE_FACTOR
+    ):
+        """
+        Args:
+            directory: Directory holding the index files
+            dimension: Length of the vectors
+            ivf_min_vectors: Number of vectors from which searches use the IVF index, 0 never does
+            nprobe: Number of IVF lists scanned per query
+            quantization: "none", "int8" or "float16" codes to search with
+            rescore_factor: Candidates rescored with float32 vectors per requested result, 0 disables rescoring
+        """
+        code_dtype(quantization)
+        self.directory = directory
+        self.dimension = dimension
+        self.ivf_min_vectors = ivf_min_vectors
+        self.nprobe = max(1, nprobe)
+        self.quantization = quantization
+        self.rescore_factor = max(0, rescore_factor)
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, 'vectors.f32')
+        self._codes_path = os.path.join(directory, f"vectors.{_CODE_SUFFIXES.get(quantization, 'f32')}")
+        self._scales_path = os.path.join(directory, 'scales.f32')
+        self._ivf_path = os.path.join(directory, 'ivf.npz')
+        self._lock = threading.RLock()
+        self._lock_file = open(os.path.join(directory, 'write.lock'), 'a+b')
+        self._write_depth = 0
+        self._conn = sqlite3.connect(os.path.join(directory, 'records.db'), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._vectors: Optional[np.memmap] = None
+        self._codes: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._slots: Dict[str, int] = {}
+        self._valid = np.zeros(0, dtype=bool)
+        self._free: List[int] = []
+        self._ivf: Optional[IVFIndex] = None
+        self._ivf_mtime = 0.0
+        self._unindexed = np.zeros(0, dtype=np.int64)
+        self._unindexed_mask = np.zeros(0, dtype=bool)
+        self._data_version = None
+        self._reload()
+        self._check_quantization()
+
+    # Loading
+
+    @property
+    def _quantized(self) -> bool:
+        return self.quantization != 'none'
+
+    def _capacity(self) -> int:
+        return os.path.getsize(self._vectors_path) // (4 * self.dimension) if os.path.exists(self._vectors_path) else 0
+
+    @staticmethod
+    def _map(path: str, dtype: np.dtype, shape: Tuple[int, ...]) -> np.memmap:
+        """Map a file, growing it to the shape first."""
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if not os.path.exists(path) or os.path.getsize(path) < size:
+            with open(path, 'ab') as f:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode='r+', shape=shape)
+
+    def _open(self, capacity: int) -> None:
+        if not capacity:
+            self._vectors = self._codes = self._scales = None
+            return
+        self._vectors = self._map(self._vectors_path, np.float32, (capacity, self.dimension))
+        if self._quantized:
+            self._codes = self._map(self._codes_path, code_dtype(self.quantization), (capacity, self.dimension))
+            self._scales = self._map(self._scales_path, np.float32, (capacity,))
+        else:
+            self._codes, self._scales = self._vectors, None
+
+    def _check_quantization(self) -> None:
+        """Requantize the stored vectors if the directory was written with another quantization."""
+        with self._writing():
+            stored = self._conn.execute("SELECT value FROM meta WHERE key = 'quantization'").fetchone()
+            if stored is not None and stored[0] == self.quantization:
+                return
+            if self._quantized and self._slots:
+                slots = np.flatnonzero(self._valid)
+                for start in range(0, len(slots), 8192):
+                    batch = slots[start:start + 8192]
+                    self._codes[batch], self._scales[batch] = quantize(self._vectors[batch], self.quantization)
+                self._codes.flush()
+                self._scales.flush()
+            # Drop the codes of other quantizations and the index built from them
+            stale = [os.path.join(self.directory, f"vectors.{suffix}") for suffix in _CODE_SUFFIXES.values()] + [self._ivf_path]
+            for path in stale:
+                if path != self._codes_path and os.path.exists(path):
+                    os.remove(path)
+            self._ivf = None
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('quantization', ?)", (self.quantization,))
+            self._maybe_rebuild_ivf()
+
+    def _reload(self) -> None:
+        """Rebuild the id map from the committed records and reopen the vector files."""
+        with self._lock:
+            rows = self._conn.execute("SELECT slot, id FROM records").fetchall()
+            self._slots = {vector_id: slot for slot, vector_id in rows}
+            capacity = max(self._capacity(), max((slot for slot, _ in rows), default=-1) + 1)
+            self._open(capacity)
+            self._valid = np.zeros(capacity, dtype=bool)
+            if rows:
+                self._valid[[slot for slot, _ in rows]] = True
+            self._free = sorted(np.flatnonzero(~self._valid).tolist(), reverse=True)
+            self._load_ivf()
+            self._set_unindexed([slot for slot, in self._conn.execute("SELECT slot FROM unindexed")])
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load_ivf(self) -> None:
+        if not os.path.exists(self._ivf_path):
+            self._ivf = None
+            return
+        mtime = os.path.getmtime(self._ivf_path)
+        if self._ivf is None or mtime != self._ivf_mtime:
+            self._ivf = IVFIndex.load(self._ivf_path)
+            self._ivf_mtime = mtime
+
+    def _set_unindexed(self, slots) -> None:
+        self._unindexed = np.asarray(slots, dtype=np.int64)
+        self._unindexed_mask = np.zeros(len(self._valid), dtype=bool)
+        self._unindexed_mask[self._unindexed] = True
+
+    def _refresh(self) -> None:
+        """Reload if another process committed changes since the last look."""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._reload()
+
+    # Writes
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """
+        Hold the thread lock and the cross-process write lock, reentrantly, with the
+        changes other processes committed before the lock was taken loaded.
+        """
+        with self._lock:
+            if self._write_depth == 0 and fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._write_depth += 1
+            try:
+                if self._write_depth == 1:
+                    self._refresh()
+                yield
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _allocate(self, count: int) -> List[int]:
+        if len(self._free) < count:
+            old_capacity = len(self._valid)
+            capacity = max(old_capacity * 2, old_capacity + count - len(self._free), 1024)
+            self._flush()
+            self._open(capacity)
+            self._valid = np.concatenate([self._valid, np.zeros(capacity - old_capacity, dtype=bool)])
+            self._set_unindexed(self._unindexed)
+            self._free = list(range(capacity - 1, old_capacity - 1, -1)) + self._free
+        return [self._free.pop() for _ in range(count)]
+
+    def _flush(self) -> None:
+        for matrix in (self._vectors, self._codes, self._scales):
+            if matrix is not None:
+                matrix.flush()
+
+    def upsert(self, vectors: List[Vector]) -> UpsertReport:
+        start = time.monotonic()
+        # Last write wins for ids repeated within the batch
+        latest = {vector_id: (values, metadata) for vector_id, values, metadata in vectors}
+        with self._writing():
+            new_ids = [vector_id for vector_id in latest if vector_id not in self._slots]
+            slots = dict(zip(new_ids, self._allocate(len(new_ids))))
+            slots.update({vector_id: self._slots[vector_id] for vector_id in latest if vector_id in self._slots})
+            matrix = np.asarray([values for values, _ in latest.values()], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.maximum(norms, 1e-12)
+            order = [slots[vector_id] for vector_id in latest]
+            # Vectors reach the files before the records that make their slots visible
+            self._vectors[order] = matrix
+            if self._quantized:
+                self._codes[order], self._scales[order] = quantize(matrix, self.quantization)
+            self._flush()
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO records (slot, id, metadata) VALUES (?, ?, ?)",
+                    [(slots[vector_id], vector_id, json.dumps(metadata, ensure_ascii=False))
+                     for vector_id, (_, metadata) in latest.items()]
+                )
+                if self._ivf is not None:
+                    # New and rewritten vectors may belong to any list, they are scanned on every query
+                    self._conn.executemany("INSERT OR IGNORE INTO unindexed (slot) VALUES (?)", [(slot,) for slot in order])
+            self._slots.update(slots)
+            self._valid[order] = True
+            if self._ivf is not None:
+                self._set_unindexed(np.union1d(self._unindexed, order))
+            self._maybe_rebuild_ivf()
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return UpsertReport(batches=[BatchResult(index=0, size=len(vectors), attempts=1)], elapsed=time.monotonic() - start)
+
+    def delete(self, ids: List[str]) -> None:
+        with self._writing():
+            slots = [self._slots.pop(vector_id) for vector_id in ids if vector_id in self._slots]
+            if not slots:
+                return
+            with self._conn:
+                self._conn.executemany("DELETE FROM records WHERE slot = ?", [(slot,) for slot in slots])
+            self._valid[slots] = False
+            self._free.extend(slots)
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _maybe_rebuild_ivf(self) -> None:
+        """Rebuild the IVF index once a tenth of the corpus is searched outside it."""
+        count = len(self._slots)
+        if not self.ivf_min_vectors or count < self.ivf_min_vectors:
+            return
+        if self._ivf is not None and len(self._unindexed) * 10 < count:
+            return
+        self.rebuild_index()
+
+    def rebuild_index(self) -> None:
+        """Cluster the current vectors into a fresh IVF index and persist it."""
+        with self._writing():
+            self._ivf = IVFIndex.build(self._vectors, self._valid, self.quantization)
+            self._ivf.save(self._ivf_path)
+            self._ivf_mtime = os.path.getmtime(self._ivf_path)
+            with self._conn:
+                self._conn.execute("DELETE FROM unindexed")
+            self._set_unindexed([])
+
+    # Reads
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _metadata(self, slots: Iterable[int], include_metadata: bool = True) -> Dict[int, Tuple[str, Dict[str, Any]]]:
+        slots = list(slots)
+        if not slots:
+            return {}
+        # Ids only: skip copying and decoding the metadata
+        metadata_column = 'metadata' if include_metadata else "'{}'"
+        rows = self._conn.execute(
+            f"SELECT slot, id, {metadata_column} FROM records WHERE slot IN ({', '.join('?' * len(slots))})", slots
+        ).fetchall()
+        return {slot: (vector_id, json.loads(metadata)) for slot, vector_id, metadata in rows}
+
+    def _search(self, query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the candidate (slots, scores) of a query, scored with the search codes."""
+        if self._ivf is None or not self.ivf_min_vectors or len(self._slots) < self.ivf_min_vectors:
+            # Free slots past the last used one are never scored
+            end = len(self._valid) - int(np.argmax(self._valid[::-1]))
+            scores = score(self._codes[:end], self._scales[:end], query) if self._quantized else self._vectors[:end] @ query
+            scores[~self._valid[:end]] = -np.inf
+            return np.arange(end), scores
+        listed, listed_scores = self._ivf.search(query, self.nprobe)
+        # Unindexed slots may still sit in their old list with an old vector, score them from the files
+        keep = self._valid[listed] & ~self._unindexed_mask[listed]
+        unindexed = self._unindexed[self._valid[self._unindexed]]
+        return (
+            np.concatenate([listed[keep], unindexed]),
+            np.concatenate([listed_scores[keep], score(self._codes, self._scales, query, unindexed) if self._quantized
+                            else self._vectors[unindexed] @ query])
+        )
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest finite scores, best first."""
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        best = np.argpartition(-scores, k - 1)[:k]
+        return best[np.argsort(-scores[best])]
+
+    def query(self, vector: List[float], top_k: int, include_metadata: bool = True) -> List[Match]:
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            self._refresh()
+            if not self._slots:
+                return []
+            slots, scores = self._search(query)
+            if self._quantized and self.rescore_factor:
+                # Rescore the best approximate candidates with their float32 vectors
+                slots = np.sort(slots[self._top(scores, top_k * self.rescore_factor)])
+                scores = self._vectors[slots] @ query
+            best = self._top(scores, top_k)
+            records = self._metadata((int(slots[i]) for i in best), include_metadata)
+        return [
+            Match(id=records[int(slots[i])][0], score=float(scores[i]), metadata=records[int(slots[i])][1])
+            for i in best if int(slots[i]) in records
+        ]
+
+    def fetch(self, ids: List[str]) -> Dict[str, FetchedVector]:
+        with self._lock:
+            self._refresh()
+            slots = [self._slots[vector_id] for vector_id in ids if vector_id in self._slots]
+            records = self._metadata(slots)
+            return {
+                vector_id: FetchedVector(id=vector_id, metadata=metadata, values=self._vectors[slot].tolist())
+                for slot, (vector_id, metadata) in records.items()
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._conn.close()
+            self._lock_file.close()
+
+
+def create_vector_store(backend: str, index_name: str, namespace: str, directory: str) -> VectorStore:
+    """
+    Create the vector store of an index.
+
+    Args:
+        backend: "pinecone" or "local"
+        index_name: Name of the index, local indexes are stored under directory/index_name/namespace
+        namespace: Namespace of the vectors
+        directory: Root directory of local indexes
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend == 'pinecone':
+        return PineconeStore(index_name, namespace)
+    if backend == 'local':
+        return LocalVectorStore(os.path.join(directory, index_name, namespace))
+    raise ValueError(f"Unknown vector backend '{backend}', expected 'pinecone' or 'local'")
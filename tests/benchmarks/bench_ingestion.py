@@ -0,0 +1,408 @@
+"""
+Offline benchmark for the full ingestion path.
+
+Serves a sitemap index and the saved fatwa fixtures from a local HTTP server and runs
+ascrape_and_ingest() of the Arabic and English scrapers against it. Embeddings and upserts
+go to a stub sink instead of the embedding model and Pinecone, and the document store,
+manifest and validators are written to a temporary directory. Reports pages/sec, parse
+time, chunk and embedding throughput and the peak RSS observed while each stage was busy.
+
+Each page gets its fatwa id mixed into the question, so every page is a distinct document.
+Peak RSS covers this process only, parser worker processes (--parse-workers) are not included.
+
+Usage:
+    python -m tests.benchmarks.bench_ingestion --pages 2000 --output ingestion.json
+    python -m tests.benchmarks.bench_ingestion --pages 2000 --baseline ingestion.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import resource
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from tests.benchmarks.common import OfflineArabicScraper, OfflineEnglishScraper, load_fixture
+
+URLS_PER_SITEMAP = 500
+
+# Path of a fatwa page, per language, matching the scrapers' _is_valid_fatwa_url
+PAGE_PATHS = {
+    'ar': '/ar/fatawa/{id}/fixture',
+    'en': '/en/fatwa/details/{id}/fixture',
+}
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # No procfs, fall back to the peak so far (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+class StageMonitor:
+    """Sample the RSS in a background thread and attribute it to the stages active at that moment."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak_rss: Dict[str, int] = {'total': current_rss()}
+        self.busy_seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def __enter__(self) -> 'StageMonitor':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        rss = current_rss()
+        with self._lock:
+            for stage in list(self._active) + ['total']:
+                self.peak_rss[stage] = max(self.peak_rss.get(stage, 0), rss)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with self._lock:
+            self._active[name] = self._active.get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            # Short calls can finish between two samples, take one on the way out
+            self._sample()
+            with self._lock:
+                self._active[name] -= 1
+                if not self._active[name]:
+                    del self._active[name]
+                self.busy_seconds[name] = self.busy_seconds.get(name, 0.0) + elapsed
+                self.calls[name] = self.calls.get(name, 0) + 1
+
+
+class StubVectorSink:
+    """Stands in for PineconeManager: deterministic fake embeddings, upserts are only counted."""
+
+    def __init__(self, monitor: StageMonitor, dimension: int = 768, embed_cost: float = 0.0):
+        """
+        Args:
+            monitor: Monitor the embed and upsert calls are reported to
+            dimension: Length of the fake vectors
+            embed_cost: Seconds of simulated model time per chunk
+        """
+        self.monitor = monitor
+        self.dimension = dimension
+        self.embed_cost = embed_cost
+        self.embedding_model = 'stub-embedding-model'
+        self.chunks_embedded = 0
+        self.embedding_calls = 0
+        self.vectors_upserted = 0
+        self.vectors_deleted = 0
+
+    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        with self.monitor.stage('embed'):
+            if self.embed_cost:
+                time.sleep(self.embed_cost * len(texts))
+            vectors = []
+            for text in texts:
+                seed = hashlib.sha1(text.encode('utf-8')).digest()
+                vectors.append([seed[i % len(seed)] / 255.0 for i in range(self.dimension)])
+            self.chunks_embedded += len(texts)
+            self.embedding_calls += 1
+            return vectors
+
+    def upsert_vectors(self, vectors: List[Tuple[str, List[float], Dict]]) -> None:
+        with self.monitor.stage('upsert'):
+            self.vectors_upserted += len(vectors)
+
+    def delete_vectors(self, ids: List[str], batch_size: int = 1000) -> None:
+        self.vectors_deleted += len(ids)
+
+    def build_lexical_index(self) -> None:
+        pass
+
+
+class BenchScraperMixin:
+    """Points a scraper at the local server, the stub sink and a scratch directory."""
+
+    def __init__(self, *args, base_url: str = '', workdir: str = '', sink: Optional[StubVectorSink] = None,
+                 monitor: Optional[StageMonitor] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.base_url = base_url
+        self.workdir = workdir
+        self.sink = sink
+        self.monitor = monitor
+
+    def _init_pinecone(self):
+        return self.sink
+
+    def _get_base_url(self) -> str:
+        return self.base_url
+
+    def _get_sitemap_url(self) -> str:
+        return f"{self.base_url}/{self.language}/sitemap.xml"
+
+    def _get_json_file_path(self) -> str:
+        return os.path.join(self.workdir, f'fatwas_{self.language}.json')
+
+    def _get_document_store_path(self) -> str:
+        return os.path.join(self.workdir, f'fatwas_{self.language}.db')
+
+    def _get_validators_file_path(self) -> str:
+        return os.path.join(self.workdir, f'validators_{self.language}.json')
+
+    def _get_manifest_file_path(self) -> str:
+        return os.path.join(self.workdir, f'manifest_{self.language}.json')
+
+    def parse_qa_from_page(self, html_content: str, url: str, qa_id: str, lastmod: datetime) -> Optional[Dict[str, str]]:
+        if self.monitor is None:
+            return super().parse_qa_from_page(html_content, url, qa_id, lastmod)
+        with self.monitor.stage('parse'):
+            return super().parse_qa_from_page(html_content, url, qa_id, lastmod)
+
+    def _save_qa_items(self, qa_items: List[Dict[str, str]], mark_updated: bool = True,
+                       lastmods: Optional[List[Optional[str]]] = None) -> None:
+        with self.monitor.stage('chunk'):
+            super()._save_qa_items(qa_items, mark_updated, lastmods)
+
+
+class BenchArabicScraper(BenchScraperMixin, OfflineArabicScraper):
+    pass
+
+
+class BenchEnglishScraper(BenchScraperMixin, OfflineEnglishScraper):
+    pass
+
+
+BENCH_SCRAPERS = {
+    'ar': BenchArabicScraper,
+    'en': BenchEnglishScraper,
+}
+
+
+class FixtureSite:
+    """Local HTTP stand-in for dar-alifta.org serving a sitemap index and fixture pages."""
+
+    def __init__(self, pages: int, lastmod: str = '2024-01-01T00:00:00+00:00'):
+        self.pages = pages
+        self.lastmod = lastmod
+        self.templates = {language: load_fixture(f'{language}_fatwa.html') for language in PAGE_PATHS}
+        self.requests = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-site", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> 'FixtureSite':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _sitemap_index(self, language: str) -> str:
+        children = ''.join(
+            f"<sitemap><loc>{self.base_url}/{language}/sitemap-{i}.xml</loc><lastmod>{self.lastmod}</lastmod></sitemap>"
+            for i in range((self.pages + URLS_PER_SITEMAP - 1) // URLS_PER_SITEMAP)
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{children}</sitemapindex>'
+
+    def _sitemap(self, language: str, part: int) -> str:
+        first = part * URLS_PER_SITEMAP + 1
+        urls = ''.join(
+            f"<url><loc>{self.base_url}{PAGE_PATHS[language].format(id=fatwa_id)}</loc><lastmod>{self.lastmod}</lastmod></url>"
+            for fatwa_id in range(first, min(first + URLS_PER_SITEMAP, self.pages + 1))
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+    def _page(self, language: str, fatwa_id: str) -> str:
+        # The first plain paragraph is the question, make every page a distinct fatwa
+        return self.templates[language].replace('<p>', f'<p>({fatwa_id}) ', 1)
+
+    def render(self, path: str) -> Optional[Tuple[str, str]]:
+        """Return the (content type, body) of a path, or None if it does not exist."""
+        parts = path.strip('/').split('/')
+        language = parts[0] if parts else ''
+        if language not in PAGE_PATHS:
+            return None
+        if parts[1:] == ['sitemap.xml']:
+            return 'application/xml', self._sitemap_index(language)
+        if len(parts) == 2 and parts[1].startswith('sitemap-') and parts[1].endswith('.xml'):
+            return 'application/xml', self._sitemap(language, int(parts[1][len('sitemap-'):-len('.xml')]))
+        prefix = PAGE_PATHS[language].split('{id}')[0].strip('/').split('/')
+        if parts[:len(prefix)] == prefix and len(parts) > len(prefix) and parts[len(prefix)].isdigit():
+            if 1 <= int(parts[len(prefix)]) <= self.pages:
+                return 'text/html; charset=utf-8', self._page(language, parts[len(prefix)])
+        return None
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                site.requests += 1
+                rendered = site.render(self.path)
+                if rendered is None:
+                    self.send_error(404)
+                    return
+                content_type, body = rendered
+                payload = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def run_language(language: str, site: FixtureSite, args: argparse.Namespace) -> Dict[str, Any]:
+    """Ingest the fixture site with one language's scraper and collect its metrics."""
+    with tempfile.TemporaryDirectory(prefix=f'bench-ingestion-{language}-') as workdir, StageMonitor() as monitor:
+        sink = StubVectorSink(monitor, embed_cost=args.embed_cost / 1000)
+        scraper = BENCH_SCRAPERS[language](
+            base_url=site.base_url,
+            workdir=workdir,
+            sink=sink,
+            monitor=monitor,
+            html_parser=args.parser,
+            parse_workers=args.parse_workers,
+            workers=args.workers
+        )
+        start = time.perf_counter()
+        stages = asyncio.run(scraper.ascrape_and_ingest())
+        elapsed = time.perf_counter() - start
+        scraper.document_store.close()
+
+    crawl = stages['crawl']
+    # Pages parsed in worker processes are not timed
+    parse_calls = monitor.calls.get('parse', 0)
+    parse_seconds = monitor.busy_seconds.get('parse', 0.0) if parse_calls else None
+    return {
+        'pages': crawl.processed,
+        'elapsed_seconds': elapsed,
+        'pages_per_second': crawl.processed / elapsed,
+        'parse_seconds': parse_seconds,
+        'parse_ms_per_page': 1000 * parse_seconds / parse_calls if parse_calls else None,
+        'chunks_embedded': sink.chunks_embedded,
+        'embedding_calls': sink.embedding_calls,
+        'chunks_per_second': sink.chunks_embedded / elapsed,
+        'embed_chunks_per_busy_second': sink.chunks_embedded / max(monitor.busy_seconds.get('embed', 0.0), 1e-9),
+        'vectors_upserted': sink.vectors_upserted,
+        'stages': {
+            name: {
+                'processed': stats.processed,
+                'skipped': stats.skipped,
+                'busy_seconds': stats.busy_seconds,
+                'items_per_second': stats.throughput,
+                'max_queue_depth': stats.max_queue_depth,
+            }
+            for name, stats in stages.items()
+        },
+        'peak_rss_mb': {stage: rss / 1_000_000 for stage, rss in monitor.peak_rss.items()},
+    }
+
+
+# Metrics compared against a baseline, and whether higher values are better
+COMPARED_METRICS = {
+    'pages_per_second': True,
+    'parse_ms_per_page': False,
+    'chunks_per_second': True,
+}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print the change of the headline metrics relative to a previous run's JSON output."""
+    for language, metrics in results['languages'].items():
+        previous = baseline.get('languages', {}).get(language)
+        if previous is None:
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not previous.get(metric) or metrics[metric] is None:
+                continue
+            change = metrics[metric] / previous[metric] - 1
+            regressed = change < 0 if higher_is_better else change > 0
+            changes.append(f"{metric} {change:+.1%}{' (regression)' if regressed and abs(change) > 0.05 else ''}")
+        for stage, rss in metrics['peak_rss_mb'].items():
+            if previous['peak_rss_mb'].get(stage):
+                changes.append(f"peak_rss[{stage}] {rss - previous['peak_rss_mb'][stage]:+.1f} MB")
+        print(f"[{language}] vs baseline: " + " | ".join(changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=1000, help="Fatwa pages per language")
+    parser.add_argument('--languages', nargs='+', choices=sorted(BENCH_SCRAPERS), default=sorted(BENCH_SCRAPERS))
+    parser.add_argument('--workers', type=int, default=16, help="Concurrent crawl workers")
+    parser.add_argument('--parse-workers', type=int, default=0, help="Parser processes, 0 parses in-process")
+    parser.add_argument('--parser', default='html.parser', help="BeautifulSoup tree builder")
+    parser.add_argument('--embed-cost', type=float, default=0.0, help="Simulated embedding time per chunk in ms")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON output of a previous run to compare against")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        'config': {
+            'pages': args.pages,
+            'workers': args.workers,
+            'parse_workers': args.parse_workers,
+            'parser': args.parser,
+            'embed_cost_ms': args.embed_cost,
+        },
+        'languages': {},
+    }
+    with FixtureSite(args.pages) as site:
+        for language in args.languages:
+            metrics = run_language(language, site, args)
+            results['languages'][language] = metrics
+            parse = metrics['parse_ms_per_page']
+            print(
+                f"[{language}] {metrics['pages']} pages in {metrics['elapsed_seconds']:.2f}s "
+                f"({metrics['pages_per_second']:.1f} pages/sec) | "
+                + (f"parse {parse:.2f} ms/page | " if parse is not None else "")
+                + f"{metrics['chunks_embedded']} chunks ({metrics['chunks_per_second']:.1f} chunks/sec) | "
+                "peak RSS " + ", ".join(f"{stage} {rss:.0f} MB" for stage, rss in metrics['peak_rss_mb'].items())
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
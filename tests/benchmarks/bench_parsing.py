@@ -0,0 +1,91 @@
+"""
+Benchmark for the fatwa page parser.
+
+Parses the saved HTML fixtures with the legacy find_next() extractor and with the compiled
+single-pass extractor, checks that both produce identical items and reports pages parsed
+per second for each language.
+
+Usage:
+    python -m tests.benchmarks.bench_parsing --iterations 200 --parser lxml
+"""
+
+import argparse
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from bs4 import Tag
+from tests.benchmarks.common import OFFLINE_SCRAPERS, load_fixture
+
+
+def legacy_extract_text_from_section(self, section: Tag, until_tag: Optional[Dict] = None) -> str:
+    """The extractor as it was before the compiled SectionExtractor, kept as a reference."""
+    seen_content = set()
+    content_parts = []
+
+    current = section.find_next()
+    while current:
+        if until_tag:
+            markers = until_tag if isinstance(until_tag, list) else [until_tag]
+            for marker in markers:
+                matches = True
+                for attr, value in marker.items():
+                    current_value = current.get(attr, '')
+                    if attr == 'string':
+                        current_value = current.get_text(strip=True)
+                    elif attr == 'name':
+                        current_value = current.name
+                    if not (current_value and value in current_value):
+                        matches = False
+                        break
+                if matches:
+                    return ' '.join(content_parts)
+
+        if current.name == 'p':
+            text = self._get_text_from_tag(current)
+            if text and text not in seen_content:
+                content_parts.append(text)
+                seen_content.add(text)
+
+        current = current.find_next()
+
+    return ' '.join(content_parts)
+
+
+def pages_per_second(scraper, html: str, iterations: int) -> float:
+    lastmod = datetime(2024, 1, 1)
+    start = time.perf_counter()
+    for i in range(iterations):
+        scraper.parse_qa_from_page(html, 'https://www.dar-alifta.org/fixture', str(i), lastmod)
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--parser', default='html.parser', help="BeautifulSoup tree builder for the compiled run")
+    args = parser.parse_args()
+
+    lastmod = datetime(2024, 1, 1)
+    for language, scraper_cls in OFFLINE_SCRAPERS.items():
+        html = load_fixture(f'{language}_fatwa.html')
+        legacy_cls = type(f'Legacy{scraper_cls.__name__}', (scraper_cls,), {
+            '_extract_text_from_section': legacy_extract_text_from_section
+        })
+        legacy = legacy_cls(html_parser='html.parser')
+        compiled = scraper_cls(html_parser=args.parser)
+
+        expected = legacy.parse_qa_from_page(html, 'https://www.dar-alifta.org/fixture', '1', lastmod)
+        actual = compiled.parse_qa_from_page(html, 'https://www.dar-alifta.org/fixture', '1', lastmod)
+        identical = expected == actual and expected is not None
+
+        legacy_rate = pages_per_second(legacy, html, args.iterations)
+        compiled_rate = pages_per_second(compiled, html, args.iterations)
+        print(
+            f"[{language}] legacy: {legacy_rate:.1f} pages/sec | "
+            f"compiled ({compiled.html_parser}): {compiled_rate:.1f} pages/sec | "
+            f"speedup x{compiled_rate / legacy_rate:.2f} | identical output: {identical}"
+        )
+
+
+if __name__ == "__main__":
+    main()
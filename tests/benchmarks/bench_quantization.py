@@ -0,0 +1,127 @@
+"""
+Benchmark for the quantized local vector store.
+
+Loads the same vectors into a LocalVectorStore for each quantization, runs the same
+queries with and without float32 rescoring, and reports recall@TOP_K against exact
+float32 search, milliseconds per query and bytes per stored vector. The vectors are
+synthetic clusters unless --vectors points to a .npy matrix, e.g. exported embeddings.
+
+Usage:
+    python -m tests.benchmarks.bench_quantization --count 40000 --queries 200
+    python -m tests.benchmarks.bench_quantization --vectors embeddings.npy --ivf --output quantization.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List
+import numpy as np
+from src.utilities.config import TOP_K, LOCAL_IVF_NPROBE
+from src.utilities.quantization import QUANTIZATIONS, code_dtype
+from src.utilities.vector_store import LocalVectorStore
+
+
+def synthetic_vectors(count: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    """Clustered vectors, closer to sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    return (centers[rng.integers(0, clusters, count)] + 0.7 * rng.normal(size=(count, dimension))).astype(np.float32)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """Perturbed copies of stored vectors, so every query has close neighbours."""
+    rng = np.random.default_rng(seed + 1)
+    picked = vectors[rng.integers(0, len(vectors), count)]
+    scale = np.linalg.norm(picked, axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+    return (picked + 0.5 * scale * rng.normal(size=picked.shape)).astype(np.float32)
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, top_k: int) -> List[set]:
+    normalized = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    neighbours = []
+    for query in queries:
+        scores = normalized @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        neighbours.append({str(i) for i in best})
+    return neighbours
+
+
+def run(store: LocalVectorStore, queries: np.ndarray, expected: List[set], top_k: int) -> Dict[str, float]:
+    store.query(queries[0].tolist(), top_k)
+    found = 0
+    start = time.perf_counter()
+    for query, neighbours in zip(queries, expected):
+        found += len({match.id for match in store.query(query.tolist(), top_k)} & neighbours)
+    elapsed = time.perf_counter() - start
+    return {'recall': found / (top_k * len(queries)), 'ms_per_query': elapsed / len(queries) * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vectors', help=".npy matrix of vectors to index instead of synthetic ones")
+    parser.add_argument('--count', type=int, default=40000, help="Number of synthetic vectors")
+    parser.add_argument('--dimension', type=int, default=768, help="Dimension of synthetic vectors")
+    parser.add_argument('--clusters', type=int, default=2000, help="Number of clusters of synthetic vectors")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=TOP_K)
+    parser.add_argument('--rescore-factor', type=int, default=4)
+    parser.add_argument('--ivf', action='store_true', help="Search through an IVF index instead of exhaustively")
+    parser.add_argument('--nprobe', type=int, default=LOCAL_IVF_NPROBE)
+    parser.add_argument('--quantizations', default=','.join(QUANTIZATIONS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    else:
+        vectors = synthetic_vectors(args.count, args.dimension, args.clusters, args.seed)
+    queries = make_queries(vectors, args.queries, args.seed)
+    expected = exact_neighbours(vectors, queries, args.top_k)
+    count, dimension = vectors.shape
+    print(f"{count} vectors x {dimension} dims, {len(queries)} queries, recall@{args.top_k} against exact float32 search")
+
+    results = []
+    for quantization in args.quantizations.split(','):
+        with tempfile.TemporaryDirectory() as directory:
+            store = LocalVectorStore(
+                directory, dimension=dimension, ivf_min_vectors=0, nprobe=args.nprobe, quantization=quantization
+            )
+            start = time.perf_counter()
+            for i in range(0, count, 5000):
+                store.upsert([(str(j), vectors[j], {}) for j in range(i, min(i + 5000, count))])
+            if args.ivf:
+                store.ivf_min_vectors = 1
+                store.rebuild_index()
+            load_seconds = time.perf_counter() - start
+            # Codes scanned per vector, plus the int8 scale
+            scanned_bytes = dimension * code_dtype(quantization).itemsize + (4 if quantization == 'int8' else 0)
+            rescore_factors = [0] if quantization == 'none' else [0, args.rescore_factor]
+            for rescore_factor in rescore_factors:
+                store.rescore_factor = rescore_factor
+                result = {
+                    'quantization': quantization,
+                    'rescore_factor': rescore_factor,
+                    'search': 'ivf' if args.ivf else 'exhaustive',
+                    'scanned_bytes_per_vector': scanned_bytes,
+                    'load_seconds': load_seconds,
+                    **run(store, queries, expected, args.top_k)
+                }
+                results.append(result)
+                print(
+                    f"[{quantization:>7}] rescore x{rescore_factor}: recall {result['recall']:.3f} | "
+                    f"{result['ms_per_query']:.2f} ms/query | {scanned_bytes} bytes/vector scanned | "
+                    f"loaded in {load_seconds:.1f}s"
+                )
+            store.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'count': count, 'dimension': dimension, 'top_k': args.top_k, 'results': results}, f, indent=2)
+        print(f"Results written to {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
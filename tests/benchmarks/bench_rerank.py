@@ -0,0 +1,126 @@
+"""
+Benchmark for the cross-encoder rerank stage of retrieval.
+
+For each question, retrieves the candidate fatwas of an index the way aretrieve_documents
+does (vector search fused with BM25), then builds the context twice: in fused order, and
+after reranking with one batched cross-encoder pass and keeping the --top-n best. Reports
+the milliseconds the pass adds (p50/p95, and the share within --budget-ms) against the
+prompt tokens of the two contexts, as assembled for CONTEXT_MODEL.
+
+Needs an ingested index with its document table (VECTOR_BACKEND=local works offline) and
+a file of questions, one per line.
+
+Usage:
+    python -m tests.benchmarks.bench_rerank --questions questions_en.txt
+    python -m tests.benchmarks.bench_rerank --questions questions_ar.txt --language ar --output rerank.json
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+import numpy as np
+from src.utilities.config import (
+    LEXICAL_SEARCH,
+    PINECONE_INDEX_NAME_AR,
+    PINECONE_INDEX_NAME_EN,
+    RERANK_BUDGET_MS,
+    RERANK_MAX_LENGTH,
+    RERANK_TOP_N,
+    TOP_K
+)
+from src.utilities.context_assembler import count_tokens
+from src.utilities.lexical_index import get_lexical_index
+from src.utilities.pinecone_manager import get_pinecone_manager
+from src.utilities.reranker import Reranker, rerank_order
+from src.utilities.retrieval import build_context, reciprocal_rank_fusion, select_doc_ids
+
+DEFAULT_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+def candidate_doc_ids(manager, question: str) -> List[str]:
+    """Matched fatwas in the order retrieval ranks them before reranking."""
+    doc_ids = list(dict.fromkeys(chunk.id.rsplit('-', 1)[0] for chunk in manager.retrieve_docs(question)))
+    lexical_index = get_lexical_index(manager.index_name) if LEXICAL_SEARCH else None
+    if lexical_index is not None:
+        lexical_hits = lexical_index.search(question, TOP_K, manager.language)
+        doc_ids = reciprocal_rank_fusion([doc_ids, [doc_id for doc_id, _ in lexical_hits]])[:TOP_K]
+    return doc_ids
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', required=True, help="Text file with one question per line")
+    parser.add_argument('--language', choices=['ar', 'en'], default='en')
+    parser.add_argument('--model', default=os.getenv("RERANK_MODEL") or DEFAULT_MODEL)
+    parser.add_argument('--max-length', type=int, default=RERANK_MAX_LENGTH)
+    parser.add_argument('--top-n', type=int, default=RERANK_TOP_N)
+    parser.add_argument('--budget-ms', type=float, default=RERANK_BUDGET_MS)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        questions = [line.strip() for line in f if line.strip()]
+    manager = get_pinecone_manager(PINECONE_INDEX_NAME_AR if args.language == 'ar' else PINECONE_INDEX_NAME_EN)
+    if manager.documents is None:
+        raise SystemExit("The document table is disabled, set DOCUMENT_TABLE_DIR")
+    reranker = Reranker(args.model, max_length=args.max_length)
+    # Load the model and warm up outside the measurements
+    reranker.score(questions[0], ["warm up"])
+
+    latencies: List[float] = []
+    fused_tokens: List[int] = []
+    reranked_tokens: List[int] = []
+    changed = 0
+    for question in questions:
+        doc_ids = candidate_doc_ids(manager, question)
+        documents = manager.documents.get_many(doc_ids)
+        chunk_counts = {doc_id: document.total_chunks for doc_id, document in documents.items()}
+        scored = [doc_id for doc_id in doc_ids if doc_id in documents]
+        if not scored:
+            continue
+
+        start = time.perf_counter()
+        scores = reranker.score(question, [documents[doc_id].text for doc_id in scored])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        fused = select_doc_ids(doc_ids, chunk_counts)
+        reranked = select_doc_ids(rerank_order(doc_ids, dict(zip(scored, scores)), args.top_n), chunk_counts)
+        changed += fused != reranked
+        fused_tokens.append(count_tokens(build_context([documents[doc_id] for doc_id in fused])[0]))
+        reranked_tokens.append(count_tokens(build_context([documents[doc_id] for doc_id in reranked])[0]))
+
+    if not latencies:
+        raise SystemExit("No question matched a fatwa of the document table")
+    result: Dict[str, float] = {
+        'questions': len(latencies),
+        'model': args.model,
+        'top_n': args.top_n,
+        'rerank_ms_p50': percentile(latencies, 50),
+        'rerank_ms_p95': percentile(latencies, 95),
+        'within_budget': sum(latency <= args.budget_ms for latency in latencies) / len(latencies),
+        'fused_tokens_mean': float(np.mean(fused_tokens)),
+        'reranked_tokens_mean': float(np.mean(reranked_tokens)),
+        'tokens_saved_mean': float(np.mean(fused_tokens) - np.mean(reranked_tokens)),
+        'context_changed': changed / len(latencies)
+    }
+    print(
+        f"{result['questions']} questions, {args.model}, top {args.top_n}\n"
+        f"rerank pass: p50 {result['rerank_ms_p50']:.1f} ms | p95 {result['rerank_ms_p95']:.1f} ms | "
+        f"{result['within_budget']:.0%} within {args.budget_ms:.0f} ms\n"
+        f"prompt tokens: {result['fused_tokens_mean']:.0f} fused -> {result['reranked_tokens_mean']:.0f} reranked "
+        f"({result['tokens_saved_mean']:.0f} saved per question), context changed for {result['context_changed']:.0%}"
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
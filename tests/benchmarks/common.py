@@ -0,0 +1,33 @@
+"""Shared helpers for the offline benchmarks."""
+
+import os
+from src.index_graph.scraper_ar import ArabicQAScraper
+from src.index_graph.scraper_en import EnglishQAScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name: str) -> str:
+    """Read a saved HTML page from the fixtures directory."""
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class OfflineArabicScraper(ArabicQAScraper):
+    """Arabic scraper that does not connect to Pinecone."""
+
+    def _init_pinecone(self):
+        return None
+
+
+class OfflineEnglishScraper(EnglishQAScraper):
+    """English scraper that does not connect to Pinecone."""
+
+    def _init_pinecone(self):
+        return None
+
+
+OFFLINE_SCRAPERS = {
+    'ar': OfflineArabicScraper,
+    'en': OfflineEnglishScraper,
+}
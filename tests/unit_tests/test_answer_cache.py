@@ -0,0 +1,52 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+answer_cache = pytest.importorskip("src.utilities.answer_cache")
+
+
+def make_cache(**kwargs):
+    options = dict(capacity=2, threshold=0.9, ttl=60.0)
+    options.update(kwargs)
+    return answer_cache.SemanticAnswerCache("index", **options)
+
+
+def test_similar_questions_share_an_answer():
+    cache = make_cache()
+    cache.put([1.0, 0.0, 0.0], 1, "answer with sources")
+    assert cache.get([0.99, 0.1, 0.0], 1) == "answer with sources"
+    assert cache.get([0.0, 1.0, 0.0], 1) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_near_identical_questions_replace_their_answer():
+    cache = make_cache()
+    cache.put([1.0, 0.0, 0.0], 1, "old")
+    cache.put([0.99, 0.05, 0.0], 1, "new")
+    assert len(cache) == 1
+    assert cache.get([1.0, 0.0, 0.0], 1) == "new"
+
+
+def test_least_recently_used_answer_is_evicted():
+    cache = make_cache()
+    cache.put([1.0, 0.0, 0.0], 1, "a")
+    cache.put([0.0, 1.0, 0.0], 1, "b")
+    cache.get([1.0, 0.0, 0.0], 1)
+    cache.put([0.0, 0.0, 1.0], 1, "c")
+    assert (cache.get([1.0, 0.0, 0.0], 1), cache.get([0.0, 1.0, 0.0], 1), cache.get([0.0, 0.0, 1.0], 1)) == ("a", None, "c")
+    assert cache.evictions == 1
+
+
+def test_reindexing_and_expiry_drop_answers():
+    cache = make_cache()
+    cache.put([1.0, 0.0, 0.0], 1, "a")
+    assert cache.get([1.0, 0.0, 0.0], 2) is None
+    assert cache.invalidations == 1
+    expired = make_cache(ttl=-1.0)
+    expired.put([1.0, 0.0, 0.0], 1, "a")
+    assert expired.get([1.0, 0.0, 0.0], 1) is None and len(expired) == 0
+
+
+def test_only_first_turn_questions_are_cached():
+    assert answer_cache.first_turn_question([HumanMessage(content="What is zakat?")]) == "What is zakat?"
+    follow_up = [HumanMessage(content="What is zakat?"), AIMessage(content="..."), HumanMessage(content="And sadaqa?")]
+    assert answer_cache.first_turn_question(follow_up) is None
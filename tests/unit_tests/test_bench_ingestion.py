@@ -0,0 +1,37 @@
+import argparse
+import pytest
+from tests.benchmarks.bench_ingestion import BENCH_SCRAPERS, FixtureSite, compare, run_language
+
+
+def bench_args(**overrides) -> argparse.Namespace:
+    args = dict(parser='html.parser', parse_workers=0, workers=4, embed_cost=0.0)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_fixture_site_serves_a_sitemap_index_and_distinct_pages():
+    site = FixtureSite(pages=3)
+    assert site.render('/en/sitemap.xml')[1].count('<sitemap>') == 1
+    assert site.render('/en/sitemap-0.xml')[1].count('<url>') == 3
+    assert site.render('/en/fatwa/details/1/fixture') != site.render('/en/fatwa/details/2/fixture')
+    assert site.render('/en/fatwa/details/4/fixture') is None
+    assert site.render('/fr/sitemap.xml') is None
+
+
+@pytest.mark.parametrize('language', sorted(BENCH_SCRAPERS))
+def test_every_page_reaches_the_stub_sink(language):
+    with FixtureSite(pages=12) as site:
+        metrics = run_language(language, site, bench_args())
+    assert metrics['pages'] == 12
+    assert metrics['stages']['upsert']['processed'] == 12
+    assert metrics['vectors_upserted'] == metrics['chunks_embedded'] > 0
+
+
+def test_compare_flags_regressions(capsys):
+    metrics = {'pages_per_second': 80.0, 'parse_ms_per_page': 2.0, 'chunks_per_second': 100.0, 'peak_rss_mb': {'total': 120.0}}
+    previous = {'pages_per_second': 100.0, 'parse_ms_per_page': 2.0, 'chunks_per_second': 100.0, 'peak_rss_mb': {'total': 100.0}}
+    compare({'languages': {'en': metrics}}, {'languages': {'en': previous}})
+    output = capsys.readouterr().out
+    assert "pages_per_second -20.0% (regression)" in output
+    assert "chunks_per_second +0.0% |" in output
+    assert "peak_rss[total] +20.0 MB" in output
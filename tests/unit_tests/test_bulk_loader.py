@@ -0,0 +1,86 @@
+import io
+import json
+from datetime import datetime
+import pytest
+from src.index_graph.bulk_loader import bulk_load, iter_json_array, normalize_record
+from src.index_graph.document_store import DocumentStore
+from src.index_graph.manifest import DocumentManifest
+from tests.benchmarks.common import OfflineEnglishScraper
+
+ELEMENTS = [{'Id': 1, 'Question': "a, [b]"}, "text with ] and \"quotes\"", 12345, -0.5, None, True, [1, [2]], 67890]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 4096])
+def test_elements_do_not_depend_on_chunk_boundaries(chunk_size):
+    text = " \n[ " + ",\n ".join(json.dumps(element) for element in ELEMENTS) + " ]\n"
+    assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == ELEMENTS
+
+
+def test_trailing_scalar_is_not_cut_at_a_chunk_boundary():
+    assert list(iter_json_array(io.StringIO("[1,12345]"), chunk_size=4)) == [1, 12345]
+    assert list(iter_json_array(io.StringIO("[-0.25,1.5e3]"), chunk_size=2)) == [-0.25, 1500.0]
+    assert list(iter_json_array(io.StringIO("[]"), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize('text', ['{"Id": 1}', '[{"Id": 1}', '[{"Id": 1}, {"Id"', '[1, 2'])
+def test_malformed_input_is_rejected(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), chunk_size=3))
+
+
+def test_records_match_the_crawled_item_shape():
+    scraper = OfflineEnglishScraper()
+    record = {
+        'Id': 42,
+        'Link': "/en/fatwa/42",
+        'Question': "<p>What is zakat?</p><p>What is zakat?</p>",
+        'Answer': " Zakat is an obligation. ",
+        'LastModified': "2024-05-01T10:00:00Z",
+    }
+    item = normalize_record(scraper, record, datetime(2020, 1, 1))
+    assert item['id'] == "42"
+    assert item['source'].endswith("/en/fatwa/42") and item['source'].startswith("http")
+    assert item['last_modified'] == "2024-05-01"
+    assert item['content'] == (
+        f"{scraper._get_question_label()}: What is zakat?\n{scraper._get_answer_label()}: Zakat is an obligation."
+    )
+    assert normalize_record(scraper, {'Id': 43, 'Question': "only a question"}, datetime(2020, 1, 1)) is None
+
+
+class FakeManager:
+    embedding_model = "model"
+
+    def __init__(self):
+        self.upserted = []
+        self.lexical_builds = 0
+
+    def create_embeddings(self, texts):
+        return [[1.0] for _ in texts]
+
+    def upsert_vectors(self, vectors):
+        self.upserted.extend(vector_id for vector_id, _, _ in vectors)
+
+    def delete_vectors(self, ids):
+        pass
+
+    def build_lexical_index(self):
+        self.lexical_builds += 1
+
+
+def test_bulk_load_indexes_changed_records_once(tmp_path):
+    path = tmp_path / "fatawa.txt"
+    records = [{'Id': i, 'Link': f"/fatwa/{i}", 'Question': f"question {i}", 'Answer': f"answer {i}"} for i in range(5)]
+    path.write_text(json.dumps(records + [{'Id': 9}]), encoding='utf-8')
+    scraper = OfflineEnglishScraper()
+    scraper._pinecone_manager = FakeManager()
+    scraper._document_store = DocumentStore(str(tmp_path / "fatwas.db"))
+    scraper._manifest = DocumentManifest(str(tmp_path / "manifest.json"))
+
+    stats = bulk_load(scraper, str(path), batch_size=2)
+    assert (stats.records, stats.invalid, stats.indexed, stats.unchanged) == (6, 1, 5, 0)
+    assert sorted(scraper._pinecone_manager.upserted) == [f"{i}-0" for i in range(5)]
+    assert len(scraper._document_store) == 5 and scraper._document_store.pending_count() == 0
+
+    stats = bulk_load(scraper, str(path), batch_size=2)
+    assert (stats.indexed, stats.unchanged) == (0, 5)
+    assert len(scraper._pinecone_manager.upserted) == 5
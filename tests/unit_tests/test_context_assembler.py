@@ -0,0 +1,58 @@
+import pytest
+from src.utilities import context_assembler
+from src.utilities.context_assembler import assemble_context, estimated_similarity, minhash_signature
+
+ZAKAT = "zakat is obligatory on gold and silver once the nisab is reached and a lunar year passes " * 5
+ZAKAT_EDITED = ZAKAT.replace("obligatory", "mandatory", 1)
+PRAYER = "praying in congregation is a confirmed sunnah for men according to most scholars " * 5
+
+
+class WordEncoding:
+    """One token per word, so budgets are easy to check."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split(" ")
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(context_assembler, "get_encoding", lambda model=None: WordEncoding())
+    context_assembler.count_tokens.cache_clear()
+    yield
+    context_assembler.count_tokens.cache_clear()
+
+
+def test_signatures_estimate_similarity():
+    assert estimated_similarity(minhash_signature(ZAKAT), minhash_signature(ZAKAT)) == 1.0
+    assert estimated_similarity(minhash_signature(ZAKAT), minhash_signature(ZAKAT_EDITED)) > 0.7
+    assert estimated_similarity(minhash_signature(ZAKAT), minhash_signature(PRAYER)) < 0.2
+
+
+def test_near_duplicates_are_dropped():
+    kept = assemble_context([ZAKAT, ZAKAT_EDITED, PRAYER], max_tokens=10_000)
+    assert [i for i, _ in kept] == [0, 2]
+
+
+def test_empty_texts_are_skipped():
+    assert assemble_context(["", PRAYER], max_tokens=10_000) == [(1, PRAYER)]
+
+
+def test_answers_fit_the_budget():
+    short = "fasting on the day of arafah"
+    budget = context_assembler.count_tokens(ZAKAT) + 10
+    kept = assemble_context([ZAKAT, PRAYER, short], max_tokens=budget)
+    # The prayer answer does not fit, the shorter one after it does
+    assert [i for i, _ in kept] == [0, 2]
+    assert context_assembler.count_tokens("\n\n".join(text for _, text in kept)) <= budget
+
+
+def test_first_answer_over_budget_is_truncated():
+    kept = assemble_context([ZAKAT, PRAYER], max_tokens=12)
+    assert len(kept) == 1
+    index, text = kept[0]
+    assert index == 0
+    assert ZAKAT.startswith(text)
+    assert context_assembler.count_tokens(text) == 12
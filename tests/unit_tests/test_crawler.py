@@ -0,0 +1,91 @@
+import asyncio
+from src.index_graph.crawler import AdaptiveRateController, AsyncCrawler, _parse_retry_after
+from src.index_graph.fetcher import FetchResult
+
+
+def make_controller(**kwargs) -> AdaptiveRateController:
+    defaults = dict(initial_concurrency=4, max_concurrency=8, increase_every=2)
+    defaults.update(kwargs)
+    return AdaptiveRateController(**defaults)
+
+
+def test_healthy_responses_widen_the_window_additively():
+    controller = make_controller()
+    for _ in range(4):
+        controller._record(200, 0.1, None)
+    assert controller.concurrency == 6
+    assert controller.backoffs == 0
+
+
+def test_throttling_halves_the_window_and_doubles_the_delay():
+    controller = make_controller(initial_concurrency=8)
+    controller._record(503, 0.1, None)
+    assert (controller.concurrency, controller.delay) == (4, 0.1)
+    controller._record(429, 0.1, None)
+    assert (controller.concurrency, controller.delay) == (2, 0.2)
+    controller._record(None, 0.1, None)
+    controller._record(None, 0.1, None)
+    assert controller.concurrency == 1
+    assert controller.backoffs == 4
+
+
+def test_latency_spike_counts_as_throttling():
+    controller = make_controller()
+    controller._record(200, 0.6, None)
+    controller._record(200, 0.6, None)
+    controller._record(200, 5.0, None)
+    assert controller.concurrency == 2
+    assert controller.backoffs == 1
+
+
+def test_retry_after_raises_the_delay():
+    controller = make_controller(max_delay=30.0)
+    controller._record(429, 0.1, 7.0)
+    assert controller.delay == 7.0
+
+
+def test_parse_retry_after():
+    assert _parse_retry_after("12") == 12.0
+    assert _parse_retry_after("-3") == 0.0
+    assert _parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert _parse_retry_after("soon") is None
+    assert _parse_retry_after(None) is None
+
+
+class FakeScraper:
+    def __init__(self):
+        self.not_modified = []
+
+    def parse_qa_from_page(self, html, url, fatwa_id, lastmod):
+        return {'id': fatwa_id, 'url': url, 'lastmod': lastmod, 'content': html}
+
+    def _mark_not_modified(self, url_info):
+        self.not_modified.append(url_info['id'])
+
+    def _log(self, message):
+        pass
+
+
+class FakeFetcher:
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.remembered = []
+
+    async def afetch(self, url):
+        status = self.statuses[url].pop(0)
+        return FetchResult(url=url, status=status, text=f"page {url}" if status == 200 else "")
+
+    def remember(self, result):
+        self.remembered.append(result.url)
+
+
+def test_crawl_retries_throttled_pages_and_gives_up_on_client_errors():
+    fetcher = FakeFetcher({'a': [503, 200], 'b': [404], 'c': [304]})
+    scraper = FakeScraper()
+    crawler = AsyncCrawler(scraper, fetcher, workers=2, controller=make_controller(max_delay=0.0))
+    urls = [{'url': url, 'id': url, 'lastmod': None} for url in ('a', 'b', 'c')]
+    items = asyncio.run(crawler.crawl(urls))
+    assert [item['id'] for item in items] == ['a']
+    assert scraper.not_modified == ['c']
+    assert fetcher.remembered == ['a']
+    assert (crawler.stats.pages_fetched, crawler.stats.pages_failed, crawler.stats.retries) == (2, 1, 1)
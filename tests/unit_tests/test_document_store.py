@@ -0,0 +1,119 @@
+import json
+from datetime import datetime
+from src.index_graph.document_store import DocumentStore
+from src.index_graph.manifest import DocumentManifest, content_hash
+from tests.benchmarks.common import OfflineEnglishScraper
+
+
+def item(doc_id: str, content: str = "content") -> dict:
+    return {
+        'id': doc_id,
+        'question': f"question {doc_id}",
+        'answer': f"answer {doc_id}",
+        'source': f"https://a/{doc_id}",
+        'last_modified': "2024-01-01",
+        'content': content,
+    }
+
+
+def test_items_are_replaced_by_id(tmp_path):
+    store = DocumentStore(str(tmp_path / "fatwas.db"))
+    store.put_many([item('1'), item('2')])
+    store.put_many([item('1', "edited")])
+    assert len(store) == 2
+    assert store.get('1')['content'] == "edited"
+    store.delete_many(['2'])
+    assert '2' not in store and store.get('2') is None
+
+
+def test_items_are_streamed_in_batches(tmp_path):
+    store = DocumentStore(str(tmp_path / "fatwas.db"))
+    store.put_many([item(str(i)) for i in range(5)])
+    batches = list(store.iter_items(batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [qa_item['id'] for batch in batches for qa_item in batch] == ['0', '1', '2', '3', '4']
+
+
+def test_last_updated_is_persisted(tmp_path):
+    path = str(tmp_path / "fatwas.db")
+    store = DocumentStore(path)
+    assert store.last_updated is None
+    store.last_updated = datetime(2024, 5, 1, 12, 30)
+    store.close()
+    assert DocumentStore(path).last_updated == datetime(2024, 5, 1, 12, 30)
+
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    json_path = tmp_path / "fatwas_en.json"
+    json_path.write_text(json.dumps({
+        'last_updated': "2024-03-01T00:00:00",
+        'data': [item('1', "old"), item('2'), item('1', "new")],
+    }), encoding='utf-8')
+    store = DocumentStore(str(tmp_path / "fatwas.db"))
+    assert store.migrate_json(str(json_path)) == 3
+    assert len(store) == 2
+    assert store.get('1')['content'] == "new"
+    assert store.last_updated == datetime(2024, 3, 1)
+    assert not json_path.exists()
+    assert store.migrate_json(str(json_path)) == 0
+
+
+def test_completed_batches_only_clear_the_version_they_indexed(tmp_path):
+    store = DocumentStore(str(tmp_path / "fatwas.db"))
+    store.put_many([item('1', "v1"), item('2')], pending_lastmods={'1': "2024-01-01", '2': None})
+    batch_id = store.log_upsert([('1', "2024-01-01", 1, content_hash("v1")), ('2', None, 1, content_hash("content"))], [])
+    # A newer version of fatwa 1 is queued before the batch is confirmed
+    store.put_many([item('1', "v2")], pending_lastmods={'1': "2024-02-01"})
+    store.complete_upserts([batch_id])
+    assert [[(qa_item['id'], lastmod) for qa_item, lastmod in batch] for batch in store.iter_pending()] == [[('1', "2024-02-01")]]
+    assert list(store.logged_upserts()) == []
+
+
+def test_logged_batches_round_trip(tmp_path):
+    store = DocumentStore(str(tmp_path / "fatwas.db"))
+    entries = [('1', None, 2, content_hash("content"))]
+    vectors = [('1-0', [0.5, 1.0], {'text': "a"}), ('1-1', [0.25, -1.0], {'text': "b"})]
+    first = store.log_upsert(entries, vectors)
+    second = store.log_upsert(entries, vectors[:1])
+    assert list(store.logged_upserts()) == [(first, entries, vectors), (second, entries, vectors[:1])]
+    store.complete_upserts([first])
+    assert [batch_id for batch_id, _, _ in store.logged_upserts()] == [second]
+
+
+class FakeManager:
+    embedding_model = "model"
+
+    def __init__(self):
+        self.upserted = []
+
+    def create_embeddings(self, texts):
+        return [[1.0] for _ in texts]
+
+    def upsert_vectors(self, vectors):
+        self.upserted.extend(vector_id for vector_id, _, _ in vectors)
+
+    def delete_vectors(self, ids):
+        pass
+
+
+def test_interrupted_runs_are_resumed(tmp_path):
+    store = DocumentStore(str(tmp_path / "fatwas.db"))
+    # Fatwa 1 was embedded and logged but not confirmed, fatwa 2 was only scraped,
+    # and fatwa 3 changed after its batch was logged
+    store.put_many([item('1'), item('2'), item('3', "v2")], pending_lastmods={'1': None, '2': None, '3': None})
+    store.log_upsert(
+        [('1', None, 1, content_hash("content")), ('3', None, 1, content_hash("v1"))],
+        [('1-0', [1.0], {}), ('3-0', [1.0], {})]
+    )
+    scraper = OfflineEnglishScraper()
+    scraper._pinecone_manager = FakeManager()
+    scraper._document_store = store
+    scraper._manifest = DocumentManifest(str(tmp_path / "manifest.json"))
+    scraper._resume_pending()
+
+    assert scraper._pinecone_manager.upserted == ['1-0', '3-0', '2-0', '3-0']
+    assert scraper._manifest.is_unchanged('2', "content", "model")
+    assert scraper._manifest.is_unchanged('3', "v2", "model")
+    assert store.pending_count() == 0
+    assert list(store.logged_upserts()) == []
+    assert DocumentManifest(str(tmp_path / "manifest.json")).is_unchanged('1', "content", "model")
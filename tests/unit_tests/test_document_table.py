@@ -0,0 +1,30 @@
+from src.utilities.document_table import DocumentTable, StoredDocument, complete_chunks, documents_from_vectors
+
+
+def chunk(doc_id: str, index: int, total: int, text: str) -> tuple:
+    return (f"{doc_id}-{index}", [0.0], {'text': text, 'source': f"https://a/{doc_id}", 'total_chunks': total})
+
+
+def test_only_fatwas_with_every_chunk_are_complete():
+    vectors = [chunk('12-3', 1, 2, "second"), chunk('12-3', 0, 2, "first"), chunk('7', 0, 3, "partial"), chunk('7', 2, 3, "end")]
+    assert complete_chunks(vectors) == {'12-3': (["first", "second"], "https://a/12-3")}
+
+
+def test_documents_hold_the_cleaned_answer():
+    vectors = [chunk('1', 0, 2, "Question: What is zakat? Answer: Zakat is"), chunk('1', 1, 2, "an\xa0obligation.")]
+    [document] = documents_from_vectors(vectors)
+    assert (document.id, document.source, document.total_chunks) == ('1', "https://a/1", 2)
+    assert document.text == "zakat is an obligation."
+
+
+def test_put_get_delete(tmp_path):
+    table = DocumentTable(str(tmp_path / "index.db"))
+    table.put_many([StoredDocument('1', "one", "https://a/1", 1), StoredDocument('2', "two", "https://a/2", 2)],
+                   [{'one': 1}, {'two': 2}])
+    table.put_many([StoredDocument('1', "uno", "https://a/1", 1)])
+    assert len(table) == 2
+    assert table.get_many(['1', '3']) == {'1': StoredDocument('1', "uno", "https://a/1", 1)}
+    assert table.get_many([]) == {}
+    table.delete_many(['2'])
+    assert list(table.iter_term_counts(batch_size=1)) == [('1', {'one': 1})]
+    table.close()
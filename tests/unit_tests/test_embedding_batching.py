@@ -0,0 +1,45 @@
+from src.utilities.pinecone_manager import PineconeManager
+from tests.benchmarks.common import OfflineEnglishScraper
+
+
+class RecordingEmbeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+def make_manager(batch_size: int) -> PineconeManager:
+    manager = PineconeManager.__new__(PineconeManager)
+    manager.embeddings = RecordingEmbeddings()
+    manager.embedding_batch_size = batch_size
+    manager.language = 'en'
+    return manager
+
+
+def test_embeddings_are_batched_by_length_and_returned_in_order():
+    manager = make_manager(batch_size=2)
+    texts = ["ccc", "a", "bbbb", "dd", "e"]
+    assert manager.create_embeddings(texts) == [[3.0], [1.0], [4.0], [2.0], [1.0]]
+    assert manager.embeddings.batches == [["a", "e"], ["dd", "ccc"], ["bbbb"]]
+
+
+class FakeManager:
+    def __init__(self):
+        self.calls = []
+
+    def create_embeddings(self, texts):
+        self.calls.append(texts)
+        return [[float(i)] for i in range(len(texts))]
+
+
+def test_chunks_of_several_documents_share_one_embedding_call():
+    scraper = OfflineEnglishScraper()
+    scraper._pinecone_manager = FakeManager()
+    items = [{'id': '7', 'source': 'https://a/7', 'content': "x"}, {'id': '8', 'source': 'https://a/8', 'content': "y"}]
+    vectors = scraper._vectorize_items(items, [["one", "two"], ["three"]])
+    assert scraper._pinecone_manager.calls == [["one", "two", "three"]]
+    assert [(vector_id, embedding) for vector_id, embedding, _ in vectors] == [("7-0", [0.0]), ("7-1", [1.0]), ("8-0", [2.0])]
+    assert vectors[2][2] == {'text': "three", 'source': 'https://a/8', 'total_chunks': 1}
@@ -0,0 +1,80 @@
+import multiprocessing
+from src.utilities.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+def vector_of(key: bytes):
+    return [float(key[0]), float(key[1]), 1.0]
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(text)), 0.0, 1.0] for text in texts]
+
+
+def test_vectors_survive_reopening(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", capacity=8)
+    keys = [cache.make_key(text) for text in ("zakat", "salah")]
+    cache.put_many(keys, [vector_of(key) for key in keys])
+    cache.flush()
+    reopened = EmbeddingCache(str(tmp_path), "model", capacity=8)
+    assert reopened.get_many(keys) == [vector_of(key) for key in keys]
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", capacity=2)
+    first, second, third = (cache.make_key(text) for text in ("a", "b", "c"))
+    cache.put_many([first, second], [vector_of(first), vector_of(second)])
+    cache.get_many([first])
+    cache.put_many([third], [vector_of(third)])
+    assert cache.get_many([first, second, third]) == [vector_of(first), None, vector_of(third)]
+    assert cache.evictions == 1
+
+
+def test_keys_ending_in_a_nul_byte_are_served(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", capacity=8)
+    key = bytes(range(1, 20)) + b"\0"
+    cache.put_many([key], [vector_of(key)])
+    cache.flush()
+    assert cache.get_many([key]) == [vector_of(key)]
+    assert EmbeddingCache(str(tmp_path), "model", capacity=8).get_many([key]) == [vector_of(key)]
+
+
+def test_cached_embeddings_embed_each_text_once(tmp_path):
+    model = CountingEmbeddings()
+    embeddings = CachedEmbeddings(model, EmbeddingCache(str(tmp_path), "model", capacity=8))
+    assert embeddings.embed_documents(["ab", "abc", "ab"]) == [[2.0, 0.0, 1.0], [3.0, 0.0, 1.0], [2.0, 0.0, 1.0]]
+    embeddings.embed_documents(["abc"])
+    assert model.calls == 2
+
+
+def test_a_cache_opened_before_the_files_existed_does_not_truncate_them(tmp_path):
+    early = EmbeddingCache(str(tmp_path), "model", capacity=8)
+    writer = EmbeddingCache(str(tmp_path), "model", capacity=8)
+    first, second = writer.make_key("first"), writer.make_key("second")
+    writer.put_many([first], [vector_of(first)])
+    early.put_many([second], [vector_of(second)])
+    assert writer.get_many([first, second]) == [vector_of(first), vector_of(second)]
+
+
+def write_keys(directory: str, worker: int, count: int) -> None:
+    cache = EmbeddingCache(directory, "model", capacity=4096)
+    for i in range(0, count, 10):
+        keys = [cache.make_key(f"{worker}-{j}") for j in range(i, i + 10)]
+        cache.put_many(keys, [vector_of(key) for key in keys])
+    cache.flush()
+
+
+def test_processes_never_share_a_slot(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=write_keys, args=(str(tmp_path), worker, 300)) for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    cache = EmbeddingCache(str(tmp_path), "model", capacity=4096)
+    keys = [cache.make_key(f"{worker}-{j}") for worker in range(3) for j in range(300)]
+    assert cache.get_many(keys) == [vector_of(key) for key in keys]
@@ -0,0 +1,60 @@
+from datetime import datetime
+import pytest
+from bs4 import BeautifulSoup
+from src.index_graph.extractor import SectionExtractor
+from tests.benchmarks.bench_parsing import legacy_extract_text_from_section
+from tests.benchmarks.common import OFFLINE_SCRAPERS, load_fixture
+
+PAGE = """
+<div>
+  <h3 class="label">Question</h3>
+  <p>What is zakat?</p>
+  <div><p>Nested paragraph</p><p>What is zakat?</p></div>
+  <p class="note">Note paragraph</p>
+  <span class="end-marker">Answer</span>
+  <p>After the marker</p>
+  <h2>Related fatwas</h2>
+  <p>Past the heading</p>
+</div>
+"""
+
+MARKERS = [
+    None,
+    {'name': 'h2'},
+    {'class': 'note'},
+    {'string': 'Answer'},
+    {'name': 'span', 'string': 'Answ'},
+    {'name': 'span', 'string': 'Question'},
+    [{'name': 'h2'}, {'string': 'Answer'}],
+]
+
+
+class LegacyHelpers:
+    def _get_text_from_tag(self, tag):
+        return tag.get_text(strip=True) if tag else ""
+
+
+@pytest.mark.parametrize('until_tag', MARKERS)
+def test_matches_the_find_next_extractor(until_tag):
+    section = BeautifulSoup(PAGE, 'html.parser').find('h3')
+    expected = legacy_extract_text_from_section(LegacyHelpers(), section, until_tag)
+    assert SectionExtractor(until_tag).extract(section) == expected
+
+
+def test_stops_at_the_first_matching_marker():
+    section = BeautifulSoup(PAGE, 'html.parser').find('h3')
+    extractor = SectionExtractor([{'name': 'h2'}, {'string': 'Answer'}])
+    assert extractor.extract(section) == "What is zakat? Nested paragraph Note paragraph"
+
+
+@pytest.mark.parametrize('language', sorted(OFFLINE_SCRAPERS))
+def test_fixture_pages_parse_as_before(language):
+    scraper_cls = OFFLINE_SCRAPERS[language]
+    legacy_cls = type(f'Legacy{scraper_cls.__name__}', (scraper_cls,), {
+        '_extract_text_from_section': legacy_extract_text_from_section
+    })
+    html = load_fixture(f'{language}_fatwa.html')
+    lastmod = datetime(2024, 1, 1)
+    expected = legacy_cls().parse_qa_from_page(html, 'https://www.dar-alifta.org/fixture', '1', lastmod)
+    assert expected is not None
+    assert scraper_cls().parse_qa_from_page(html, 'https://www.dar-alifta.org/fixture', '1', lastmod) == expected
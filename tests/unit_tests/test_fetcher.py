@@ -0,0 +1,36 @@
+from src.index_graph.fetcher import FetchResult, PageFetcher, ValidatorStore
+
+
+def test_validators_survive_saving(tmp_path):
+    path = str(tmp_path / "validators.json")
+    store = ValidatorStore(path)
+    store.update("https://a", '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT")
+    store.update("https://b", None, None)
+    store.save()
+    reopened = ValidatorStore(path)
+    assert len(reopened) == 1
+    assert reopened.get("https://a") == {'etag': '"v1"', 'last_modified': "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert reopened.get("https://b") == {}
+
+
+def test_remembered_pages_are_fetched_conditionally(tmp_path):
+    fetcher = PageFetcher({}, ValidatorStore(str(tmp_path / "validators.json")))
+    assert fetcher._conditional_headers("https://a") == {}
+    fetcher.remember(FetchResult(url="https://a", status=200, etag='"v1"', last_modified="yesterday"))
+    assert fetcher._conditional_headers("https://a") == {'If-None-Match': '"v1"', 'If-Modified-Since': "yesterday"}
+    fetcher.close()
+
+
+def test_not_modified_pages_keep_their_validators(tmp_path):
+    fetcher = PageFetcher({}, ValidatorStore(str(tmp_path / "validators.json")))
+    fetcher.remember(FetchResult(url="https://a", status=200, etag='"v1"'))
+    fetcher.remember(FetchResult(url="https://a", status=304))
+    assert fetcher._conditional_headers("https://a") == {'If-None-Match': '"v1"'}
+    fetcher.close()
+
+
+def test_without_a_store_requests_are_unconditional():
+    fetcher = PageFetcher({})
+    fetcher.remember(FetchResult(url="https://a", status=200, etag='"v1"'))
+    assert fetcher._conditional_headers("https://a") == {}
+    fetcher.close()
@@ -0,0 +1,98 @@
+import asyncio
+from src.utilities import retrieval, retrieval_cache
+from src.utilities.document_table import DocumentTable
+from src.utilities.lexical_index import LexicalIndex, term_counts, tokenize
+from src.utilities.retrieval import reciprocal_rank_fusion
+
+DOCUMENTS = {
+    "1": "Zakat al-fitr is paid before the Eid prayer",
+    "2": "The nisab of zakat on gold is 85 grams",
+    "3": "Wudu is required before the prayer",
+    "4": "Fasting the day of Arafah expiates two years",
+}
+
+
+def build_index() -> LexicalIndex:
+    return LexicalIndex.build(((doc_id, term_counts(text)) for doc_id, text in DOCUMENTS.items()), generation=3)
+
+
+def test_tokenize_lowercases_and_drops_single_letters():
+    assert tokenize("A Nisab of 85 g, 2 x") == ["nisab", "of", "85", "2"]
+
+
+def test_tokenize_normalizes_arabic():
+    assert tokenize("الزَّكَاة", "ar") == tokenize("الزكاة", "ar")
+
+
+def test_search_ranks_matching_documents():
+    hits = build_index().search("nisab zakat", top_k=2)
+    assert [doc_id for doc_id, _ in hits] == ["2", "1"]
+    assert hits[0][1] > hits[1][1] > 0
+
+
+def test_search_without_known_terms_returns_nothing():
+    assert build_index().search("unknown words", top_k=5) == []
+
+
+def test_search_returns_at_most_top_k():
+    assert len(build_index().search("the prayer zakat", top_k=2)) == 2
+
+
+def test_save_and_load(tmp_path):
+    index = build_index()
+    path = str(tmp_path / "index.bm25.npz")
+    index.save(path)
+    loaded = LexicalIndex.load(path)
+    assert loaded.generation == 3
+    assert loaded.search("eid prayer", top_k=3) == index.search("eid prayer", top_k=3)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]])
+    assert fused == ["c", "a", "b", "d"]
+
+
+def test_reciprocal_rank_fusion_keeps_list_order_on_ties():
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "a"]]) == ["a", "b"]
+    assert reciprocal_rank_fusion([["a"], []]) == ["a"]
+
+
+class Chunk:
+    def __init__(self, vector_id, text):
+        self.id = vector_id
+        self.values = [0.0]
+        self.metadata = {"text": text, "source": "https://example.com/2", "total_chunks": 2}
+        self.score = 1.0
+
+
+class BackfillManager:
+    """Matches fatwa 2, which is in the index but not in the document table yet."""
+
+    language = "en"
+
+    def __init__(self, table):
+        self.documents = table
+
+    async def aretrieve_docs(self, question, config, include_metadata=True):
+        return [Chunk("2-0", DOCUMENTS["2"])]
+
+    async def abatch_fetch_vectors(self, ids, config):
+        return {vector_id: Chunk(vector_id, DOCUMENTS["2"]) for vector_id in ids}
+
+
+def test_backfilled_documents_reach_the_lexical_index(tmp_path, monkeypatch):
+    manager = BackfillManager(DocumentTable(str(tmp_path / "index.db")))
+
+    async def aget_pinecone_manager(index_name):
+        return manager
+
+    monkeypatch.setattr(retrieval_cache, "INDEX_GENERATION_DIR", str(tmp_path))
+    monkeypatch.setattr(retrieval, "get_retrieval_cache", lambda: None)
+    monkeypatch.setattr(retrieval, "aget_pinecone_manager", aget_pinecone_manager)
+    monkeypatch.setattr(retrieval, "get_reranker", lambda: None)
+    monkeypatch.setattr(retrieval, "LEXICAL_SEARCH", False)
+    asyncio.run(retrieval.aretrieve_documents("nisab of gold", {}, is_arabic=False))
+    assert "2" in manager.documents.get_many(["2"])
+    # The backfill moves the index to a new generation, so the saved BM25 build is outdated
+    assert retrieval_cache.get_index_generation(retrieval.PINECONE_INDEX_NAME_EN) == 1
+    assert [doc_id for doc_id, _ in LexicalIndex.build(manager.documents.iter_term_counts()).search("nisab", top_k=1)] == ["2"]
@@ -0,0 +1,55 @@
+from src.index_graph.manifest import DocumentManifest, chunk_ids
+from tests.benchmarks.common import OfflineEnglishScraper
+
+
+def test_entries_survive_saving(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = DocumentManifest(path)
+    manifest.record('1', "2024-01-01", "text", 3, "model")
+    manifest.save()
+    reopened = DocumentManifest(path)
+    assert list(reopened) == ['1']
+    assert reopened.get('1')['chunk_count'] == 3
+
+
+def test_current_and_unchanged_documents(tmp_path):
+    manifest = DocumentManifest(str(tmp_path / "manifest.json"))
+    manifest.record('1', "2024-01-01", "text", 1, "model")
+    assert manifest.is_current('1', "2024-01-01", "model")
+    assert not manifest.is_current('1', "2024-02-01", "model")
+    assert not manifest.is_current('1', "2024-01-01", "other-model")
+    assert manifest.is_unchanged('1', "text", "model")
+    assert not manifest.is_unchanged('1', "edited text", "model")
+    manifest.touch('1', "2024-02-01")
+    assert manifest.is_current('1', "2024-02-01", "model")
+    manifest.touch('2', "2024-02-01")
+    assert '2' not in manifest
+
+
+def test_chunk_ids():
+    assert chunk_ids('7', 2, 4) == ['7-2', '7-3']
+    assert chunk_ids('7', 3, 3) == []
+
+
+class FakeManager:
+    embedding_model = "model"
+
+    def __init__(self):
+        self.deleted = []
+
+    def delete_vectors(self, ids):
+        self.deleted.extend(ids)
+
+
+def test_shorter_versions_delete_their_leftover_chunks(tmp_path):
+    scraper = OfflineEnglishScraper()
+    scraper._pinecone_manager = FakeManager()
+    scraper._manifest = DocumentManifest(str(tmp_path / "manifest.json"))
+    scraper._manifest.record('1', None, "long text", 4, "model")
+    items = [{'id': '1', 'content': "short"}, {'id': '2', 'content': "new"}]
+    scraper._mark_indexed(items, [2, 1], ["2024-02-01", None])
+    assert scraper._pinecone_manager.deleted == ['1-2', '1-3']
+    assert scraper._manifest.get('1')['chunk_count'] == 2
+    assert scraper._manifest.is_unchanged('2', "new", "model")
+    assert not scraper._needs_indexing({'id': '1', 'content': "short"})
+    assert scraper._needs_indexing({'id': '1', 'content': "edited"})
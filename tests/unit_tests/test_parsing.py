@@ -0,0 +1,33 @@
+import asyncio
+from datetime import datetime
+from src.index_graph.parsing import ParsePool, _chunked
+from tests.benchmarks.common import OfflineEnglishScraper, load_fixture
+
+URL = 'https://www.dar-alifta.org/fixture'
+LASTMOD = datetime(2024, 1, 1)
+
+
+def test_chunked_keeps_the_remainder():
+    assert list(_chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(_chunked([], 2)) == []
+
+
+def test_parse_many_matches_in_process_parsing_in_order():
+    html = load_fixture('en_fatwa.html')
+    pages = [(html, URL, str(i), LASTMOD) for i in range(5)] + [("<html></html>", URL, "empty", LASTMOD)]
+    expected = [OfflineEnglishScraper().parse_qa_from_page(*page) for page in pages]
+    with ParsePool(OfflineEnglishScraper, workers=2, chunk_size=2) as pool:
+        assert list(pool.parse_many(pages)) == expected
+    assert [item['id'] for item in expected[:-1]] == ['0', '1', '2', '3', '4']
+    assert expected[-1] is None
+
+
+def test_aparse_flushes_partial_chunks():
+    html = load_fixture('en_fatwa.html')
+
+    async def parse_all(pool):
+        return await asyncio.gather(*(pool.aparse(html, URL, str(i), LASTMOD) for i in range(3)))
+
+    with ParsePool(OfflineEnglishScraper, workers=1, chunk_size=10, max_delay=0.01) as pool:
+        items = asyncio.run(parse_all(pool))
+    assert [item['id'] for item in items] == ['0', '1', '2']
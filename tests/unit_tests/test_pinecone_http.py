@@ -0,0 +1,109 @@
+import asyncio
+import json
+import httpx
+import pytest
+from src.utilities import pinecone_manager
+from src.utilities.pinecone_http import FETCH_BATCH_SIZE, AsyncIndexClient, Match
+
+
+async def open_client(index: AsyncIndexClient):
+    return index._client()
+
+
+def test_close_from_sync_code_closes_stopped_loop_clients():
+    index = AsyncIndexClient("index.example.com", "qa")
+    loop = asyncio.new_event_loop()
+    try:
+        client = loop.run_until_complete(open_client(index))
+        index.close()
+        assert client.is_closed
+    finally:
+        loop.close()
+
+
+def test_close_on_a_running_loop_closes_its_client_and_stopped_ones():
+    index = AsyncIndexClient("index.example.com", "qa")
+    stopped = asyncio.new_event_loop()
+    try:
+        stopped_client = stopped.run_until_complete(open_client(index))
+
+        async def close_while_running():
+            running_client = index._client()
+            index.close()
+            await asyncio.sleep(0)
+            return running_client
+
+        running_client = asyncio.run(close_while_running())
+        assert running_client.is_closed
+        assert stopped_client.is_closed
+    finally:
+        stopped.close()
+
+
+def test_managers_are_closed_at_exit(monkeypatch):
+    registered = []
+
+    class Manager:
+        def __init__(self, namespace, index_name):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(pinecone_manager, "PineconeManager", Manager)
+    monkeypatch.setattr(pinecone_manager, "_managers", {})
+    monkeypatch.setattr(pinecone_manager.atexit, "register", registered.append)
+    manager = pinecone_manager.get_pinecone_manager("index")
+    assert pinecone_manager.get_pinecone_manager("index") is manager
+    assert registered == [manager.close]
+
+
+def run_with_transport(index: AsyncIndexClient, handler, call):
+    async def run():
+        index._clients[asyncio.get_running_loop()] = httpx.AsyncClient(
+            base_url=index.base_url, headers=index.headers, transport=httpx.MockTransport(handler)
+        )
+        try:
+            return await call()
+        finally:
+            await index.aclose()
+    return asyncio.run(run())
+
+
+def test_query_sends_the_namespace_and_parses_matches():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={'matches': [{'id': "1-0", 'score': 0.9, 'metadata': {'text': "a"}}, {'id': "2-0"}]})
+
+    index = AsyncIndexClient("index.example.com", "qa", api_key="key")
+    matches = run_with_transport(index, handler, lambda: index.query([0.1, 0.2], top_k=2))
+    assert matches == [Match("1-0", 0.9, {'text': "a"}), Match("2-0", 0.0, {})]
+    body = json.loads(requests[0].content)
+    assert (body['namespace'], body['topK'], body['vector']) == ("qa", 2, [0.1, 0.2])
+    assert requests[0].headers['Api-Key'] == "key"
+    assert str(requests[0].url) == "https://index.example.com/query"
+
+
+def test_fetch_is_split_into_batches_and_merged():
+    batches = []
+
+    def handler(request):
+        ids = request.url.params.get_list('ids')
+        batches.append(len(ids))
+        assert request.url.params['namespace'] == "qa"
+        return httpx.Response(200, json={'vectors': {vector_id: {'metadata': {'n': vector_id}} for vector_id in ids}})
+
+    ids = [f"{i}-0" for i in range(FETCH_BATCH_SIZE + 5)]
+    index = AsyncIndexClient("https://index.example.com", "qa")
+    vectors = run_with_transport(index, handler, lambda: index.fetch(ids))
+    assert sorted(batches) == [5, FETCH_BATCH_SIZE]
+    assert set(vectors) == set(ids)
+    assert vectors["3-0"].metadata == {'n': "3-0"} and vectors["3-0"].values == []
+
+
+def test_error_statuses_are_raised():
+    index = AsyncIndexClient("index.example.com", "qa")
+    with pytest.raises(httpx.HTTPStatusError):
+        run_with_transport(index, lambda request: httpx.Response(503), lambda: index.query([0.1], top_k=1))
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from src.utilities import pinecone_manager
+
+
+class CountingManager:
+    created = 0
+
+    def __init__(self, namespace, index_name):
+        CountingManager.created += 1
+        self.namespace = namespace
+        self.index_name = index_name
+
+    def close(self):
+        pass
+
+
+def use_counting_managers(monkeypatch):
+    CountingManager.created = 0
+    monkeypatch.setattr(pinecone_manager, "PineconeManager", CountingManager)
+    monkeypatch.setattr(pinecone_manager, "_managers", {})
+    monkeypatch.setattr(pinecone_manager.atexit, "register", lambda close: None)
+
+
+def test_one_manager_per_index_and_namespace_across_threads(monkeypatch):
+    use_counting_managers(monkeypatch)
+    managers = []
+    threads = [
+        threading.Thread(target=lambda: managers.append(pinecone_manager.get_pinecone_manager("index")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert CountingManager.created == 1
+    assert all(manager is managers[0] for manager in managers)
+    assert pinecone_manager.get_pinecone_manager("index", namespace="other") is not managers[0]
+    assert pinecone_manager.get_pinecone_manager("other-index") is not managers[0]
+
+
+def test_async_getter_shares_the_sync_managers(monkeypatch):
+    use_counting_managers(monkeypatch)
+    manager = asyncio.run(pinecone_manager.aget_pinecone_manager("index"))
+    assert pinecone_manager.get_pinecone_manager("index") is manager
+    assert CountingManager.created == 1
+
+
+def test_models_are_loaded_once_per_name(monkeypatch):
+    loaded = []
+
+    def load(model_name, **kwargs):
+        loaded.append(model_name)
+        return object()
+
+    monkeypatch.setattr(pinecone_manager, "HuggingFaceEmbeddings", load)
+    monkeypatch.setattr(pinecone_manager, "get_embedding_cache", lambda model_name: None)
+    monkeypatch.setattr(pinecone_manager, "_embeddings", {})
+    first = pinecone_manager.get_embeddings("model-a")
+    assert pinecone_manager.get_embeddings("model-a") is first
+    pinecone_manager.get_embeddings("model-b")
+    assert loaded == ["model-a", "model-b"]
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from src.index_graph.pipeline import _DONE, IngestionPipeline, _next_batch
+
+
+class FakeCrawler:
+    async def crawl(self, urls, on_item):
+        for url_info in urls:
+            await on_item({'id': url_info['id'], 'content': url_info['content']})
+
+
+class Splitter:
+    def split_text(self, text):
+        return text.split()
+
+
+class FakeScraper:
+    batch_size = 2
+    text_splitter = Splitter()
+
+    def __init__(self, indexed=(), fail_upsert=False):
+        self.indexed = set(indexed)
+        self.fail_upsert = fail_upsert
+        self.saved = []
+        self.upserts = []
+
+    def _needs_indexing(self, qa_item):
+        return qa_item['id'] not in self.indexed
+
+    def _save_qa_items(self, qa_items, mark_updated):
+        self.saved.extend(qa_item['id'] for qa_item in qa_items)
+
+    def _vectorize_items(self, qa_items, chunk_lists):
+        return [(f"{qa_item['id']}-{i}", [0.0], {}) for qa_item, chunks in zip(qa_items, chunk_lists) for i in range(len(chunks))]
+
+    def _upsert_batch(self, qa_items, chunk_counts, vectors):
+        if self.fail_upsert:
+            raise RuntimeError("index unavailable")
+        self.upserts.append(([qa_item['id'] for qa_item in qa_items], chunk_counts, [vector[0] for vector in vectors]))
+
+    def _log(self, message):
+        pass
+
+
+URLS = [{'id': str(i), 'content': " ".join(["word"] * (i + 1))} for i in range(5)]
+
+
+def test_changed_items_flow_through_every_stage():
+    scraper = FakeScraper(indexed={'1'})
+    pipeline = IngestionPipeline(scraper, FakeCrawler(), queue_size=1, embedding_batch_size=3)
+    stages = asyncio.run(pipeline.run(URLS))
+
+    assert sorted(scraper.saved) == ['0', '2', '3', '4']
+    upserted = {fatwa_id: count for ids, counts, _ in scraper.upserts for fatwa_id, count in zip(ids, counts)}
+    assert upserted == {'0': 1, '2': 3, '3': 4, '4': 5}
+    vector_ids = [vector_id for _, _, ids in scraper.upserts for vector_id in ids]
+    assert len(vector_ids) == sum(upserted.values()) == len(set(vector_ids))
+    assert (stages['crawl'].processed, stages['chunk'].skipped, stages['upsert'].processed) == (5, 1, 4)
+
+
+def test_stage_errors_stop_the_pipeline():
+    pipeline = IngestionPipeline(FakeScraper(fail_upsert=True), FakeCrawler(), queue_size=1)
+    with pytest.raises(RuntimeError, match="index unavailable"):
+        asyncio.run(pipeline.run(URLS))
+
+
+def test_next_batch_takes_only_queued_entries():
+    async def batches():
+        queue = asyncio.Queue()
+        for entry in (['a'], ['b', 'c'], ['d'], _DONE):
+            queue.put_nowait(entry)
+        return [
+            await _next_batch(queue, 3, size=len),
+            await _next_batch(queue, 3, size=len),
+        ]
+
+    assert asyncio.run(batches()) == [([['a'], ['b', 'c']], False), ([['d']], True)]
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import pytest
+from src.utilities import quantization
+from src.utilities.quantization import code_dtype, quantize, score
+from src.utilities.vector_store import LocalVectorStore
+from tests.benchmarks.bench_quantization import make_queries, synthetic_vectors
+
+
+def unit(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True)
+
+
+def test_unknown_quantization_is_rejected():
+    assert code_dtype('int8') == np.int8
+    with pytest.raises(ValueError):
+        code_dtype('int4')
+
+
+@pytest.mark.parametrize('kind, tolerance', [('int8', 0.02), ('float16', 0.002), ('none', 1e-6)])
+def test_scores_approximate_float32_dot_products(kind, tolerance, monkeypatch):
+    monkeypatch.setattr(quantization, 'SCORE_BLOCK_ROWS', 7)
+    rng = np.random.default_rng(0)
+    matrix = unit(rng.normal(size=(50, 32))).astype(np.float32)
+    matrix[3] = 0.0
+    query = unit(rng.normal(size=32)).astype(np.float32)
+    codes, scales = quantize(matrix, kind)
+    assert codes.dtype == code_dtype(kind)
+    assert np.allclose(score(codes, scales, query), matrix @ query, atol=tolerance)
+    rows = np.array([40, 3, 11])
+    assert np.allclose(score(codes, scales, query, rows), matrix[rows] @ query, atol=tolerance)
+
+
+def load(directory, vectors: np.ndarray, kind: str, rescore_factor: int) -> LocalVectorStore:
+    store = LocalVectorStore(str(directory), dimension=vectors.shape[1], ivf_min_vectors=0,
+                             quantization=kind, rescore_factor=rescore_factor)
+    store.upsert([(f"{i}-0", vector.tolist(), {}) for i, vector in enumerate(vectors)])
+    return store
+
+
+def test_rescoring_restores_the_float32_ranking(tmp_path):
+    vectors = synthetic_vectors(2000, 32, clusters=20, seed=0)
+    queries = make_queries(vectors, 20, seed=0)
+    exact = load(tmp_path / "none", vectors, 'none', 0)
+    rescored = load(tmp_path / "int8", vectors, 'int8', 4)
+    approximate = load(tmp_path / "int8-raw", vectors, 'int8', 0)
+    hits = 0
+    for query in queries:
+        expected = exact.query(query.tolist(), top_k=10)
+        matches = rescored.query(query.tolist(), top_k=10)
+        assert [match.id for match in matches] == [match.id for match in expected]
+        assert np.allclose([match.score for match in matches], [match.score for match in expected], atol=1e-5)
+        hits += len({match.id for match in expected} & {match.id for match in approximate.query(query.tolist(), top_k=10)})
+    assert hits / (10 * len(queries)) >= 0.9
+
+
+def test_reopening_with_another_quantization_requantizes(tmp_path):
+    vectors = synthetic_vectors(100, 16, clusters=4, seed=2)
+    load(tmp_path, vectors, 'float16', 4).close()
+    store = LocalVectorStore(str(tmp_path), dimension=16, ivf_min_vectors=0, quantization='int8', rescore_factor=0)
+    assert not os.path.exists(tmp_path / "vectors.f16")
+    query = vectors[5].tolist()
+    assert store.query(query, top_k=1)[0].id == "5-0"
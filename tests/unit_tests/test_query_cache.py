@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+from src.utilities.embedding_cache import QueryEmbeddingCache
+from src.utilities.pinecone_manager import PineconeManager
+from src.utilities.utils import canonicalize_query
+
+
+def test_arabic_spelling_variants_share_a_canonical_query():
+    question = canonicalize_query("ما حُكْمُ الصَّلاةِ في الطائرة", 'ar')
+    assert canonicalize_query("  ما حكم   الصلاة في الطائره ", 'ar') == question
+    assert canonicalize_query("أين إمام", 'ar') == canonicalize_query("اين امام", 'ar')
+    assert canonicalize_query("ما حكم الصيام", 'ar') != question
+
+
+def test_english_queries_only_collapse_whitespace():
+    assert canonicalize_query("  Is it\tallowed?\n", 'en') == "Is it allowed?"
+    assert canonicalize_query("Is it allowed?", 'en') != canonicalize_query("is it allowed?", 'en')
+
+
+def test_least_recently_used_query_is_evicted():
+    cache = QueryEmbeddingCache("model", capacity=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]
+    cache.put("c", [3.0])
+    assert (cache.get("b"), cache.get("a"), cache.get("c")) == (None, [1.0], [3.0])
+    assert cache.stats()['evictions'] == 1 and cache.hits == 3 and cache.misses == 1
+
+
+class SlowEmbeddings:
+    def __init__(self):
+        self.queries = []
+
+    def embed_query(self, query):
+        self.queries.append(query)
+        time.sleep(0.05)
+        return [float(len(query))]
+
+
+def make_manager(language: str) -> PineconeManager:
+    manager = PineconeManager.__new__(PineconeManager)
+    manager.language = language
+    manager.embeddings = SlowEmbeddings()
+    manager.query_cache = QueryEmbeddingCache("model", capacity=8)
+    manager._pending_queries = {}
+    manager._pending_lock = threading.Lock()
+    return manager
+
+
+def test_spelling_variants_are_embedded_once():
+    manager = make_manager('ar')
+    first = manager.embed_query("ما حُكْمُ الصَّلاةِ في الطائرة")
+    assert manager.embed_query("ما حكم الصلاة في الطائره") == first
+    assert len(manager.embeddings.queries) == 1
+
+
+def test_concurrent_misses_share_one_embedding():
+    manager = make_manager('en')
+
+    async def ask():
+        return await asyncio.gather(*(manager.aembed_query("Is it allowed?") for _ in range(5)))
+
+    vectors = asyncio.run(ask())
+    assert vectors == [[14.0]] * 5
+    assert manager.embeddings.queries == ["Is it allowed?"]
+    assert manager._pending_queries == {}
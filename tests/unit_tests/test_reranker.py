@@ -0,0 +1,17 @@
+from src.utilities.reranker import rerank_order
+
+
+def test_orders_by_score():
+    assert rerank_order(["a", "b", "c"], {"a": 0.1, "b": 0.9, "c": 0.5}, top_n=0) == ["b", "c", "a"]
+
+
+def test_keeps_top_n():
+    assert rerank_order(["a", "b", "c"], {"a": 0.1, "b": 0.9, "c": 0.5}, top_n=2) == ["b", "c"]
+
+
+def test_unscored_documents_keep_their_rank():
+    assert rerank_order(["a", "b", "c", "d"], {"a": 0.0, "c": 2.0, "d": 1.0}, top_n=0) == ["c", "b", "d", "a"]
+
+
+def test_ties_keep_fused_order():
+    assert rerank_order(["a", "b"], {"a": 1.0, "b": 1.0}, top_n=0) == ["a", "b"]
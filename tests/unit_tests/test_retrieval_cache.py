@@ -0,0 +1,87 @@
+import asyncio
+from src.utilities import retrieval, retrieval_cache
+from src.utilities.retrieval_cache import RetrievalCache
+
+RESULT = {"context": "answer", "sources": ["https://example.com/1"]}
+
+
+def test_hit_at_same_generation_returns_copy():
+    cache = RetrievalCache(max_entries=4, max_bytes=1 << 20, ttl=60)
+    cache.put("key", 1, RESULT)
+    cached = cache.get("key", 1)
+    assert cached == RESULT
+    cached["sources"].append("other")
+    assert cache.get("key", 1) == RESULT
+
+
+def test_new_generation_invalidates():
+    cache = RetrievalCache(max_entries=4, max_bytes=1 << 20, ttl=60)
+    cache.put("key", 1, RESULT)
+    assert cache.get("key", 2) is None
+    assert cache.invalidations == 1
+    # The stale entry is gone, not served again at the old generation
+    assert cache.get("key", 1) is None
+
+
+def test_expired_entry_is_dropped():
+    cache = RetrievalCache(max_entries=4, max_bytes=1 << 20, ttl=-1)
+    cache.put("key", 1, RESULT)
+    assert cache.get("key", 1) is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = RetrievalCache(max_entries=2, max_bytes=1 << 20, ttl=60)
+    cache.put("a", 1, RESULT)
+    cache.put("b", 1, RESULT)
+    cache.get("a", 1)
+    cache.put("c", 1, RESULT)
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None
+    assert cache.evictions == 1
+
+
+def test_bump_index_generation(tmp_path, monkeypatch):
+    monkeypatch.setattr(retrieval_cache, "INDEX_GENERATION_DIR", str(tmp_path))
+    assert retrieval_cache.get_index_generation("index") == 0
+    retrieval_cache.bump_index_generation("index")
+    retrieval_cache.bump_index_generation("index")
+    assert retrieval_cache.get_index_generation("index") == 2
+    assert retrieval_cache.get_index_generation("other") == 0
+
+
+class Vector:
+    def __init__(self, vector_id, text, total_chunks=2):
+        self.id = vector_id
+        self.values = [0.0]
+        self.metadata = {"text": text, "source": "https://example.com/1", "total_chunks": total_chunks}
+        self.score = 1.0
+
+
+class PartialFetchManager:
+    """Matches fatwa 1 of two chunks, only its first chunk can be fetched."""
+
+    documents = None
+    language = "en"
+
+    async def aretrieve_docs(self, question, config, include_metadata=True):
+        return [Vector("1-0", "first chunk")]
+
+    async def abatch_fetch_vectors(self, ids, config):
+        return {vector_id: Vector(vector_id, "first chunk") for vector_id in ids if vector_id == "1-0"}
+
+
+def test_partial_fetch_is_not_cached(monkeypatch):
+    cache = RetrievalCache(max_entries=4, max_bytes=1 << 20, ttl=60)
+    manager = PartialFetchManager()
+
+    async def aget_pinecone_manager(index_name):
+        return manager
+
+    monkeypatch.setattr(retrieval, "get_retrieval_cache", lambda: cache)
+    monkeypatch.setattr(retrieval, "get_index_generation", lambda index_name: 1)
+    monkeypatch.setattr(retrieval, "aget_pinecone_manager", aget_pinecone_manager)
+    monkeypatch.setattr(retrieval, "get_reranker", lambda: None)
+    monkeypatch.setattr(retrieval, "LEXICAL_SEARCH", False)
+    result = asyncio.run(retrieval.aretrieve_documents("nisab of gold", {}, is_arabic=False))
+    assert result["sources"] == ["https://example.com/1"]
+    assert len(cache) == 0
@@ -0,0 +1,86 @@
+import asyncio
+from contextlib import contextmanager
+import pytest
+from src.index_graph.sitemap import SitemapStreamParser, aiter_sitemap, iter_sitemap
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(*locs: str) -> bytes:
+    entries = "".join(f"<url><loc>{loc}</loc><lastmod>2024-01-01</lastmod></url>" for loc in locs)
+    return f'<?xml version="1.0"?><urlset {NS}>{entries}</urlset>'.encode()
+
+
+def sitemap_index(*locs: str) -> bytes:
+    entries = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return f'<?xml version="1.0"?><sitemapindex {NS}>{entries}</sitemapindex>'.encode()
+
+
+def parse(body: bytes, chunk_size: int):
+    parser = SitemapStreamParser()
+    events = []
+    for start in range(0, len(body), chunk_size):
+        events.extend(parser.feed(body[start:start + chunk_size]))
+    events.extend(parser.close())
+    return events
+
+
+def test_entries_do_not_depend_on_chunk_boundaries():
+    body = b"\xef\xbb\xbf junk " + urlset("https://a/1", "https://a/2", "https://a/3")
+    expected = [('url', {'loc': f"https://a/{i}", 'lastmod': "2024-01-01"}) for i in (1, 2, 3)]
+    for chunk_size in (1, 7, 64, len(body)):
+        assert parse(body, chunk_size) == expected
+
+
+def test_index_entries_are_reported_as_sitemaps():
+    assert parse(sitemap_index("https://a/s1.xml"), 5) == [('sitemap', {'loc': "https://a/s1.xml", 'lastmod': None})]
+
+
+class FakeFetcher:
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    def _body(self, url: str) -> bytes:
+        if url not in self.bodies:
+            raise IOError(f"404 for {url}")
+        return self.bodies[url]
+
+    @contextmanager
+    def stream(self, url):
+        body = self._body(url)
+        yield iter([body[:10], body[10:]])
+
+    async def astream(self, url):
+        body = self._body(url)
+        yield body[:10]
+        yield body[10:]
+
+
+BODIES = {
+    "https://a/index.xml": sitemap_index("https://a/s1.xml", "https://a/s2.xml", "https://a/missing.xml", "https://a/s1.xml"),
+    "https://a/s1.xml": urlset("https://a/1", "https://a/2"),
+    "https://a/s2.xml": urlset("https://a/3"),
+}
+
+
+def test_sitemap_index_children_are_followed_once():
+    failed = []
+    entries = list(iter_sitemap(FakeFetcher(BODIES), "https://a/index.xml", log=lambda message: None, failed=failed))
+    assert [entry['loc'] for entry in entries] == ["https://a/1", "https://a/2", "https://a/3"]
+    assert failed == ["https://a/missing.xml"]
+
+
+def test_async_sitemap_index_children_are_followed_once():
+    async def collect():
+        failed = []
+        entries = [entry async for entry in aiter_sitemap(FakeFetcher(BODIES), "https://a/index.xml", log=lambda message: None, failed=failed)]
+        return entries, failed
+
+    entries, failed = asyncio.run(collect())
+    assert sorted(entry['loc'] for entry in entries) == ["https://a/1", "https://a/2", "https://a/3"]
+    assert failed == ["https://a/missing.xml"]
+
+
+def test_root_sitemap_errors_are_raised():
+    with pytest.raises(IOError):
+        list(iter_sitemap(FakeFetcher({}), "https://a/index.xml"))
@@ -0,0 +1,66 @@
+import threading
+import pytest
+from urllib3.exceptions import ProtocolError
+from src.utilities.upsert_writer import UpsertError, UpsertWriter, _is_retryable
+
+
+class StatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def test_is_retryable():
+    assert _is_retryable(StatusError(429))
+    assert _is_retryable(StatusError(503))
+    assert not _is_retryable(StatusError(400))
+    assert _is_retryable(ConnectionResetError())
+    assert _is_retryable(TimeoutError())
+    assert _is_retryable(ProtocolError("connection aborted"))
+    assert not _is_retryable(ValueError("bad vector"))
+
+
+def vectors(count: int, text: str = ""):
+    return [(f"{i}", [0.0] * 4, {'text': text}) for i in range(count)]
+
+
+def test_split_respects_count_and_size_limits():
+    assert [len(batch) for batch in UpsertWriter(None, "", batch_size=3).split(vectors(7))] == [3, 3, 1]
+    by_size = UpsertWriter(None, "", batch_size=100, max_request_bytes=450).split(vectors(4, "x" * 100))
+    assert [len(batch) for batch in by_size] == [2, 2]
+
+
+class FlakyIndex:
+    """Fails the first attempt of every batch with the given error."""
+
+    def __init__(self, error):
+        self.error = error
+        self.attempted = set()
+        self.upserted = []
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace):
+        with self._lock:
+            first_id = vectors[0][0]
+            if first_id not in self.attempted:
+                self.attempted.add(first_id)
+                raise self.error
+            self.upserted.extend(vector_id for vector_id, _, _ in vectors)
+
+
+def test_retryable_failures_are_retried():
+    index = FlakyIndex(StatusError(503))
+    writer = UpsertWriter(index, "", batch_size=2, workers=2, base_delay=0.0)
+    report = writer.write(vectors(5))
+    writer.close()
+    assert report.ok and report.vectors_upserted == 5 and report.retries == 3
+    assert sorted(index.upserted) == ['0', '1', '2', '3', '4']
+
+
+def test_invalid_requests_fail_without_retrying():
+    writer = UpsertWriter(FlakyIndex(StatusError(400)), "", batch_size=2, base_delay=0.0)
+    with pytest.raises(UpsertError) as raised:
+        writer.write(vectors(3))
+    writer.close()
+    assert [batch.attempts for batch in raised.value.report.batches] == [1, 1]
+    assert raised.value.report.vectors_upserted == 0
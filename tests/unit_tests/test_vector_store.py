@@ -0,0 +1,74 @@
+import numpy as np
+from src.utilities.vector_store import LocalVectorStore
+
+
+def make_store(directory, **kwargs) -> LocalVectorStore:
+    options = dict(dimension=4, ivf_min_vectors=0, quantization='none')
+    options.update(kwargs)
+    return LocalVectorStore(str(directory), **options)
+
+
+def test_upsert_query_fetch_delete(tmp_path):
+    store = make_store(tmp_path)
+    store.upsert([
+        ("1-0", [1.0, 0.0, 0.0, 0.0], {'text': "a"}),
+        ("2-0", [0.0, 1.0, 0.0, 0.0], {'text': "b"}),
+        ("3-0", [1.0, 1.0, 0.0, 0.0], {'text': "c"}),
+    ])
+    matches = store.query([2.0, 0.1, 0.0, 0.0], top_k=2)
+    assert [match.id for match in matches] == ["1-0", "3-0"]
+    assert matches[0].metadata == {'text': "a"} and 0.99 < matches[0].score <= 1.0
+    assert store.query([1.0, 0.0, 0.0, 0.0], top_k=1, include_metadata=False)[0].metadata == {}
+
+    fetched = store.fetch(["3-0", "9-0"])
+    assert list(fetched) == ["3-0"]
+    assert np.allclose(fetched["3-0"].values, [2 ** -0.5, 2 ** -0.5, 0.0, 0.0])
+
+    store.delete(["1-0", "9-0"])
+    assert [match.id for match in store.query([1.0, 0.0, 0.0, 0.0], top_k=3)] == ["3-0", "2-0"]
+    assert len(store) == 2
+    store.close()
+
+
+def test_upserts_replace_vectors_and_reuse_freed_slots(tmp_path):
+    store = make_store(tmp_path)
+    store.upsert([("1-0", [1.0, 0.0, 0.0, 0.0], {'v': 1}), ("2-0", [0.0, 1.0, 0.0, 0.0], {})])
+    store.upsert([("1-0", [0.0, 0.0, 1.0, 0.0], {'v': 2}), ("1-0", [0.0, 0.0, 0.0, 1.0], {'v': 3})])
+    assert len(store) == 2
+    assert store.query([0.0, 0.0, 0.0, 1.0], top_k=1)[0].metadata == {'v': 3}
+    slot = store._slots["2-0"]
+    store.delete(["2-0"])
+    store.upsert([("4-0", [0.0, 1.0, 0.0, 0.0], {})])
+    assert store._slots["4-0"] == slot
+    store.close()
+
+
+def test_changes_reach_other_instances_and_survive_reopening(tmp_path):
+    writer = make_store(tmp_path)
+    reader = make_store(tmp_path)
+    writer.upsert([("1-0", [1.0, 0.0, 0.0, 0.0], {})])
+    assert [match.id for match in reader.query([1.0, 0.0, 0.0, 0.0], top_k=1)] == ["1-0"]
+    writer.delete(["1-0"])
+    assert reader.query([1.0, 0.0, 0.0, 0.0], top_k=1) == []
+    writer.upsert([("2-0", [0.0, 1.0, 0.0, 0.0], {'text': "b"})])
+    writer.close()
+    reader.close()
+    assert make_store(tmp_path).fetch(["2-0"])["2-0"].metadata == {'text': "b"}
+
+
+def test_ivf_search_probing_every_list_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(300, 8)).astype(np.float32)
+    records = [(f"{i}-0", vector.tolist(), {}) for i, vector in enumerate(vectors)]
+    brute = make_store(tmp_path / "brute", dimension=8)
+    ivf = make_store(tmp_path / "ivf", dimension=8, ivf_min_vectors=100, nprobe=1000)
+    brute.upsert(records[:200])
+    ivf.upsert(records[:200])
+    assert ivf._ivf is not None
+    # Vectors written after the build are searched outside the index
+    brute.upsert(records[200:210])
+    ivf.upsert(records[200:210])
+    assert len(ivf._unindexed) == 10
+    for query in rng.normal(size=(10, 8)):
+        expected = [match.id for match in brute.query(query.tolist(), top_k=5)]
+        assert [match.id for match in ivf.query(query.tolist(), top_k=5)] == expected